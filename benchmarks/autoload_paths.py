@@ -0,0 +1,49 @@
+"""
+Measures per-request cost of SessionAutoloadMiddleware path matching as the number of patterns grows.
+
+Usage:
+> python -m benchmarks.autoload_paths
+"""
+
+from __future__ import annotations
+
+import re
+import timeit
+
+from starsessions.middleware import PathMatcher
+
+PATHS = ["/", "/dashboard/reports/2024", "/api/v1/users/42/orders", "/section59/page"]
+
+
+def make_patterns(count: int) -> list[str | re.Pattern[str]]:
+    patterns: list[str | re.Pattern[str]] = []
+    for index in range(count):
+        if index % 3 == 0:
+            patterns.append(re.compile(rf"/api/v\d+/resource{index}/"))
+        else:
+            patterns.append(f"/section{index}/")
+    return patterns
+
+
+def loop_match(patterns: list[str | re.Pattern[str]], path: str) -> bool:
+    """Matching strategy used before PathMatcher."""
+    for pattern in patterns:
+        if re.match(pattern, path):
+            return True
+    return False
+
+
+def main() -> None:
+    number = 20_000
+    print(f"{'patterns':>8} {'re.match loop, us':>18} {'PathMatcher, us':>16}")
+    for count in (1, 10, 60, 240):
+        patterns = make_patterns(count)
+        matcher = PathMatcher(patterns)
+        loop_time = timeit.timeit(lambda: [loop_match(patterns, path) for path in PATHS], number=number)
+        matcher_time = timeit.timeit(lambda: [matcher.match(path) for path in PATHS], number=number)
+        per_request = number * len(PATHS) / 1_000_000
+        print(f"{count:>8} {loop_time / per_request:>18.2f} {matcher_time / per_request:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measures InMemoryStore memory overhead per session, not counting session data itself.
+
+Usage:
+> python -m benchmarks.memory_store_size
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import gc
+import heapq
+import tracemalloc
+
+from starsessions.session import generate_session_id
+from starsessions.stores import InMemoryStore
+
+
+@dataclasses.dataclass
+class DataclassRecord:
+    expires: int
+    value: bytes
+
+
+class DataclassRecordStore(InMemoryStore):
+    """Layout used before compact records: dataclass records under hex keys, (expires, key) tuples in the heap."""
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        expires = self._get_expires(ttl)
+        self.data[session_id] = DataclassRecord(expires, data)  # type: ignore[assignment]
+        heapq.heappush(self._expiry_heap, (expires, session_id))  # type: ignore[misc]
+        return session_id
+
+
+async def measure(store: InMemoryStore, size: int) -> float:
+    value = b"x" * 100  # shared by all sessions so only the store overhead is measured
+    gc.collect()
+    tracemalloc.start()
+    started = tracemalloc.get_traced_memory()[0]
+    for _ in range(size):
+        await store.write(generate_session_id(), value, lifetime=3600, ttl=3600)
+    used = tracemalloc.get_traced_memory()[0] - started
+    tracemalloc.stop()
+    return used / size
+
+
+async def main() -> None:
+    print(f"{'sessions':>9} {'dataclass records, B':>21} {'compact records, B':>19}")
+    for size in (10_000, 1_000_000):
+        dataclass_records = await measure(DataclassRecordStore(), size)
+        compact_records = await measure(InMemoryStore(), size)
+        print(f"{size:>9} {dataclass_records:>21.1f} {compact_records:>19.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+"""
+Measures InMemoryStore.write() cost against the number of stored sessions.
+
+Usage:
+> python -m benchmarks.memory_store_write
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from starsessions.stores import InMemoryStore
+
+
+class DictRebuildStore(InMemoryStore):
+    """Eviction strategy used before the expiry index: rebuild the whole dict on every write."""
+
+    def _evict_expired(self) -> None:
+        now = time.time_ns()
+        self.data = {k: v for k, v in self.data.items() if v.expires >= now}
+
+
+async def measure(store: InMemoryStore, size: int, writes: int) -> float:
+    expires = time.time_ns() + 3600 * 1_000_000_000
+    for index in range(size):
+        store._set(f"session_{index}", expires, b"x" * 100)
+
+    started = time.perf_counter()
+    for index in range(writes):
+        await store.write(f"session_{index % size}", b"x" * 100, lifetime=3600, ttl=3600)
+    return (time.perf_counter() - started) / writes * 1_000_000
+
+
+async def main() -> None:
+    print(f"{'sessions':>9} {'dict rebuild, us':>17} {'expiry index, us':>17}")
+    for size in (1_000, 10_000, 100_000, 200_000):
+        rebuild = await measure(DictRebuildStore(), size, writes=max(20, 5_000_000 // size))
+        indexed = await measure(InMemoryStore(), size, writes=20_000)
+        print(f"{size:>9} {rebuild:>17.2f} {indexed:>17.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""
+Measures UnixSocketStore latency and throughput against a session server running in a separate process.
+
+Usage:
+> python -m benchmarks.unix_socket_store
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from starsessions.stores import UnixSocketStore
+
+
+async def wait_for_socket(path: str) -> None:
+    for _ in range(100):
+        if os.path.exists(path):
+            return
+        await asyncio.sleep(0.05)
+    raise RuntimeError("Session server did not start.")
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.sock")
+        server = await asyncio.create_subprocess_exec(sys.executable, "-m", "starsessions.server", path)
+        try:
+            await wait_for_socket(path)
+            store = UnixSocketStore(path)
+            value = b"x" * 200
+            await store.write("session_id", value, lifetime=3600, ttl=3600)
+
+            requests = 20_000
+            started = time.perf_counter()
+            for _ in range(requests):
+                await store.read("session_id", lifetime=3600)
+            latency = (time.perf_counter() - started) / requests * 1_000_000
+            print(f"sequential read latency: {latency:.1f} us")
+
+            started = time.perf_counter()
+            for _ in range(requests // 100):
+                await asyncio.gather(*(store.read("session_id", lifetime=3600) for _ in range(100)))
+            throughput = requests / (time.perf_counter() - started)
+            print(f"pipelined reads, 100 concurrent: {throughput:,.0f} per second")
+            await store.close()
+        finally:
+            server.terminate()
+            await server.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,9 +9,28 @@ from .session import (
     get_session_remaining_seconds,
     is_loaded,
     load_session,
+    mark_session_modified,
     regenerate_session_id,
+    revoke_user_sessions,
+)
+from .stores import (
+    CachingStore,
+    CoalescingStore,
+    CookieStore,
+    EncryptedCookieStore,
+    FieldStore,
+    FileStore,
+    InMemoryStore,
+    InMemoryUserIndex,
+    MemcachedStore,
+    SessionStore,
+    SQLiteStore,
+    StoreWrapper,
+    TieredStore,
+    UnixSocketStore,
+    UserIndex,
+    WriteBehindStore,
 )
-from .stores import CookieStore, InMemoryStore, SessionStore
 
 __all__ = [
     "SessionMiddleware",
@@ -21,6 +40,19 @@ __all__ = [
     "SessionStore",
     "InMemoryStore",
     "CookieStore",
+    "EncryptedCookieStore",
+    "StoreWrapper",
+    "FieldStore",
+    "CachingStore",
+    "CoalescingStore",
+    "WriteBehindStore",
+    "UnixSocketStore",
+    "SQLiteStore",
+    "FileStore",
+    "TieredStore",
+    "MemcachedStore",
+    "UserIndex",
+    "InMemoryUserIndex",
     "SessionError",
     "SessionNotLoaded",
     "ImproperlyConfigured",
@@ -30,6 +62,8 @@ __all__ = [
     "regenerate_session_id",
     "is_loaded",
     "load_session",
+    "mark_session_modified",
     "get_session_metadata",
     "get_session_remaining_seconds",
+    "revoke_user_sessions",
 ]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import abc
+import typing
+import zlib
+
+# the first byte of compressed data tells how it was compressed.
+# Data stored without compression has no header, serializers never produce these bytes as the first one.
+_ZLIB = b"\x01"
+_ZLIB_DICT = b"\x02"
+_ZSTD = b"\x03"
+_ZSTD_DICT = b"\x04"
+
+
+class Compressor(abc.ABC):  # pragma: no cover
+    @abc.abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class NoopCompressor(Compressor):
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCompressor(Compressor):
+    """
+    Compresses session data with zlib.
+
+    Data shorter than `threshold` bytes, or data that does not get smaller, is stored as is.
+    Uncompressed data is read as is, so the compressor can be enabled for existing sessions.
+    """
+
+    def __init__(self, level: int = 6, threshold: int = 1024, dictionary: bytes | None = None) -> None:
+        """
+        :param level: compression level, from 1 (fastest) to 9 (smallest)
+        :param threshold: compress data of this size or larger
+        :param dictionary: bytes that are likely to appear in session data, such as a typical session.
+                           Changing the dictionary makes existing compressed sessions unreadable.
+        """
+        self.level = level
+        self.threshold = threshold
+        self.dictionary = dictionary
+
+    def compress(self, data: bytes) -> bytes:
+        if len(data) < self.threshold:
+            return data
+
+        if self.dictionary:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+            compressed = _ZLIB_DICT + compressor.compress(data) + compressor.flush()
+        else:
+            compressed = _ZLIB + zlib.compress(data, self.level)
+        return compressed if len(compressed) < len(data) else data
+
+    def decompress(self, data: bytes) -> bytes:
+        header = data[:1]
+        if header == _ZLIB:
+            return zlib.decompress(data[1:])
+        if header == _ZLIB_DICT:
+            if not self.dictionary:
+                raise ValueError("Data was compressed with a dictionary, but no dictionary is configured.")
+            decompressor = zlib.decompressobj(zdict=self.dictionary)
+            return decompressor.decompress(data[1:]) + decompressor.flush()
+        return data
+
+
+class ZstdCompressor(Compressor):
+    """
+    Compresses session data with Zstandard.
+
+    Zstandard compresses faster than zlib, and with a trained dictionary it compresses small sessions much better.
+    Data shorter than `threshold` bytes, or data that does not get smaller, is stored as is.
+    Uncompressed data is read as is, so the compressor can be enabled for existing sessions.
+    """
+
+    def __init__(self, level: int = 3, threshold: int = 1024, dictionary: bytes | None = None) -> None:
+        """
+        :param level: compression level, from 1 (fastest) to 22 (smallest)
+        :param threshold: compress data of this size or larger
+        :param dictionary: a dictionary trained on typical sessions with `zstandard.train_dictionary`.
+                           Changing the dictionary makes existing compressed sessions unreadable.
+        """
+        try:
+            import zstandard  # type: ignore[import-not-found, unused-ignore]
+        except ImportError:  # pragma: no cover
+            raise ImportError("zstandard is required for ZstdCompressor")
+
+        self.level = level
+        self.threshold = threshold
+        self.dictionary = dictionary
+        self._header = _ZSTD_DICT if dictionary else _ZSTD
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        self._compressor: typing.Any = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+        self._decompressor: typing.Any = zstandard.ZstdDecompressor(dict_data=dict_data)
+        self._plain_decompressor: typing.Any = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        if len(data) < self.threshold:
+            return data
+
+        compressed: bytes = self._header + self._compressor.compress(data)
+        return compressed if len(compressed) < len(data) else data
+
+    def decompress(self, data: bytes) -> bytes:
+        header = data[:1]
+        if header == _ZSTD:
+            return typing.cast(bytes, self._plain_decompressor.decompress(data[1:]))
+        if header == _ZSTD_DICT:
+            if not self.dictionary:
+                raise ValueError("Data was compressed with a dictionary, but no dictionary is configured.")
+            return typing.cast(bytes, self._decompressor.decompress(data[1:]))
+        return data
@@ -12,10 +12,15 @@ class Encryptor(abc.ABC):
 
 
 class NoopEncryptor(Encryptor):
+    def __init__(self, warn: bool = True) -> None:
+        self.warn = warn
+
     def encrypt(self, data: bytes) -> bytes:
-        warnings.warn(
-            "NoopEncryptor is not secure and should not be used in production. Please, configure a secure encryptor."
-        )
+        if self.warn:
+            warnings.warn(
+                "NoopEncryptor is not secure and should not be used in production. "
+                "Please, configure a secure encryptor."
+            )
         return data
 
     def decrypt(self, data: bytes) -> bytes:
@@ -9,22 +9,54 @@ from starlette.requests import HTTPConnection
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from starsessions import SessionNotLoaded
+from starsessions.compressors import Compressor, NoopCompressor
 from starsessions.encryptors import Encryptor, NoopEncryptor
 from starsessions.serializers import JsonSerializer, Serializer
-from starsessions.session import (
-    SessionHandler,
-    get_session_remaining_seconds,
-    load_session,
-)
-from starsessions.stores import SessionStore
+from starsessions.session import SessionHandler, load_session
+from starsessions.stores import CookieStore, EncryptedCookieStore, SessionStore, UserIndex
 
 _SAFE_COOKIE_VALUE_RE = re.compile(r"^[A-Za-z0-9\-._~+/=]+$")
+_REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
 
 
 def _is_safe_cookie_value(value: str) -> bool:
     return bool(_SAFE_COOKIE_VALUE_RE.match(value))
 
 
+def _get_cookie(scope: Scope, name: str) -> str | None:
+    """
+    Read a single cookie from raw request headers without parsing the whole Cookie header into a dict.
+
+    Follows the rules of Starlette's cookie parser: name and value are stripped,
+    double quotes around the value are removed and the last occurrence wins.
+    """
+    value: str | None = None
+    for header_name, header_value in scope["headers"]:
+        if header_name != b"cookie":
+            continue
+
+        cookies = header_value.decode("latin-1")
+        start = 0
+        while (index := cookies.find(name, start)) != -1:
+            start = index + len(name)
+
+            # the name must be the whole cookie name, not a part of another name or value
+            chunk_start = cookies.rfind(";", 0, index) + 1
+            if cookies[chunk_start:index].strip():
+                continue
+
+            value_start = cookies.find("=", start)
+            if value_start == -1 or cookies[start:value_start].strip():
+                continue
+
+            value_end = cookies.find(";", value_start)
+            value = cookies[value_start + 1 : value_end if value_end != -1 else None].strip()
+            if len(value) > 1 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+
+    return value
+
+
 class LoadGuard:
     """A guard that protects access to uninitialized session data."""
 
@@ -58,6 +90,10 @@ class SessionMiddleware:
         cookie_path: str | None = None,
         serializer: Serializer | None = None,
         encryptor: Encryptor | None = None,
+        prefetch: bool = False,
+        user_index: UserIndex | None = None,
+        user_id_key: str = "user_id",
+        compressor: Compressor | None = None,
     ) -> None:
         lifetime = int(lifetime.total_seconds() if isinstance(lifetime, datetime.timedelta) else lifetime)
         assert lifetime >= 0, "Session lifetime cannot be less than zero seconds."
@@ -70,37 +106,58 @@ class SessionMiddleware:
         self.store = store
         self.rolling = rolling
         self.serializer = serializer or JsonSerializer()
-        self.encryptor = encryptor or NoopEncryptor()
+        # EncryptedCookieStore encrypts data itself, the warning would be misleading
+        self.encryptor = encryptor or NoopEncryptor(warn=not isinstance(store, EncryptedCookieStore))
+        self.compressor = compressor or NoopCompressor()
         self.cookie_name = cookie_name
         self.lifetime = lifetime
         self.cookie_domain = cookie_domain
         self.cookie_path = cookie_path
+        self.prefetch = prefetch
+        self.user_index = user_index
+        self.user_id_key = user_id_key
+        # CookieStore values that do not fit into one cookie are split into several cookies
+        self.cookie_chunk_size = store.max_size if isinstance(store, CookieStore) else 0
+        self.max_cookie_chunks = store.max_chunks if isinstance(store, CookieStore) else 1
         self.security_flags = "httponly; samesite=" + cookie_same_site
         if cookie_https_only:  # Secure flag can be used with HTTPS only
             self.security_flags += "; secure"
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, receive, self._wrap_lifespan_send(send))
+            return
+
         if scope["type"] not in ("http", "websocket"):  # pragma: no cover
             await self.app(scope, receive, send)
             return
 
-        connection = HTTPConnection(scope)
-        raw_session_id = connection.cookies.get(self.cookie_name)
+        raw_session_id = _get_cookie(scope, self.cookie_name)
+        chunk_count = 0  # number of cookie chunks sent by the client
+        if raw_session_id is None and self.max_cookie_chunks > 1:
+            raw_session_id, chunk_count = self._read_chunks(scope)
         # Reject values that contain characters unsafe in HTTP headers to prevent
         # header injection if the session_id is ever echoed into Set-Cookie.
         session_id = raw_session_id if raw_session_id and _is_safe_cookie_value(raw_session_id) else None
         handler = SessionHandler(
-            connection=connection,
+            connection=scope,
             session_id=session_id,
             store=self.store,
             serializer=self.serializer,
             lifetime=self.lifetime,
             encryptor=self.encryptor,
+            user_index=self.user_index,
+            user_id_key=self.user_id_key,
+            compressor=self.compressor,
         )
 
         scope["session"] = LoadGuard()
         scope["session_handler"] = handler
 
+        # start reading session data while the application is busy with its own work
+        if self.prefetch:
+            handler.prefetch()
+
         async def send_wrapper(message: Message) -> None:
             if message["type"] != "http.response.start":
                 await send(message)
@@ -122,16 +179,9 @@ class SessionMiddleware:
 
                 if not self.cookie_path or self.cookie_path and scope["path"].startswith(self.cookie_path):
                     headers = MutableHeaders(scope=message)
-                    header_parts = [
-                        f"{self.cookie_name}=''",
-                        f"path={path}",
-                        "expires=Thu, 01 Jan 1970 00:00:00 GMT",
-                        self.security_flags,
-                    ]
-                    if self.cookie_domain:
-                        header_parts.append(f"domain={self.cookie_domain}")
-                    header_value = "; ".join(header_parts)
-                    headers.append("Set-Cookie", header_value)
+                    headers.append("Set-Cookie", self._build_expired_cookie(self.cookie_name, path))
+                    for index in range(chunk_count):
+                        headers.append("Set-Cookie", self._build_expired_cookie(f"{self.cookie_name}.{index}", path))
                     await handler.destroy()
                 await send(message)
                 return
@@ -147,30 +197,125 @@ class SessionMiddleware:
                     remaining_time = self.lifetime
                 else:
                     # non-rolling strategy reuses initial expiration date
-                    remaining_time = get_session_remaining_seconds(connection)
+                    remaining_time = handler.remaining_seconds
 
-            # persist session data
-            session_id = await handler.save(remaining_time)
+            # persist session data, unchanged sessions only get their expiry extended when needed
+            if handler.is_modified:
+                session_id = await handler.save(remaining_time)
+            elif self.rolling or self.lifetime == 0:
+                session_id = await handler.touch(remaining_time)
+            else:
+                session_id = handler.session_id
 
             headers = MutableHeaders(scope=message)
-            header_parts = [
-                f"{self.cookie_name}={session_id}",
-                f"path={path}",
-            ]
+            value = str(session_id)
+            if self.max_cookie_chunks == 1 or len(value) <= self.cookie_chunk_size:
+                headers.append("set-cookie", self._build_cookie(self.cookie_name, value, path, remaining_time))
+                stale_chunks = range(chunk_count)
+            else:
+                chunks = [
+                    value[offset : offset + self.cookie_chunk_size]
+                    for offset in range(0, len(value), self.cookie_chunk_size)
+                ]
+                for index, chunk in enumerate(chunks):
+                    cookie = self._build_cookie(f"{self.cookie_name}.{index}", chunk, path, remaining_time)
+                    headers.append("set-cookie", cookie)
+                if chunk_count == 0 and raw_session_id is not None:  # the session was stored in one cookie
+                    headers.append("set-cookie", self._build_expired_cookie(self.cookie_name, path))
+                stale_chunks = range(len(chunks), chunk_count)
+
+            # the session became smaller, remove chunks that are not used anymore
+            for index in stale_chunks:
+                headers.append("set-cookie", self._build_expired_cookie(f"{self.cookie_name}.{index}", path))
 
-            if self.lifetime > 0:  # always send max-age for non-session scoped cookie
-                header_parts.append(f"max-age={remaining_time}")
+            await send(message)
 
-            if self.cookie_domain:
-                header_parts.append(f"domain={self.cookie_domain}")
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            handler.cancel_prefetch()
+
+    def _read_chunks(self, scope: Scope) -> tuple[str | None, int]:
+        chunks: list[str] = []
+        for index in range(self.max_cookie_chunks):
+            chunk = _get_cookie(scope, f"{self.cookie_name}.{index}")
+            if chunk is None:
+                break
+            chunks.append(chunk)
+        return "".join(chunks) or None, len(chunks)
+
+    def _build_cookie(self, name: str, value: str, path: str, remaining_time: int) -> str:
+        header_parts = [f"{name}={value}", f"path={path}"]
+        if self.lifetime > 0:  # always send max-age for non-session scoped cookie
+            header_parts.append(f"max-age={remaining_time}")
+
+        if self.cookie_domain:
+            header_parts.append(f"domain={self.cookie_domain}")
+
+        header_parts.append(self.security_flags)
+        return "; ".join(header_parts)
+
+    def _build_expired_cookie(self, name: str, path: str) -> str:
+        header_parts = [f"{name}=''", f"path={path}", "expires=Thu, 01 Jan 1970 00:00:00 GMT", self.security_flags]
+        if self.cookie_domain:
+            header_parts.append(f"domain={self.cookie_domain}")
+        return "; ".join(header_parts)
+
+    def _wrap_lifespan_send(self, send: Send) -> Send:
+        async def lifespan_send(message: Message) -> None:
+            # let the store flush pending data before the server exits
+            if message["type"] == "lifespan.shutdown.complete":
+                await self.store.close()
+            await send(message)
 
-            header_parts.append(self.security_flags)
-            header_value = "; ".join(header_parts)
-            headers.append("set-cookie", header_value)
+        return lifespan_send
 
-            await send(message)
 
-        await self.app(scope, receive, send_wrapper)
+class PathMatcher:
+    """
+    Tests URL path against a list of patterns. Like `re.match`, patterns match at the beginning of the path.
+
+    Plain string patterns are looked up in a prefix tree, regular expressions are merged into a single one.
+    Patterns with groups or custom flags cannot be merged and are tested one by one.
+    """
+
+    def __init__(self, patterns: typing.Iterable[str | re.Pattern[str]]) -> None:
+        self._prefix_tree: dict[str, typing.Any] = {}
+        self._patterns: list[re.Pattern[str]] = []
+        mergeable: list[str] = []
+        for pattern in patterns:
+            if isinstance(pattern, str) and not _REGEX_SPECIAL_CHARS.intersection(pattern):
+                self._add_prefix(pattern)
+                continue
+
+            compiled = re.compile(pattern)
+            if compiled.groups or compiled.flags != re.UNICODE:
+                self._patterns.append(compiled)
+            else:
+                mergeable.append(compiled.pattern)
+
+        if mergeable:
+            self._patterns.insert(0, re.compile("|".join(f"(?:{pattern})" for pattern in mergeable)))
+
+    def match(self, path: str) -> bool:
+        node = self._prefix_tree
+        if "" in node:
+            return True
+
+        for char in path:
+            node = node.get(char)  # type: ignore[assignment]
+            if node is None:
+                break
+            if "" in node:
+                return True
+
+        return any(pattern.match(path) for pattern in self._patterns)
+
+    def _add_prefix(self, prefix: str) -> None:
+        node = self._prefix_tree
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[""] = True  # end of prefix marker
 
 
 class SessionAutoloadMiddleware:
@@ -181,6 +326,7 @@ class SessionAutoloadMiddleware:
     ) -> None:
         self.app = app
         self.paths = paths or []
+        self.matcher = PathMatcher(self.paths)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] not in ("http", "websocket"):  # pragma: no cover
@@ -197,7 +343,4 @@ class SessionAutoloadMiddleware:
         if not self.paths:
             return True
 
-        for path in self.paths:
-            if re.match(path, connection.url.path):
-                return True
-        return False
+        return self.matcher.match(connection.scope["path"])
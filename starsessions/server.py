@@ -0,0 +1,158 @@
+"""
+Session server that shares an in-memory session store between processes over a Unix socket.
+
+Usage:
+> python -m starsessions.server /run/myapp/sessions.sock
+
+Applications connect to it with `starsessions.UnixSocketStore`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import os
+import signal
+import stat
+import typing
+
+from starsessions.stores.base import SessionStore
+from starsessions.stores.memory import InMemoryStore
+from starsessions.stores.unixsocket import (
+    OP_READ,
+    OP_REMOVE,
+    OP_TOUCH,
+    OP_WRITE,
+    REQUEST,
+    RESPONSE,
+    STATUS_ERROR,
+    STATUS_NOT_FOUND,
+    STATUS_OK,
+)
+
+
+class SessionServer:
+    """Serves session store operations to `UnixSocketStore` clients."""
+
+    def __init__(self, store: SessionStore | None = None, max_value_size: int = 1024 * 1024) -> None:
+        """
+        :param store: store to keep session data in, defaults to `InMemoryStore`
+        :param max_value_size: max size of session data, in bytes.
+                               The server drops the connection of a client that sends more.
+        """
+        self.store = store or InMemoryStore()
+        self.max_value_size = max_value_size
+        self._server: asyncio.AbstractServer | None = None
+        self._clients: dict[asyncio.StreamWriter, asyncio.Future[None]] = {}
+
+    async def start(self, path: str | os.PathLike[str], mode: int = 0o600) -> None:
+        """Start listening on a Unix socket. A socket left by a previous server is replaced."""
+        path = os.fspath(path)
+        with contextlib.suppress(FileNotFoundError):
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+
+        self._server = await asyncio.start_unix_server(self.handle, path)
+        os.chmod(path, mode)
+
+    async def stop(self) -> None:
+        """Stop listening and close client connections."""
+        if self._server is None:
+            return
+
+        self._server.close()
+        handlers = list(self._clients.values())
+        for writer in self._clients:
+            writer.close()
+        await asyncio.gather(*handlers)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests of a single client connection until it is closed."""
+        self._clients[writer] = asyncio.get_running_loop().create_future()
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(REQUEST.size)
+                except asyncio.IncompleteReadError:
+                    break
+
+                operation, lifetime, ttl, key_length, data_length = REQUEST.unpack(header)
+                if data_length > self.max_value_size:
+                    message = f"Session data is {data_length} bytes long, the limit is {self.max_value_size} bytes."
+                    writer.write(_response(STATUS_ERROR, message.encode()))
+                    break
+
+                body = await reader.readexactly(key_length + data_length)
+                session_id = body[:key_length].decode()
+                data = body[key_length:]
+                writer.write(await self._dispatch(operation, session_id, data, lifetime, ttl))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._clients.pop(writer).set_result(None)
+
+    async def _dispatch(self, operation: int, session_id: str, data: bytes, lifetime: int, ttl: int) -> bytes:
+        try:
+            if operation == OP_READ:
+                return _response(STATUS_OK, await self.store.read(session_id, lifetime=lifetime))
+            if operation == OP_WRITE:
+                await self.store.write(session_id, data, lifetime=lifetime, ttl=ttl)
+                return _response(STATUS_OK)
+            if operation == OP_TOUCH:
+                touched = await self.store.touch(session_id, lifetime=lifetime, ttl=ttl)
+                return _response(STATUS_OK if touched else STATUS_NOT_FOUND)
+            if operation == OP_REMOVE:
+                await self.store.remove(session_id)
+                return _response(STATUS_OK)
+            return _response(STATUS_ERROR, f"Unknown operation {operation}.".encode())
+        except Exception as ex:  # noqa: BLE001  # the error is sent to the client instead of breaking the connection
+            return _response(STATUS_ERROR, str(ex).encode())
+
+
+def _response(status: int, data: bytes = b"") -> bytes:
+    return RESPONSE.pack(status, len(data)) + data
+
+
+async def serve(args: argparse.Namespace) -> None:
+    store = InMemoryStore(
+        gc_ttl=args.gc_ttl,
+        sweep_interval=args.sweep_interval,
+        max_entries=args.max_entries,
+        max_bytes=args.max_bytes,
+    )
+    server = SessionServer(store, max_value_size=args.max_value_size)
+    await server.start(args.socket, mode=int(args.mode, 8))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+    await server.stop()
+    await store.close()
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(args.socket)
+
+
+def main(argv: typing.Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m starsessions.server", description="Share session data between processes over a Unix socket."
+    )
+    parser.add_argument("socket", help="path to the Unix socket to listen on")
+    parser.add_argument("--mode", default="600", help="socket file permissions, octal (default: 600)")
+    parser.add_argument("--gc-ttl", type=int, default=3600 * 24, help="TTL for sessions without expiration time")
+    parser.add_argument("--sweep-interval", type=float, help="remove expired sessions every this amount of seconds")
+    parser.add_argument("--max-entries", type=int, help="max number of stored sessions")
+    parser.add_argument("--max-bytes", type=int, help="max total size of stored session data")
+    parser.add_argument("--max-value-size", type=int, default=1024 * 1024, help="max size of a single session")
+    asyncio.run(serve(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
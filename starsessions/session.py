@@ -1,15 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import secrets
 import time
 import typing
 
 from starlette.requests import HTTPConnection
+from starlette.types import Scope
 
+from starsessions.compressors import Compressor, NoopCompressor
 from starsessions.encryptors import Encryptor
 from starsessions.exceptions import SessionNotLoaded
 from starsessions.serializers import Serializer
-from starsessions.stores import SessionStore
+from starsessions.stores import FieldStore, SessionStore, UserIndex
 from starsessions.types import SessionMetadata
 
 
@@ -70,11 +73,97 @@ def get_session_metadata(connection: HTTPConnection) -> SessionMetadata:
     return metadata
 
 
+def mark_session_modified(connection: HTTPConnection) -> None:
+    """
+    Force the session to be written to the store at the end of the request.
+
+    Changes are detected automatically, use this when the session must be persisted anyway.
+    """
+    get_session_handler(connection).mark_modified()
+
+
 def get_session_remaining_seconds(connection: HTTPConnection) -> int:
     """Get total seconds remaining before this session expires."""
-    now = time.time()
-    metadata = get_session_metadata(connection)
-    return int((metadata["created"] + metadata["lifetime"]) - now)
+    get_session_metadata(connection)  # raises if session is not loaded
+    return get_session_handler(connection).remaining_seconds
+
+
+async def revoke_user_sessions(store: SessionStore, user_index: UserIndex, user_id: typing.Any) -> list[str]:
+    """
+    Remove all sessions of the user, for example to log the user out on all devices.
+
+    Returns IDs of removed sessions.
+    """
+    session_ids = await user_index.pop_sessions(str(user_id))
+    await store.remove_many(session_ids)
+    return session_ids
+
+
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _has_mutable_values(data: dict[str, typing.Any]) -> bool:
+    return any(not isinstance(value, _IMMUTABLE_TYPES) for value in data.values())
+
+
+class SessionData(dict[str, typing.Any]):
+    """
+    A dictionary that tracks top-level modifications of session data, and names of changed keys.
+
+    In-place changes of nested values (like `session["cart"].append(item)`) are not tracked here,
+    the session handler detects them by comparing serialized data.
+    """
+
+    __slots__ = ("changed_keys", "modified")
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.modified = False
+        self.changed_keys: set[str] = set()
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        super().__setitem__(key, value)
+        self.modified = True
+        self.changed_keys.add(key)
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self.modified = True
+        self.changed_keys.add(key)
+
+    def __ior__(self, other: typing.Any) -> SessionData:  # type: ignore[override,misc]
+        self.update(other)
+        return self
+
+    def clear(self) -> None:
+        if self:
+            self.modified = True
+            self.changed_keys.update(self)
+        super().clear()
+
+    def pop(self, key: str, *args: typing.Any) -> typing.Any:
+        if key in self:
+            self.modified = True
+            self.changed_keys.add(key)
+        return super().pop(key, *args)
+
+    def popitem(self) -> tuple[str, typing.Any]:
+        item = super().popitem()
+        self.modified = True
+        self.changed_keys.add(item[0])
+        return item
+
+    def setdefault(self, key: str, default: typing.Any = None) -> typing.Any:
+        if key not in self:
+            self.modified = True
+            self.changed_keys.add(key)
+        return super().setdefault(key, default)
+
+    def update(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        values = dict(*args, **kwargs)
+        super().update(values)
+        self.modified = True
+        self.changed_keys.update(values)
 
 
 class SessionHandler:
@@ -86,23 +175,65 @@ class SessionHandler:
 
     def __init__(
         self,
-        connection: HTTPConnection,
+        connection: HTTPConnection | Scope,
         session_id: str | None,
         store: SessionStore,
         serializer: Serializer,
         encryptor: Encryptor,
         lifetime: int,
+        user_index: UserIndex | None = None,
+        user_id_key: str = "user_id",
+        compressor: Compressor | None = None,
     ) -> None:
-        self.connection = connection
+        # keep raw scope, HTTPConnection is created only when somebody asks for it
+        self.scope = connection.scope if isinstance(connection, HTTPConnection) else connection
+        self._connection = connection if isinstance(connection, HTTPConnection) else None
         self.session_id = session_id
         self.store = store
         self.serializer = serializer
         self.encryptor = encryptor
+        self.compressor = compressor or NoopCompressor()
         self.is_loaded = False
         self.initially_empty = False
         self.lifetime = lifetime
+        self.user_index = user_index
+        self.user_id_key = user_id_key
         self.metadata: SessionMetadata | None = None
         self._remove_data_for_session: str | None = None
+        self._modified = False
+        self._snapshot: bytes | None = None
+        self._field_snapshots: dict[str, bytes] = {}
+        self._stored_fields = False  # session has been read from a field store
+        self._prefetch: asyncio.Task[dict[str, typing.Any]] | None = None
+        self._indexed_user_id: str | None = None  # user the session is indexed for
+
+    @property
+    def connection(self) -> HTTPConnection:
+        if self._connection is None:
+            self._connection = HTTPConnection(self.scope)
+        return self._connection
+
+    @property
+    def remaining_seconds(self) -> int:
+        """Total seconds remaining before this session expires."""
+        assert self.metadata
+        return int((self.metadata["created"] + self.metadata["lifetime"]) - time.time())
+
+    def prefetch(self) -> None:
+        """Start reading session data in background. The result will be used by `load()`."""
+        if self.session_id and self._prefetch is None and not self.is_loaded:
+            self._prefetch = asyncio.create_task(self._read())
+
+    def cancel_prefetch(self) -> None:
+        """Cancel unused background read started by `prefetch()`."""
+        if self._prefetch is None:
+            return
+
+        if not self._prefetch.done():
+            self._prefetch.cancel()
+        elif not self._prefetch.cancelled():
+            self._prefetch.exception()  # mark exception as retrieved, nobody is interested in it
+        self._prefetch = None
 
     async def load(self) -> None:
         # don't refresh existing session, it may contain user data
@@ -110,13 +241,13 @@ class SessionHandler:
             return
 
         self.is_loaded = True
-        data = {}
+        data: dict[str, typing.Any] = {}
         if self.session_id:
-            raw = await self.store.read(session_id=self.session_id, lifetime=self.lifetime)
-            try:
-                data = self.serializer.deserialize(self.encryptor.decrypt(raw))
-            except Exception:
-                data = {}
+            if self._prefetch is not None:
+                prefetch, self._prefetch = self._prefetch, None
+                data = await prefetch
+            else:
+                data = await self._read()
 
         # read and merge metadata
         metadata = {
@@ -124,7 +255,11 @@ class SessionHandler:
             "created": time.time(),
             "last_access": time.time(),
         }
-        metadata.update(data.pop("__metadata__", {}))
+        if "__metadata__" in data:
+            metadata.update(data.pop("__metadata__"))
+        else:
+            # metadata has never been persisted, the session must be written to keep its creation time
+            self._modified = True
         metadata.update(
             {
                 "last_access": time.time(),
@@ -133,37 +268,187 @@ class SessionHandler:
         )  # force update
         self.metadata = metadata  # type: ignore[assignment]
 
-        self.connection.scope["session"] = {}
-        self.connection.session.update(data)
-
-        self.initially_empty = len(self.connection.session) == 0
+        self.scope["session"] = SessionData(data)
+        self.initially_empty = len(data) == 0
+        self._indexed_user_id = self._get_user_id()
+
+        # nested values can be changed in place without notifying SessionData,
+        # keep serialized copy to detect such changes on save
+        if isinstance(self.store, FieldStore):
+            self._field_snapshots = {
+                key: self.serializer.serialize({key: value})
+                for key, value in data.items()
+                if not isinstance(value, _IMMUTABLE_TYPES)
+            }
+        elif _has_mutable_values(data):
+            self._snapshot = self.serializer.serialize(data)
+
+    async def _read(self) -> dict[str, typing.Any]:
+        assert self.session_id
+        if isinstance(self.store, FieldStore):
+            return self._decode_fields(await self.store.read_fields(self.session_id, lifetime=self.lifetime))
+
+        raw = await self.store.read(session_id=self.session_id, lifetime=self.lifetime)
+        try:
+            return self._decode(raw)
+        except Exception:
+            return {}
+
+    def _encode(self, data: dict[str, typing.Any]) -> bytes:
+        return self.encryptor.encrypt(self.compressor.compress(self.serializer.serialize(data)))
+
+    def _decode(self, raw: bytes) -> dict[str, typing.Any]:
+        return self.serializer.deserialize(self.compressor.decompress(self.encryptor.decrypt(raw)))
+
+    def _decode_fields(self, fields: dict[str, bytes]) -> dict[str, typing.Any]:
+        # session written with `write()` or with unreadable fields is written as a whole on save
+        self._stored_fields = bool(fields) and FieldStore.BLOB_FIELD not in fields
+        data: dict[str, typing.Any] = {}
+        for raw in fields.values():
+            try:
+                # every field holds a dictionary, a single key for field stores or the whole session for blob writes
+                data.update(self._decode(raw))
+            except Exception:
+                self._stored_fields = False
+        return data
+
+    def _encode_field(self, key: str, value: typing.Any) -> bytes:
+        return self._encode({key: value})
+
+    def _get_changed_keys(self, session: SessionData) -> set[str]:
+        changed = set(session.changed_keys)
+        for key, snapshot in self._field_snapshots.items():
+            if key in session and self.serializer.serialize({key: session[key]}) != snapshot:
+                changed.add(key)
+        return changed
+
+    async def _save_fields(self, store: FieldStore, session_id: str, remaining_time: int) -> None:
+        session = self.scope["session"]
+        if isinstance(session, SessionData) and self._stored_fields and not self._remove_data_for_session:
+            changed = self._get_changed_keys(session)
+            fields = {key: self._encode_field(key, session[key]) for key in changed if key in session}
+            fields["__metadata__"] = self._encode_field("__metadata__", self.metadata)
+            removed = [key for key in changed if key not in session]
+            if await store.write_fields(
+                session_id, fields, removed, lifetime=self.lifetime, ttl=remaining_time, replace=False
+            ):
+                return
+
+        # new, regenerated or expired session is written as a whole
+        fields = {key: self._encode_field(key, value) for key, value in session.items()}
+        fields["__metadata__"] = self._encode_field("__metadata__", self.metadata)
+        await store.write_fields(session_id, fields, (), lifetime=self.lifetime, ttl=remaining_time, replace=True)
+        if self._remove_data_for_session:
+            await store.remove(self._remove_data_for_session)
+            self._remove_data_for_session = None
+        self._stored_fields = True
 
     async def save(self, remaining_time: int) -> str:
-        self.connection.session.update({"__metadata__": self.metadata})
-
-        self.session_id = await self.store.write(
-            session_id=self.session_id or generate_session_id(),
-            data=self.encryptor.encrypt(
-                self.serializer.serialize(self.connection.session),
-            ),
-            lifetime=self.lifetime,
-            ttl=remaining_time,
-        )
+        previous_session_id = self._remove_data_for_session or self.session_id
+        session_id = self.session_id or generate_session_id()
+        if isinstance(self.store, FieldStore):
+            await self._save_fields(self.store, session_id, remaining_time)
+            self.session_id = session_id
+        else:
+            await self._save_blob(session_id, remaining_time)
+
+        assert self.session_id
+        await self._update_user_index(previous_session_id, remaining_time)
+        return self.session_id
+
+    async def _save_blob(self, session_id: str, remaining_time: int) -> None:
+        data = {**self.scope["session"], "__metadata__": self.metadata}
+        raw = self._encode(data)
+
         if self._remove_data_for_session:
-            await self.store.remove(self._remove_data_for_session)
+            # session ID was regenerated, move data to the new ID
+            self.session_id = await self.store.rotate(
+                old_session_id=self._remove_data_for_session,
+                session_id=session_id,
+                data=raw,
+                lifetime=self.lifetime,
+                ttl=remaining_time,
+            )
             self._remove_data_for_session = None
-        return self.session_id
+        else:
+            self.session_id = await self.store.write(
+                session_id=session_id,
+                data=raw,
+                lifetime=self.lifetime,
+                ttl=remaining_time,
+            )
+
+    async def touch(self, remaining_time: int) -> str:
+        """Extend expiration time of unchanged session. The session is written again if the store cannot do that."""
+        if self.session_id and await self.store.touch(self.session_id, lifetime=self.lifetime, ttl=remaining_time):
+            await self._update_user_index(self.session_id, remaining_time)
+            return self.session_id
+        return await self.save(remaining_time)
 
     async def destroy(self) -> None:
         """Destroy session."""
         if self.session_id:
             await self.store.remove(self.session_id)
+        if self._remove_data_for_session:
+            await self.store.remove(self._remove_data_for_session)
+        if self.user_index is not None and self._indexed_user_id is not None:
+            for session_id in (self.session_id, self._remove_data_for_session):
+                if session_id:
+                    await self.user_index.discard(self._indexed_user_id, session_id)
+            self._indexed_user_id = None
+        self._remove_data_for_session = None
+
+    def _get_user_id(self) -> str | None:
+        user_id = self.scope["session"].get(self.user_id_key)
+        return None if user_id is None else str(user_id)
+
+    async def _update_user_index(self, previous_session_id: str | None, remaining_time: int) -> None:
+        # the expiration time of index entries follows the session, so the entry is updated on every write or touch
+        if self.user_index is None:
+            return
+
+        assert self.session_id
+        user_id = self._get_user_id()
+        indexed_user_id = self._indexed_user_id
+        if (
+            indexed_user_id is not None
+            and previous_session_id
+            and (indexed_user_id, previous_session_id)
+            != (
+                user_id,
+                self.session_id,
+            )
+        ):
+            await self.user_index.discard(indexed_user_id, previous_session_id)
+        if user_id is not None:
+            await self.user_index.add(user_id, self.session_id, ttl=remaining_time)
+        self._indexed_user_id = user_id
 
     @property
     def is_empty(self) -> bool:
-        return len(self.connection.session) == 0
+        return len(self.scope["session"]) == 0
+
+    @property
+    def is_modified(self) -> bool:
+        """Test if session data has been changed since it was loaded."""
+        if self._modified:
+            return True
+
+        session = self.scope["session"]
+        if not isinstance(session, SessionData) or session.modified:
+            return True
+
+        if self._snapshot is not None:
+            return self.serializer.serialize(session) != self._snapshot
+        if self._field_snapshots:
+            return bool(self._get_changed_keys(session))
+        return False
+
+    def mark_modified(self) -> None:
+        self._modified = True
 
     def regenerate_id(self) -> str:
+        self._modified = True
         self._remove_data_for_session = self.session_id
         self.session_id = generate_session_id()
         return self.session_id
@@ -1,5 +1,30 @@
-from .base import SessionStore
-from .cookie import CookieStore
-from .memory import InMemoryStore
+from .base import FieldStore, SessionStore, StoreWrapper, UserIndex
+from .caching import CachingStore
+from .coalescing import CoalescingStore
+from .cookie import CookieStore, EncryptedCookieStore
+from .file import FileStore
+from .memcached import MemcachedStore
+from .memory import InMemoryStore, InMemoryUserIndex
+from .sqlite import SQLiteStore
+from .tiered import TieredStore
+from .unixsocket import UnixSocketStore
+from .writebehind import WriteBehindStore
 
-__all__ = ["SessionStore", "InMemoryStore", "CookieStore"]
+__all__ = [
+    "SessionStore",
+    "StoreWrapper",
+    "FieldStore",
+    "InMemoryStore",
+    "CookieStore",
+    "EncryptedCookieStore",
+    "CachingStore",
+    "CoalescingStore",
+    "WriteBehindStore",
+    "UnixSocketStore",
+    "SQLiteStore",
+    "FileStore",
+    "TieredStore",
+    "MemcachedStore",
+    "UserIndex",
+    "InMemoryUserIndex",
+]
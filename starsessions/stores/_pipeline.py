@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import collections
+import typing
+
+_T = typing.TypeVar("_T")
+
+
+class PipelinedConnection(asyncio.Protocol, abc.ABC, typing.Generic[_T]):
+    """
+    A connection to a server that answers requests in order.
+
+    Requests are pipelined: they are sent without waiting for previous responses.
+    The server answers in the same order, so responses are matched to waiting requests first in, first out.
+    """
+
+    server_name = "server"
+
+    def __init__(self) -> None:
+        self.closed = False
+        self._transport: asyncio.Transport | None = None
+        self._buffer = bytearray()
+        self._waiters: collections.deque[asyncio.Future[_T]] = collections.deque()
+
+    async def request(self, data: bytes) -> _T:
+        """Send a request and return the response."""
+        if self.closed or self._transport is None:
+            raise ConnectionError(f"Connection to {self.server_name} is closed.")
+
+        future: asyncio.Future[_T] = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._transport.write(data)
+        return await future
+
+    def close(self, reason: Exception | None = None) -> None:
+        if self.closed:
+            return
+
+        self.closed = True
+        if self._transport is not None:
+            self._transport.close()
+        error = reason or ConnectionError(f"Connection to {self.server_name} is closed.")
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = typing.cast(asyncio.Transport, transport)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.close(ConnectionError(f"Connection was closed by {self.server_name}."))
+
+    def data_received(self, data: bytes) -> None:
+        # responses are resolved right here instead of a reader task to save an event loop iteration per request
+        self._buffer += data
+        while (response := self.parse_response(self._buffer)) is not None:
+            future = self._waiters.popleft()
+            if not future.done():  # the caller may be cancelled, its response is dropped then
+                future.set_result(response)
+
+    @abc.abstractmethod
+    def parse_response(self, buffer: bytearray) -> _T | None:
+        """Remove the first response from the buffer and return it, or return None if it is not complete yet."""
+        raise NotImplementedError
+
+
+class ConnectionPool(abc.ABC, typing.Generic[_T]):
+    """
+    A fixed number of connections to a server, requests are spread between them.
+
+    Connections are made on first use, and made again when they break, for example when the server is restarted.
+    """
+
+    def __init__(self, size: int) -> None:
+        self._connections: list[asyncio.Task[PipelinedConnection[_T]] | None] = [None] * size
+        self._next_connection = 0
+
+    async def request(self, data: bytes) -> _T:
+        """Send a request and return the response. Requests must be idempotent."""
+        connection = await self.get_connection()
+        try:
+            return await connection.request(data)
+        except ConnectionError:
+            # the request is retried once in case the server was restarted
+            connection = await self.get_connection()
+            return await connection.request(data)
+
+    async def get_connection(self) -> PipelinedConnection[_T]:
+        index = self._next_connection
+        self._next_connection = (index + 1) % len(self._connections)
+
+        loop = asyncio.get_running_loop()
+        task = self._connections[index]
+        if task is None or task.get_loop() is not loop or _is_broken(task):
+            task = loop.create_task(self.connect())
+            self._connections[index] = task
+
+        # the connection is shared by requests, cancelled request must not cancel connecting
+        return await asyncio.shield(task)
+
+    def close(self) -> None:
+        for index, task in enumerate(self._connections):
+            self._connections[index] = None
+            if task is None or task.get_loop() is not asyncio.get_running_loop():
+                continue
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                task.result().close()
+
+    @abc.abstractmethod
+    async def connect(self) -> PipelinedConnection[_T]:
+        raise NotImplementedError
+
+
+def _is_broken(task: asyncio.Task[PipelinedConnection[_T]]) -> bool:
+    if not task.done():
+        return False
+    return task.cancelled() or task.exception() is not None or task.result().closed
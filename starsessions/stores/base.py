@@ -1,4 +1,6 @@
 import abc
+import asyncio
+import typing
 
 
 class SessionStore(abc.ABC):  # pragma: no cover
@@ -32,6 +34,19 @@ class SessionStore(abc.ABC):  # pragma: no cover
         """
         raise NotImplementedError
 
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        """
+        Extend expiration time of session data without rewriting it.
+
+        Stores that cannot do that return False, in this case the caller writes the session data again.
+
+        :param session_id: ID associated with session
+        :param lifetime: session lifetime, in seconds
+        :param ttl: keep session data this amount of time, in seconds
+        :returns bool: True if expiration time has been extended
+        """
+        return False
+
     @abc.abstractmethod
     async def remove(self, session_id: str) -> None:
         """
@@ -40,3 +55,210 @@ class SessionStore(abc.ABC):  # pragma: no cover
         :param session_id: ID associated with session
         """
         raise NotImplementedError
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        """
+        Move session data to a new session ID, used when session ID is regenerated.
+
+        The default implementation writes data under the new ID and then removes the old one.
+        Stores that can do it atomically, or in a single round-trip, should override it.
+
+        :param old_session_id: current session ID, its data must be removed
+        :param session_id: new session ID
+        :param data: session data serialized to bytes
+        :param lifetime: session lifetime, in seconds
+        :param ttl: keep session data this amount of time, in seconds
+        :returns str: session ID
+        """
+        session_id = await self.write(session_id, data, lifetime=lifetime, ttl=ttl)
+        await self.remove(old_session_id)
+        return session_id
+
+    async def read_many(self, session_ids: typing.Sequence[str], lifetime: int) -> list[bytes]:
+        """
+        Read data of several sessions.
+
+        The default implementation reads sessions concurrently with `read`.
+        Stores that can read many keys in a single round-trip should override it.
+
+        :param session_ids: IDs of sessions to read
+        :param lifetime: session lifetime duration
+        :returns list: session data in the order of `session_ids`, empty bytes for missing sessions
+        """
+        return list(await asyncio.gather(*(self.read(session_id, lifetime) for session_id in session_ids)))
+
+    async def remove_many(self, session_ids: typing.Iterable[str]) -> None:
+        """
+        Remove data of several sessions.
+
+        The default implementation removes sessions concurrently with `remove`.
+
+        :param session_ids: IDs of sessions to remove
+        """
+        await asyncio.gather(*(self.remove(session_id) for session_id in session_ids))
+
+    def iter_sessions(self) -> typing.AsyncIterator[str]:
+        """
+        Iterate over IDs of stored sessions.
+
+        Sessions written or removed during iteration may be included or not. Stores that cannot list
+        their sessions raise NotImplementedError.
+
+        :returns AsyncIterator: session IDs
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot list stored sessions.")
+
+    async def close(self) -> None:
+        """
+        Flush pending operations and release resources.
+
+        Called by the middleware on application shutdown.
+        """
+
+
+class StoreWrapper(SessionStore):
+    """Base class for stores that add behavior on top of another store. Delegates all calls to the wrapped store."""
+
+    def __init__(self, store: SessionStore) -> None:
+        self.store = store
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        return await self.store.read(session_id, lifetime)
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        return await self.store.write(session_id, data, lifetime, ttl)
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        return await self.store.touch(session_id, lifetime, ttl)
+
+    async def remove(self, session_id: str) -> None:
+        await self.store.remove(session_id)
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        return await self.store.rotate(old_session_id, session_id, data, lifetime, ttl)
+
+    def iter_sessions(self) -> typing.AsyncIterator[str]:
+        # `read_many` and `remove_many` are not delegated, so they go through `read` and `remove` of the wrapper
+        return self.store.iter_sessions()
+
+    async def close(self) -> None:
+        await self.store.close()
+
+
+class FieldStore(SessionStore):
+    """
+    Base class for stores that keep every top-level session key in a separate field.
+
+    The session handler writes only the fields that have been changed since the session was loaded.
+    Data written with `write()` is kept as a single field named `BLOB_FIELD`. `read()` and `read_many()` return
+    this field only, use `read_fields()` and `read_many_fields()` to read sessions saved by the session handler.
+    """
+
+    BLOB_FIELD = "__data__"
+
+    @abc.abstractmethod
+    async def read_fields(self, session_id: str, lifetime: int) -> dict[str, bytes]:
+        """
+        Read all fields of the session.
+
+        :param session_id: ID associated with session
+        :param lifetime: session lifetime duration
+        :returns dict: field values by field names, empty if session does not exist
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def write_fields(
+        self,
+        session_id: str,
+        fields: dict[str, bytes],
+        removed: typing.Collection[str],
+        lifetime: int,
+        ttl: int,
+        replace: bool,
+    ) -> bool:
+        """
+        Set and remove session fields, and extend expiration time of the session.
+
+        When `replace` is True, all other fields are removed. Otherwise, only the given fields are changed
+        and nothing is written if the session does not exist, so an expired session is never partially restored.
+
+        :param session_id: ID associated with session
+        :param fields: field values to set, by field names
+        :param removed: names of fields to remove
+        :param lifetime: session lifetime, in seconds
+        :param ttl: keep session data this amount of time, in seconds
+        :param replace: replace all session fields with the given ones
+        :returns bool: True if session has been written
+        """
+        raise NotImplementedError
+
+    async def read_many_fields(self, session_ids: typing.Sequence[str], lifetime: int) -> list[dict[str, bytes]]:
+        """
+        Read all fields of several sessions.
+
+        The default implementation reads sessions concurrently with `read_fields`.
+
+        :param session_ids: IDs of sessions to read
+        :param lifetime: session lifetime duration
+        :returns list: fields of every session in the order of `session_ids`, empty for missing sessions
+        """
+        return list(await asyncio.gather(*(self.read_fields(session_id, lifetime) for session_id in session_ids)))
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        fields = await self.read_fields(session_id, lifetime)
+        return fields.get(self.BLOB_FIELD, b"")
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        fields = {self.BLOB_FIELD: data}
+        await self.write_fields(session_id, fields, removed=(), lifetime=lifetime, ttl=ttl, replace=True)
+        return session_id
+
+
+class UserIndex(abc.ABC):
+    """
+    Keeps IDs of sessions that belong to every user, so all sessions of a user can be found without scanning the store.
+
+    Entries expire together with sessions. The index is updated by the middleware when `user_index` is set.
+    """
+
+    @abc.abstractmethod
+    async def add(self, user_id: str, session_id: str, ttl: int) -> None:
+        """
+        Add session to the user's sessions, or extend its expiration time.
+
+        :param user_id: ID of the user
+        :param session_id: ID associated with session
+        :param ttl: remove the entry after this amount of time, in seconds
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def discard(self, user_id: str, session_id: str) -> None:
+        """
+        Remove session from the user's sessions.
+
+        :param user_id: ID of the user
+        :param session_id: ID associated with session
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_sessions(self, user_id: str) -> list[str]:
+        """
+        Get IDs of the user's sessions that have not expired.
+
+        :param user_id: ID of the user
+        :returns list: session IDs
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def pop_sessions(self, user_id: str) -> list[str]:
+        """
+        Get IDs of the user's sessions that have not expired and remove them from the index, in a single step.
+
+        :param user_id: ID of the user
+        :returns list: session IDs
+        """
+        raise NotImplementedError
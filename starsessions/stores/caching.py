@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import collections
+import time
+
+from starsessions.stores.base import SessionStore, StoreWrapper
+
+
+class CachingStore(StoreWrapper):
+    """
+    Keeps recently used session data in process memory in front of another store.
+
+    Writes and removals go to the wrapped store and update the cache. A cached entry is used for at most `ttl`
+    seconds, this is how long a process may serve stale data when the session was changed by another process.
+    """
+
+    def __init__(self, store: SessionStore, max_entries: int = 10_000, ttl: float = 5.0) -> None:
+        """
+        :param store: the store to cache
+        :param max_entries: max number of cached sessions, least recently used are evicted first
+        :param ttl: how long, in seconds, a cached entry can be used without reading the wrapped store
+        """
+        assert max_entries > 0, "Max entries must be a positive number."
+        assert ttl > 0, "Cache TTL must be a positive number."
+
+        super().__init__(store)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cache: collections.OrderedDict[str, tuple[bytes, float]] = collections.OrderedDict()
+        self._reads: dict[str, object] = {}
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        entry = self._cache.get(session_id)
+        if entry is not None:
+            data, valid_until = entry
+            if valid_until > time.monotonic():
+                self.hits += 1
+                self._cache.move_to_end(session_id)
+                return data
+            del self._cache[session_id]
+
+        self.misses += 1
+        token = self._reads[session_id] = object()
+        try:
+            data = await self.store.read(session_id, lifetime)
+        finally:
+            # the token is gone if the session was written or removed while reading, the result is outdated then
+            fresh = self._reads.get(session_id) is token
+            if fresh:
+                del self._reads[session_id]
+
+        if data and fresh:
+            self._put(session_id, data)
+        return data
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        self._forget(session_id)
+        session_id = await self.store.write(session_id, data, lifetime, ttl)
+        self._put(session_id, data)
+        return session_id
+
+    async def remove(self, session_id: str) -> None:
+        self._forget(session_id)
+        await self.store.remove(session_id)
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        self._forget(old_session_id)
+        self._forget(session_id)
+        session_id = await self.store.rotate(old_session_id, session_id, data, lifetime, ttl)
+        self._put(session_id, data)
+        return session_id
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._cache.clear()
+
+    def _put(self, session_id: str, data: bytes) -> None:
+        self._cache[session_id] = (data, time.monotonic() + self.ttl)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def _forget(self, session_id: str) -> None:
+        self._cache.pop(session_id, None)
+        self._reads.pop(session_id, None)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+
+from starsessions.stores.base import SessionStore, StoreWrapper
+
+
+class CoalescingStore(StoreWrapper):
+    """
+    Shares a single store read between concurrent requests for the same session.
+
+    Browsers send parallel requests with the same session cookie. Instead of reading the same key several times,
+    later requests wait for the read that is already in flight. Every request still decodes the data on its own,
+    so each one gets an independent copy of the session.
+    """
+
+    def __init__(self, store: SessionStore) -> None:
+        super().__init__(store)
+        self._reads: dict[tuple[str, int], asyncio.Task[bytes]] = {}
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        key = (session_id, lifetime)
+        task = self._reads.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.create_task(self.store.read(session_id, lifetime))
+            task.add_done_callback(functools.partial(self._forget, key))
+            self._reads[key] = task
+
+        # one caller being cancelled must not cancel the read for others
+        return await asyncio.shield(task)
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        self._invalidate(session_id)
+        return await self.store.write(session_id, data, lifetime, ttl)
+
+    async def remove(self, session_id: str) -> None:
+        self._invalidate(session_id)
+        await self.store.remove(session_id)
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        self._invalidate(old_session_id)
+        self._invalidate(session_id)
+        return await self.store.rotate(old_session_id, session_id, data, lifetime, ttl)
+
+    def _invalidate(self, session_id: str) -> None:
+        # reads started after this point must see new data, don't let them join older reads
+        for key in [key for key in self._reads if key[0] == session_id]:
+            del self._reads[key]
+
+    def _forget(self, key: tuple[str, int], task: asyncio.Task[bytes]) -> None:
+        if self._reads.get(key) is task:
+            del self._reads[key]
+        if not task.cancelled():
+            task.exception()  # waiters get the exception, don't let asyncio complain that nobody retrieved it
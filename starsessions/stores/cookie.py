@@ -1,19 +1,38 @@
 from __future__ import annotations
 
-from base64 import b64decode, b64encode
+import binascii
+import os
+import struct
+import time
+import typing
+from base64 import b64decode, b64encode, urlsafe_b64decode, urlsafe_b64encode
 
 from itsdangerous import BadSignature, TimestampSigner
 from starlette.datastructures import Secret
 
+from starsessions.exceptions import ImproperlyConfigured
 from starsessions.stores.base import SessionStore
 
+# cookie format version, followed by the expiration time as unix timestamp
+_HEADER = struct.Struct(">BQ")
+_VERSION = 1
+_NONCE_SIZE = 12
+_SESSION_ONLY_LIFETIME = 3600 * 24 * 30 * 12  # 1 year
+
 
 class CookieStore(SessionStore):
-    """Stores session data in the browser's cookie as a signed string."""
+    """
+    Stores session data in the browser's cookie as a signed string.
+
+    When `max_chunks` is greater than one, the middleware splits values longer than `max_size`
+    into several cookies: "session.0", "session.1", and so on.
+    """
 
-    def __init__(self, secret_key: str | Secret, max_size: int = 4096):
+    def __init__(self, secret_key: str | Secret, max_size: int = 4096, max_chunks: int = 1):
+        assert max_chunks > 0, "Number of cookie chunks must be a positive number."
         self._signer = TimestampSigner(str(secret_key))
         self.max_size = max_size
+        self.max_chunks = max_chunks
 
     async def read(self, session_id: str, lifetime: int) -> bytes:
         """A session_id is a signed session value."""
@@ -24,7 +43,7 @@ class CookieStore(SessionStore):
                 # but unsigning will always fail because the signature will always be expired.
                 # So fake lifetime just for TimestampSigner success.
                 # If you have a better solution please file an issue.
-                lifetime = 3600 * 24 * 30 * 12  # 1 year
+                lifetime = _SESSION_ONLY_LIFETIME
             data = self._signer.unsign(session_id, max_age=lifetime)
             return b64decode(data)
         except BadSignature:
@@ -34,12 +53,81 @@ class CookieStore(SessionStore):
         """The data is a session id in this storage."""
         encoded_data = b64encode(data)
         signed = self._signer.sign(encoded_data)
-        if len(signed) > self.max_size:
-            raise ValueError(
-                f"Session data too large: {len(signed)} bytes exceeds the {self.max_size}-byte cookie limit. "
-                "Store less data in the session or switch to a server-side store."
-            )
+        self._check_size(signed)
         return signed.decode("utf-8")
 
     async def remove(self, session_id: str) -> None:
         """Session data stored on client side - no way to remove it."""
+
+    def _check_size(self, value: bytes) -> None:
+        limit = self.max_size * self.max_chunks
+        if len(value) > limit:
+            raise ValueError(
+                f"Session data too large: {len(value)} bytes exceeds the {limit}-byte cookie limit. "
+                "Store less data in the session, increase max_chunks, or switch to a server-side store."
+            )
+
+
+class EncryptedCookieStore(CookieStore):
+    """
+    Stores session data in the browser's cookie, encrypted with an AEAD cipher.
+
+    The cookie is a single envelope: header with the expiration time, nonce and ciphertext, encoded with URL-safe base64.
+    The header is authenticated together with the data, so the expiration time cannot be changed by the client.
+    The store encrypts data itself, do not configure an encryptor for the middleware.
+    """
+
+    def __init__(self, key: bytes, max_size: int = 4096, algorithm: str = "aes-gcm", max_chunks: int = 1) -> None:
+        """
+        :param key: 32 bytes secret key, for example `os.urandom(32)`
+        :param max_size: maximum size of the cookie value
+        :param algorithm: "aes-gcm" or "chacha20-poly1305"
+        :param max_chunks: maximum number of cookies to split the value into
+        """
+        assert max_chunks > 0, "Number of cookie chunks must be a positive number."
+        try:
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+        except ImportError:  # pragma: no cover
+            raise ImportError("cryptography is required for EncryptedCookieStore")
+
+        if len(key) != 32:
+            raise ImproperlyConfigured("EncryptedCookieStore key must be 32 bytes long.")
+        ciphers: dict[str, typing.Callable[[bytes], typing.Any]] = {
+            "aes-gcm": AESGCM,
+            "chacha20-poly1305": ChaCha20Poly1305,
+        }
+        if algorithm not in ciphers:
+            raise ImproperlyConfigured(f"Unsupported algorithm {algorithm!r}, use one of: {', '.join(ciphers)}.")
+
+        self._cipher = ciphers[algorithm](key)
+        self.max_size = max_size
+        self.max_chunks = max_chunks
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        try:
+            envelope = urlsafe_b64decode(session_id + "=" * (-len(session_id) % 4))
+        except (binascii.Error, ValueError):
+            return b""
+
+        if len(envelope) < _HEADER.size + _NONCE_SIZE:
+            return b""
+        header = envelope[: _HEADER.size]
+        version, expires = _HEADER.unpack(header)
+        if version != _VERSION or expires < time.time():
+            return b""
+
+        from cryptography.exceptions import InvalidTag
+
+        nonce = envelope[_HEADER.size : _HEADER.size + _NONCE_SIZE]
+        try:
+            return typing.cast(bytes, self._cipher.decrypt(nonce, envelope[_HEADER.size + _NONCE_SIZE :], header))
+        except InvalidTag:  # the cookie was changed or encrypted with another key
+            return b""
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        expires = int(time.time()) + (ttl if lifetime else _SESSION_ONLY_LIFETIME)
+        header = _HEADER.pack(_VERSION, max(expires, 0))
+        nonce = os.urandom(_NONCE_SIZE)
+        value = urlsafe_b64encode(header + nonce + self._cipher.encrypt(nonce, data, header)).rstrip(b"=")
+        self._check_size(value)
+        return value.decode("ascii")
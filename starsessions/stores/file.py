@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import time
+import typing
+
+from starsessions.stores.base import SessionStore
+
+logger = logging.getLogger(__name__)
+
+_SHARDS = 256 * 256
+_TEMP_PREFIX = ".tmp-"
+_TEMP_MAX_AGE = 3600  # seconds, temporary files left by crashed writes are removed after that
+_CURSOR_FILE = ".gc-cursor"
+
+_T = typing.TypeVar("_T")
+
+
+class FileStore(SessionStore):
+    """
+    Stores every session in a file. Files are spread over two levels of 256 subdirectories by hash of session ID.
+
+    Expiration time is kept in the file modification time. Expired files are removed in the background,
+    a few subdirectories at a time. File operations run in a thread pool.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        gc_ttl: int = 3600 * 24,
+        workers: int = 4,
+        gc_interval: float | None = 60,
+        gc_shards: int = 1024,
+    ) -> None:
+        """
+        :param directory: directory to store session files in, created if it does not exist
+        :param gc_ttl: TTL for sessions that have no expiration time, in seconds
+        :param workers: number of threads that access files
+        :param gc_interval: remove expired files every this amount of seconds, None disables removal
+        :param gc_shards: number of subdirectories (out of 65536) to check for expired files at a time
+        """
+        assert workers > 0, "Number of workers must be a positive number."
+        assert 0 < gc_shards <= _SHARDS, f"Number of shards to collect must be between 1 and {_SHARDS}."
+
+        self.directory = os.fspath(directory)
+        self.gc_ttl = gc_ttl
+        self.workers = workers
+        self.gc_interval = gc_interval
+        self.gc_shards = gc_shards
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._collector: asyncio.Task[None] | None = None
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        return await self._run(self._read, self._get_path(session_id))
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        await self._run(self._write, self._get_path(session_id), data, self._get_expires(ttl))
+        return session_id
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        return await self._run(self._touch, self._get_path(session_id), self._get_expires(ttl))
+
+    async def remove(self, session_id: str) -> None:
+        await self._run(self._remove, self._get_path(session_id))
+
+    async def close(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown)
+
+    async def _run(self, fn: typing.Callable[..., _T], *args: typing.Any) -> _T:
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="starsessions-file")
+
+        loop = asyncio.get_running_loop()
+        if self.gc_interval is not None and (self._collector is None or self._collector.get_loop() is not loop):
+            self._collector = loop.create_task(self._collect(self.gc_interval))
+
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def _get_path(self, session_id: str) -> str:
+        # hashed name spreads files evenly and never lets session ID escape the directory
+        name = hashlib.sha256(session_id.encode()).hexdigest()
+        return os.path.join(self.directory, name[:2], name[2:4], name)
+
+    def _get_expires(self, ttl: int) -> float:
+        effective_ttl = ttl if ttl > 0 else self.gc_ttl
+        return time.time() + effective_ttl
+
+    def _read(self, path: str) -> bytes:
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_mtime < time.time():
+                    return b""
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    def _write(self, path: str, data: bytes, expires: float) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # readers see either the old or the new file, never a partially written one
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=_TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.utime(temp_path, (expires, expires))
+            os.replace(temp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temp_path)
+            raise
+
+    def _touch(self, path: str, expires: float) -> bool:
+        try:
+            if os.stat(path).st_mtime < time.time():
+                return False
+            os.utime(path, (expires, expires))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _remove(self, path: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
+    async def _collect(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            assert self._executor is not None
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._collect_shards, self.gc_shards)
+            except OSError:
+                logger.exception("Failed to remove expired sessions from %s.", self.directory)
+
+    def _collect_shards(self, count: int) -> None:
+        """Remove expired files from the next `count` subdirectories. The position is saved between runs."""
+        cursor_path = os.path.join(self.directory, _CURSOR_FILE)
+        try:
+            with open(cursor_path) as f:
+                cursor = int(f.read()) % _SHARDS
+        except (OSError, ValueError):
+            cursor = 0
+
+        now = time.time()
+        for shard in range(cursor, cursor + count):
+            shard %= _SHARDS
+            self._collect_shard(os.path.join(self.directory, f"{shard >> 8:02x}", f"{shard & 0xFF:02x}"), now)
+        # cursor files of collections that crashed before renaming them
+        self._collect_shard(self.directory, now, temporary_only=True)
+
+        # several processes may collect the same directory, they continue from where any of them stopped
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=_TEMP_PREFIX)
+        with os.fdopen(fd, "w") as f:
+            f.write(str((cursor + count) % _SHARDS))
+        os.replace(temp_path, cursor_path)
+
+    def _collect_shard(self, directory: str, now: float, temporary_only: bool = False) -> None:
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+
+        for entry in entries:
+            try:
+                if entry.name.startswith(_TEMP_PREFIX):
+                    if entry.stat().st_mtime < now - _TEMP_MAX_AGE:
+                        os.unlink(entry.path)
+                elif not temporary_only and entry.stat().st_mtime < now:
+                    self._remove_expired(entry.path, now)
+            except FileNotFoundError:
+                continue
+
+    def _remove_expired(self, path: str, now: float) -> None:
+        # a write may replace the file at any moment, so the file is moved away before it is checked again
+        temp_path = os.path.join(os.path.dirname(path), _TEMP_PREFIX + os.urandom(8).hex())
+        os.rename(path, temp_path)
+        try:
+            if os.stat(temp_path).st_mtime >= now:
+                # written since the directory was listed, put it back unless it has been written once more
+                with contextlib.suppress(FileExistsError):
+                    os.link(temp_path, path)
+        finally:
+            os.unlink(temp_path)
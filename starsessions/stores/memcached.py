@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import re
+import struct
+import time
+import typing
+
+from starsessions.exceptions import ImproperlyConfigured, SessionError
+from starsessions.stores._pipeline import ConnectionPool, PipelinedConnection
+from starsessions.stores.base import SessionStore
+
+# memcached treats expiration times longer than 30 days as unix timestamps
+_MAX_RELATIVE_TTL = 3600 * 24 * 30
+_POINTS_PER_SERVER = 160
+_KEY_RE = re.compile(rb"[\x21-\x7e]{1,250}")
+
+
+class _Connection(PipelinedConnection[tuple[bytes, bytes]]):
+    """A connection to a memcached server speaking the meta text protocol, responses are status line and value."""
+
+    server_name = "memcached"
+
+    def parse_response(self, buffer: bytearray) -> tuple[bytes, bytes] | None:
+        line_end = buffer.find(b"\r\n")
+        if line_end < 0:
+            return None
+
+        line = bytes(buffer[:line_end])
+        if line.startswith(b"VA "):
+            # value response: "VA <size> <flags>\r\n<data>\r\n"
+            size = int(line.split(b" ", 2)[1])
+            end = line_end + 2 + size + 2
+            if len(buffer) < end:
+                return None
+            value = bytes(buffer[line_end + 2 : end - 2])
+        else:
+            end = line_end + 2
+            value = b""
+
+        del buffer[:end]
+        return line, value
+
+
+class _Server(ConnectionPool[tuple[bytes, bytes]]):
+    """A pool of connections to a single memcached server."""
+
+    def __init__(self, host: str, port: int, pool_size: int) -> None:
+        super().__init__(pool_size)
+        self.host = host
+        self.port = port
+
+    async def connect(self) -> _Connection:
+        _, connection = await asyncio.get_running_loop().create_connection(_Connection, self.host, self.port)
+        return connection
+
+
+def _parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ImproperlyConfigured(f"Invalid memcached server address {address!r}, expected 'host:port'.")
+    return host.strip("[]"), int(port)
+
+
+def _hash(value: bytes) -> bytes:
+    return hashlib.md5(value, usedforsecurity=False).digest()
+
+
+class MemcachedStore(SessionStore):
+    """
+    Stores session data in memcached servers.
+
+    Sessions are spread between servers with consistent hashing (ketama), so adding or removing a server
+    moves only the sessions of that server. Every server has a pool of connections that pipeline requests.
+    """
+
+    def __init__(
+        self,
+        servers: typing.Sequence[str] = ("127.0.0.1:11211",),
+        prefix: str = "starsessions.",
+        gc_ttl: int = 3600 * 24 * 30,
+        pool_size: int = 2,
+    ) -> None:
+        """
+        :param servers: addresses of memcached servers, as "host:port"
+        :param prefix: prefix of memcached keys
+        :param gc_ttl: TTL for sessions that have no expiration time
+        :param pool_size: number of connections to each server
+        """
+        if not servers:
+            raise ImproperlyConfigured("At least one memcached server is required.")
+        assert pool_size > 0, "Pool size must be a positive number."
+
+        self.prefix = prefix
+        self.gc_ttl = gc_ttl
+        self.servers = [_Server(*_parse_address(address), pool_size=pool_size) for address in servers]
+
+        points: list[tuple[int, int]] = []
+        for index, server in enumerate(self.servers):
+            for group in range(_POINTS_PER_SERVER // 4):
+                digest = _hash(f"{server.host}:{server.port}-{group}".encode())
+                points.extend((point, index) for point in struct.unpack("<4I", digest))
+        points.sort()
+        self._ring_points = [point for point, _ in points]
+        self._ring_servers = [index for _, index in points]
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        key = self._get_key(session_id)
+        status, value = await self._request(key, b"mg " + key + b" v\r\n")
+        if status.startswith(b"VA "):
+            return value
+        if status == b"EN":
+            return b""
+        raise _error(status)
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        key = self._get_key(session_id)
+        command = b"ms %s %d T%d\r\n%s\r\n" % (key, len(data), self._get_ttl(lifetime, ttl), data)
+        status, _ = await self._request(key, command)
+        if status != b"HD":
+            raise _error(status)
+        return session_id
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        key = self._get_key(session_id)
+        # meta get without the value flag updates the expiration time only
+        status, _ = await self._request(key, b"mg %s T%d\r\n" % (key, self._get_ttl(lifetime, ttl)))
+        if status not in (b"HD", b"EN"):
+            raise _error(status)
+        return status == b"HD"
+
+    async def remove(self, session_id: str) -> None:
+        key = self._get_key(session_id)
+        status, _ = await self._request(key, b"md " + key + b"\r\n")
+        if status not in (b"HD", b"NF"):
+            raise _error(status)
+
+    async def close(self) -> None:
+        for server in self.servers:
+            server.close()
+
+    def _get_key(self, session_id: str) -> bytes:
+        key = (self.prefix + session_id).encode()
+        if _KEY_RE.fullmatch(key):
+            return key
+        # session ID comes from the cookie, it must not break the protocol or exceed the key length limit
+        return (self.prefix + hashlib.sha256(key).hexdigest()).encode()
+
+    def _get_ttl(self, lifetime: int, ttl: int) -> int:
+        if lifetime == 0:
+            # we cannot know the final duration of a session-only session
+            ttl = self.gc_ttl
+
+        ttl = max(1, ttl)
+        if ttl > _MAX_RELATIVE_TTL:
+            return int(time.time()) + ttl
+        return ttl
+
+    def _get_server(self, key: bytes) -> _Server:
+        if len(self.servers) == 1:
+            return self.servers[0]
+
+        (point,) = struct.unpack_from("<I", _hash(key))
+        position = bisect.bisect_left(self._ring_points, point) % len(self._ring_points)
+        return self.servers[self._ring_servers[position]]
+
+    async def _request(self, key: bytes, command: bytes) -> tuple[bytes, bytes]:
+        # all commands are idempotent, so the pool may retry them
+        return await self._get_server(key).request(command)
+
+
+def _error(status: bytes) -> SessionError:
+    return SessionError(f"Memcached error: {status.decode(errors='replace')}")
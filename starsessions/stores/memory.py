@@ -1,47 +1,260 @@
 from __future__ import annotations
 
-import dataclasses
+import asyncio
+import collections
+import heapq
+import re
 import time
+import typing
 
-from starsessions.stores.base import SessionStore
+from starsessions.stores.base import SessionStore, UserIndex
+
+_HEX_SESSION_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+Key = typing.Union[str, bytes]
 
 
-@dataclasses.dataclass
 class Record:
-    expires: int
-    value: bytes
+    """Stored session. Records are ordered by expiration time so they can be kept in a heap."""
+
+    __slots__ = ("expires", "key", "value")
+
+    def __init__(self, key: Key, expires: int, value: bytes) -> None:
+        self.key = key
+        self.expires = expires
+        self.value = value
+
+    def __lt__(self, other: Record) -> bool:
+        return self.expires < other.expires
+
+
+def _to_key(session_id: str) -> Key:
+    # default session IDs are 32 hex chars, storing them as 16 raw bytes halves the memory used by keys
+    if _HEX_SESSION_ID_RE.fullmatch(session_id):
+        return bytes.fromhex(session_id)
+    return session_id
+
+
+def _from_key(key: Key) -> str:
+    return key.hex() if isinstance(key, bytes) else key
 
 
 class InMemoryStore(SessionStore):
-    """Stores session data in a dictionary."""
+    """
+    Stores session data in a dictionary.
+
+    Session IDs generated by starsessions are kept as 16-byte keys, other IDs are kept as is.
+
+    When `max_entries` or `max_bytes` is set, least recently used sessions are evicted to stay within the limits.
+    """
+
+    def __init__(
+        self,
+        gc_ttl: int = 3600 * 24,
+        sweep_interval: float | None = None,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        """
+        :param gc_ttl: TTL for sessions that have no expiration time, in seconds
+        :param sweep_interval: remove expired sessions in a background task every this amount of seconds
+                               instead of doing it on write
+        :param max_entries: max number of stored sessions
+        :param max_bytes: max total size of stored session data, in bytes
+        """
+        assert max_entries is None or max_entries > 0, "Max entries must be a positive number."
+        assert max_bytes is None or max_bytes > 0, "Max bytes must be a positive number."
 
-    def __init__(self, gc_ttl: int = 3600 * 24) -> None:
-        self.data: dict[str, Record] = {}
         self.gc_ttl = gc_ttl
+        self.sweep_interval = sweep_interval
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+
+        # bounded store keeps sessions in least recently used order
+        self._lru: collections.OrderedDict[Key, Record] | None = None
+        if max_entries is not None or max_bytes is not None:
+            self._lru = collections.OrderedDict()
+        self.data: dict[Key, Record] = self._lru if self._lru is not None else {}
+        # records ordered by expiration time.
+        # Records are not removed when they are replaced or deleted, they are skipped on eviction instead.
+        self._expiry_heap: list[Record] = []
+        self._sweeper: asyncio.Task[None] | None = None
 
     async def read(self, session_id: str, lifetime: int) -> bytes:
-        value = self.data.get(session_id)
-        if value is None:
+        key = _to_key(session_id)
+        record = self.data.get(key)
+        if record is None:
             return b""
 
-        if value.expires < time.time_ns():
-            self.data.pop(session_id, None)
+        if record.expires < time.time_ns():
+            self._delete(key)
             return b""
 
-        return value.value
+        if self._lru is not None:
+            self._lru.move_to_end(key)
+        return record.value
 
     async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
-        self._evict_expired()
-        effective_ttl = ttl if ttl > 0 else self.gc_ttl
-        self.data[session_id] = Record(expires=effective_ttl * 1_000_000_000 + time.time_ns(), value=data)
+        self._evict_expired_or_schedule()
+        self._set(_to_key(session_id), self._get_expires(ttl), data)
         return session_id
 
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        key = _to_key(session_id)
+        record = self.data.get(key)
+        if record is None or record.expires < time.time_ns():
+            return False
+
+        self._set(key, self._get_expires(ttl), record.value)
+        return True
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        self._evict_expired_or_schedule()
+        self._delete(_to_key(old_session_id))
+        self._set(_to_key(session_id), self._get_expires(ttl), data)
+        return session_id
+
+    async def remove(self, session_id: str) -> None:
+        self._delete(_to_key(session_id))
+
+    async def read_many(self, session_ids: typing.Sequence[str], lifetime: int) -> list[bytes]:
+        return [await self.read(session_id, lifetime) for session_id in session_ids]
+
+    async def remove_many(self, session_ids: typing.Iterable[str]) -> None:
+        for session_id in session_ids:
+            self._delete(_to_key(session_id))
+
+    async def iter_sessions(self) -> typing.AsyncIterator[str]:
+        # the caller may change the store between iterations, iterate over a copy of keys
+        now = time.time_ns()
+        for key in list(self.data):
+            record = self.data.get(key)
+            if record is not None and record.expires >= now:
+                yield _from_key(key)
+
+    @property
+    def entry_count(self) -> int:
+        """Number of stored sessions."""
+        return len(self.data)
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    def _set(self, key: Key, expires: int, value: bytes) -> None:
+        record = Record(key, expires, value)
+        self._delete(key)
+        self.data[key] = record
+        self.total_bytes += len(value)
+        heapq.heappush(self._expiry_heap, record)
+
+        # updated and removed sessions leave outdated heap entries behind, rebuild the heap when they take over
+        if len(self._expiry_heap) > 2 * len(self.data) + 1024:
+            self._expiry_heap = list(self.data.values())
+            heapq.heapify(self._expiry_heap)
+
+        if self._lru is not None:
+            self._evict_least_recently_used(keep=key)
+
+    def _delete(self, key: Key) -> None:
+        record = self.data.pop(key, None)
+        if record is not None:
+            self.total_bytes -= len(record.value)
+
+    def _evict_least_recently_used(self, keep: Key) -> None:
+        assert self._lru is not None
+        while (self.max_entries is not None and len(self._lru) > self.max_entries) or (
+            self.max_bytes is not None and self.total_bytes > self.max_bytes
+        ):
+            key = next(iter(self._lru))
+            if key == keep:  # a single session larger than max_bytes is still stored
+                break
+            self._delete(key)
+            self.evictions += 1
+
+    def _get_expires(self, ttl: int) -> int:
+        effective_ttl = ttl if ttl > 0 else self.gc_ttl
+        return effective_ttl * 1_000_000_000 + time.time_ns()
+
+    def _evict_expired_or_schedule(self) -> None:
+        if self.sweep_interval is None:
+            self._evict_expired()
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._sweeper is None or self._sweeper.get_loop() is not loop:
+            self._sweeper = loop.create_task(self._sweep(self.sweep_interval))
+
     def _evict_expired(self) -> None:
         now = time.time_ns()
-        self.data = {k: v for k, v in self.data.items() if v.expires >= now}
+        heap = self._expiry_heap
+        while heap and heap[0].expires < now:
+            record = heapq.heappop(heap)
+            if self.data.get(record.key) is record:
+                self._delete(record.key)
 
-    async def remove(self, session_id: str) -> None:
-        try:
-            del self.data[session_id]
-        except KeyError:
-            pass
+    async def _sweep(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self._evict_expired()
+
+
+class InMemoryUserIndex(UserIndex):
+    """Keeps IDs of sessions of every user in a dictionary."""
+
+    def __init__(self, gc_ttl: int = 3600 * 24) -> None:
+        """
+        :param gc_ttl: TTL for sessions that have no expiration time, in seconds
+        """
+        self.gc_ttl = gc_ttl
+        # session IDs with expiration times, by user ID
+        self.data: dict[str, dict[str, int]] = {}
+        # users with times to remove their expired entries, one heap entry per user
+        self._expiry_heap: list[tuple[int, str]] = []
+        self._scheduled: set[str] = set()
+
+    async def add(self, user_id: str, session_id: str, ttl: int) -> None:
+        now = time.time_ns()
+        self._evict_expired(now)
+
+        effective_ttl = ttl if ttl > 0 else self.gc_ttl
+        expires = effective_ttl * 1_000_000_000 + now
+        self.data.setdefault(user_id, {})[session_id] = expires
+        if user_id not in self._scheduled:
+            self._scheduled.add(user_id)
+            heapq.heappush(self._expiry_heap, (expires, user_id))
+
+    async def discard(self, user_id: str, session_id: str) -> None:
+        sessions = self.data.get(user_id)
+        if sessions is not None:
+            sessions.pop(session_id, None)
+            if not sessions:
+                del self.data[user_id]
+
+    async def get_sessions(self, user_id: str) -> list[str]:
+        now = time.time_ns()
+        return [session_id for session_id, expires in self.data.get(user_id, {}).items() if expires >= now]
+
+    async def pop_sessions(self, user_id: str) -> list[str]:
+        session_ids = await self.get_sessions(user_id)
+        self.data.pop(user_id, None)
+        return session_ids
+
+    def _evict_expired(self, now: int) -> None:
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            _, user_id = heapq.heappop(heap)
+            sessions = self.data.get(user_id, {})
+            for session_id, expires in list(sessions.items()):
+                if expires < now:
+                    del sessions[session_id]
+
+            if sessions:
+                # check again when the next session of the user expires
+                heapq.heappush(heap, (min(sessions.values()), user_id))
+            else:
+                self.data.pop(user_id, None)
+                self._scheduled.discard(user_id)
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import collections
 import functools
+import itertools
+import re
+import time
 import typing
 import warnings
 
+from redis import exceptions
 from redis.asyncio.client import Redis
 
 from starsessions.exceptions import ImproperlyConfigured
-from starsessions.stores.base import SessionStore
+from starsessions.stores.base import FieldStore, SessionStore, UserIndex
+
+_T = typing.TypeVar("_T")
+
+# max number of keys in a single MGET or UNLINK command
+_BATCH_SIZE = 1000
 
 
 def prefix_factory(prefix: str, key: str) -> str:
@@ -23,16 +33,25 @@ class RedisStore(SessionStore):
         connection: Redis | None = None,
         prefix: typing.Callable[[str], str] | str = "starsessions.",
         gc_ttl: int = 3600 * 24 * 30,
+        replicas: typing.Sequence[Redis] = (),
+        primary_read_window: float = 0,
     ) -> None:
         """
         Initializes Redis session store. Either `url` or `connection` required. To namespace keys in Redis use `prefix`
         argument. It can be a string or callable that accepts a single string argument and returns new Redis key as
         string.
 
+        When `replicas` are given, reads are spread across them in turn and all changes go to `connection`.
+        A replica receives changes with a delay, so sessions changed by this process
+        in the last `primary_read_window` seconds are read from `connection`.
+        Sessions not found on a replica are read from `connection` again, they may have been written by another process.
+
         :param url:  Redis URL. Defaults to None.
         :param connection: aioredis connection. Defaults to None
         :param prefix: Redis key name prefix or factory.
         :param gc_ttl: TTL for sessions that have no expiration time
+        :param replicas: connections to read-only replicas of the primary server
+        :param primary_read_window: read sessions changed in the last this amount of seconds from the primary server
         """
         if not (url or connection):
             raise ImproperlyConfigured("Either 'url' or 'connection' arguments must be provided.")
@@ -52,22 +71,315 @@ class RedisStore(SessionStore):
             )
             self._connection = Redis.from_url(url)
 
+        self.replicas = list(replicas)
+        self.primary_read_window = primary_read_window
+        self._next_replica = itertools.cycle(self.replicas)
+        # session IDs with times until which they are read from the primary server, oldest first
+        self._recent_writes: collections.OrderedDict[str, float] = collections.OrderedDict()
+
     async def read(self, session_id: str, lifetime: int) -> bytes:
-        value: bytes = await self._connection.get(self.prefix(session_id))
+        key = self.prefix(session_id)
+        value = await self._read((session_id,), lambda connection: connection.get(key))
         if value is None:
             return b""
-        return value
+        return typing.cast(bytes, value)
 
     async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        self._track_write(session_id)
+        await self._connection.set(self.prefix(session_id), data, ex=self._get_ttl(lifetime, ttl))
+        return session_id
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        return bool(await self._connection.expire(self.prefix(session_id), self._get_ttl(lifetime, ttl)))
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        # write new and delete old key atomically in a single round-trip
+        self._track_write(session_id)
+        self._track_write(old_session_id)
+        async with self._connection.pipeline(transaction=True) as pipe:
+            pipe.set(self.prefix(session_id), data, ex=self._get_ttl(lifetime, ttl))
+            pipe.delete(self.prefix(old_session_id))
+            await pipe.execute()
+        return session_id
+
+    def _get_ttl(self, lifetime: int, ttl: int) -> int:
         if lifetime == 0:
             # Redis will fail for session-only cookies, as zero is not a valid expiry value.
             # We cannot know the final session duration so set here something close to reality.
             # FIXME: we want something better here
             ttl = self.gc_ttl
 
-        ttl = max(1, ttl)
-        await self._connection.set(self.prefix(session_id), data, ex=ttl)
-        return session_id
+        return max(1, ttl)
 
     async def remove(self, session_id: str) -> None:
+        self._track_write(session_id)
         await self._connection.delete(self.prefix(session_id))
+
+    async def read_many(self, session_ids: typing.Sequence[str], lifetime: int) -> list[bytes]:
+        keys = [self.prefix(session_id) for session_id in session_ids]
+
+        async def mget(connection: Redis, indexes: typing.Sequence[int]) -> list[bytes | None]:
+            async with connection.pipeline(transaction=False) as pipe:
+                for start in range(0, len(indexes), _BATCH_SIZE):
+                    pipe.mget([keys[index] for index in indexes[start : start + _BATCH_SIZE]])
+                return [value for values in await pipe.execute() for value in values]
+
+        return [value or b"" for value in await self._read_many(session_ids, mget)]
+
+    async def remove_many(self, session_ids: typing.Iterable[str]) -> None:
+        keys: list[str] = []
+        for session_id in session_ids:
+            self._track_write(session_id)
+            keys.append(self.prefix(session_id))
+
+        # UNLINK frees memory in background, so removing many large sessions does not block the server
+        async with self._connection.pipeline(transaction=False) as pipe:
+            for start in range(0, len(keys), _BATCH_SIZE):
+                pipe.unlink(*keys[start : start + _BATCH_SIZE])
+            await pipe.execute()
+
+    async def iter_sessions(self) -> typing.AsyncIterator[str]:
+        # SCAN does not block the server, but may return a key more than once
+        head, marker, tail = self.prefix("\0").partition("\0")
+        if not marker:
+            raise NotImplementedError("Cannot list sessions: the key prefix factory does not keep session ID in keys.")
+
+        pattern = _escape_pattern(head) + "*" + _escape_pattern(tail)
+        async for key in self._connection.scan_iter(match=pattern, count=_BATCH_SIZE):
+            name = _decode(key)
+            yield name[len(head) : len(name) - len(tail)]
+
+    def _track_write(self, session_id: str) -> None:
+        if not self.replicas or self.primary_read_window <= 0:
+            return
+
+        now = time.monotonic()
+        while self._recent_writes:
+            oldest_id, deadline = next(iter(self._recent_writes.items()))
+            if deadline > now:
+                break
+            del self._recent_writes[oldest_id]
+
+        self._recent_writes[session_id] = now + self.primary_read_window
+        self._recent_writes.move_to_end(session_id)
+
+    async def _read(
+        self, session_ids: typing.Iterable[str], command: typing.Callable[[Redis], typing.Awaitable[_T]]
+    ) -> _T:
+        """Run a read command on the next replica, or on the primary server if a session has been changed recently."""
+        if not self.replicas or any(self._is_recently_written(session_id) for session_id in session_ids):
+            return await command(self._connection)
+
+        try:
+            result = await command(next(self._next_replica))
+        except (exceptions.ConnectionError, exceptions.TimeoutError):
+            return await command(self._connection)  # the replica is down, the primary server has the same data
+
+        if not result:
+            # the replica may lag behind, the session may have been just created by another process
+            return await command(self._connection)
+        return result
+
+    async def _read_many(
+        self,
+        session_ids: typing.Sequence[str],
+        command: typing.Callable[[Redis, typing.Sequence[int]], typing.Awaitable[list[_T]]],
+    ) -> list[_T]:
+        """Like `_read`, but `command` reads sessions with the given indexes, missing ones are read from the primary."""
+        indexes = range(len(session_ids))
+        if not self.replicas or any(self._is_recently_written(session_id) for session_id in session_ids):
+            return await command(self._connection, indexes)
+
+        try:
+            values = await command(next(self._next_replica), indexes)
+        except (exceptions.ConnectionError, exceptions.TimeoutError):
+            return await command(self._connection, indexes)
+
+        missing = [index for index, value in enumerate(values) if not value]
+        if missing:
+            for index, value in zip(missing, await command(self._connection, missing)):
+                values[index] = value
+        return values
+
+    def _is_recently_written(self, session_id: str) -> bool:
+        deadline = self._recent_writes.get(session_id)
+        return deadline is not None and deadline > time.monotonic()
+
+
+def _escape_pattern(value: str) -> str:
+    return re.sub(r"([*?\[\]\\])", r"\\\1", value)
+
+
+# KEYS[1]: session key
+# ARGV: ttl, number of removed fields, removed field names, field name and value pairs
+_UPDATE_FIELDS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local removed = tonumber(ARGV[2])
+if removed > 0 then
+    redis.call('HDEL', KEYS[1], unpack(ARGV, 3, 2 + removed))
+end
+if #ARGV > 2 + removed then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 3 + removed))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class RedisHashStore(FieldStore, RedisStore):
+    """
+    Stores session data in a Redis hash, one field per top-level session key.
+
+    When a request changes a few keys of a large session, only these keys are sent to Redis.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        connection: Redis | None = None,
+        prefix: typing.Callable[[str], str] | str = "starsessions.",
+        gc_ttl: int = 3600 * 24 * 30,
+        replicas: typing.Sequence[Redis] = (),
+        primary_read_window: float = 0,
+    ) -> None:
+        super().__init__(
+            url=url,
+            connection=connection,
+            prefix=prefix,
+            gc_ttl=gc_ttl,
+            replicas=replicas,
+            primary_read_window=primary_read_window,
+        )
+        self._update_fields = self._connection.register_script(_UPDATE_FIELDS_SCRIPT)
+
+    async def read_fields(self, session_id: str, lifetime: int) -> dict[str, bytes]:
+        key = self.prefix(session_id)
+        fields = await self._read((session_id,), lambda connection: connection.hgetall(key))
+        return {typing.cast(bytes, name).decode(): typing.cast(bytes, value) for name, value in fields.items()}
+
+    async def write_fields(
+        self,
+        session_id: str,
+        fields: dict[str, bytes],
+        removed: typing.Collection[str],
+        lifetime: int,
+        ttl: int,
+        replace: bool,
+    ) -> bool:
+        key = self.prefix(session_id)
+        ttl = self._get_ttl(lifetime, ttl)
+        self._track_write(session_id)
+        if replace:
+            async with self._connection.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping=fields)  # type: ignore[arg-type]
+                pipe.expire(key, ttl)
+                await pipe.execute()
+            return True
+
+        # the session must not be restored partially if it has expired since it was read
+        args: list[str | bytes | int] = [ttl, len(removed), *removed]
+        for name, value in fields.items():
+            args.extend((name, value))
+        return bool(await self._update_fields(keys=[key], args=args))
+
+    async def read_many(self, session_ids: typing.Sequence[str], lifetime: int) -> list[bytes]:
+        keys = [self.prefix(session_id) for session_id in session_ids]
+
+        async def hget(connection: Redis, indexes: typing.Sequence[int]) -> list[bytes | None]:
+            async with connection.pipeline(transaction=False) as pipe:
+                for index in indexes:
+                    pipe.hget(keys[index], self.BLOB_FIELD)
+                return typing.cast("list[bytes | None]", await pipe.execute())
+
+        return [value or b"" for value in await self._read_many(session_ids, hget)]
+
+    async def read_many_fields(self, session_ids: typing.Sequence[str], lifetime: int) -> list[dict[str, bytes]]:
+        keys = [self.prefix(session_id) for session_id in session_ids]
+
+        async def hgetall(connection: Redis, indexes: typing.Sequence[int]) -> list[dict[bytes, bytes]]:
+            async with connection.pipeline(transaction=False) as pipe:
+                for index in indexes:
+                    pipe.hgetall(keys[index])
+                return typing.cast("list[dict[bytes, bytes]]", await pipe.execute())
+
+        return [
+            {name.decode(): value for name, value in fields.items()}
+            for fields in await self._read_many(session_ids, hgetall)
+        ]
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        key = self.prefix(session_id)
+        self._track_write(session_id)
+        self._track_write(old_session_id)
+        async with self._connection.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, self.BLOB_FIELD, data)
+            pipe.expire(key, self._get_ttl(lifetime, ttl))
+            pipe.delete(self.prefix(old_session_id))
+            await pipe.execute()
+        return session_id
+
+
+# KEYS[1]: user key
+# ARGV: current time, expiration time of the session, session ID
+_ADD_USER_SESSION_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1])
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+local last = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+redis.call('EXPIREAT', KEYS[1], math.ceil(tonumber(last[2])))
+"""
+
+
+class RedisUserIndex(UserIndex):
+    """
+    Keeps IDs of sessions of every user in a Redis sorted set scored by expiration time.
+
+    Expired entries are removed when the user gets a new session, the set expires with the last session of the user.
+    """
+
+    def __init__(
+        self,
+        connection: Redis,
+        prefix: typing.Callable[[str], str] | str = "starsessions-user:",
+        gc_ttl: int = 3600 * 24 * 30,
+    ) -> None:
+        """
+        :param connection: Redis connection
+        :param prefix: Redis key name prefix or factory, called with user ID.
+                       Keys must not overlap with session keys, or a session cookie could point to the index.
+        :param gc_ttl: TTL for sessions that have no expiration time
+        """
+        if isinstance(prefix, str):
+            prefix = functools.partial(prefix_factory, prefix)
+
+        self.gc_ttl = gc_ttl
+        self.prefix: typing.Callable[[str], str] = prefix
+        self._connection = connection
+        self._add = connection.register_script(_ADD_USER_SESSION_SCRIPT)
+
+    async def add(self, user_id: str, session_id: str, ttl: int) -> None:
+        now = time.time()
+        expires = now + (ttl if ttl > 0 else self.gc_ttl)
+        await self._add(keys=[self.prefix(user_id)], args=[now, expires, session_id])
+
+    async def discard(self, user_id: str, session_id: str) -> None:
+        await self._connection.zrem(self.prefix(user_id), session_id)
+
+    async def get_sessions(self, user_id: str) -> list[str]:
+        session_ids = await self._connection.zrangebyscore(self.prefix(user_id), time.time(), "+inf")
+        return [_decode(typing.cast(bytes, session_id)) for session_id in session_ids]
+
+    async def pop_sessions(self, user_id: str) -> list[str]:
+        key = self.prefix(user_id)
+        async with self._connection.pipeline(transaction=True) as pipe:
+            pipe.zrangebyscore(key, time.time(), "+inf")
+            pipe.delete(key)
+            session_ids, _ = await pipe.execute()
+        return [_decode(session_id) for session_id in session_ids]
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
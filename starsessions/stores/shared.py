@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import hashlib
+import mmap
+import os
+import secrets
+import struct
+import time
+import typing
+
+from starsessions.exceptions import ImproperlyConfigured
+from starsessions.stores.base import SessionStore
+
+_MAGIC = b"STSS"
+_VERSION = 1
+
+# magic, version, number of buckets, slots per bucket, max value size, hash key
+_FILE_HEADER = struct.Struct("<4sHIII16s")
+_FILE_HEADER_SIZE = 64
+
+# session ID digest, expiration time in nanoseconds (zero for free slot), value length
+_SLOT_HEADER = struct.Struct("<16sqI")
+
+
+class SharedMemoryStore(SessionStore):
+    """
+    Stores session data in a memory-mapped file shared by all worker processes on the host.
+
+    The file contains a fixed size hash table. A session is placed into one of the buckets by its ID,
+    each bucket has a fixed number of slots. When all slots of a bucket are in use,
+    the session that expires first is evicted. Buckets are locked with POSIX record locks,
+    so processes block each other only when they access the same bucket.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        capacity: int = 16384,
+        slots_per_bucket: int = 8,
+        max_value_size: int = 4096,
+        gc_ttl: int = 3600 * 24,
+    ) -> None:
+        """
+        All processes must use the same `capacity`, `slots_per_bucket` and `max_value_size` for the same file.
+
+        :param path: path to the file, created if it does not exist
+        :param capacity: max number of stored sessions, rounded up to a multiple of `slots_per_bucket`
+        :param slots_per_bucket: number of sessions that share a bucket
+        :param max_value_size: max size of session data, in bytes
+        :param gc_ttl: TTL for sessions that have no expiration time, in seconds
+        """
+        assert capacity > 0, "Capacity must be a positive number."
+        assert slots_per_bucket > 0, "Slots per bucket must be a positive number."
+        assert max_value_size > 0, "Max value size must be a positive number."
+
+        self.path = os.fspath(path)
+        self.gc_ttl = gc_ttl
+        self.max_value_size = max_value_size
+        self.slots_per_bucket = slots_per_bucket
+        self.bucket_count = -(-capacity // slots_per_bucket)
+        self.slot_size = _SLOT_HEADER.size + max_value_size
+        self.bucket_size = self.slot_size * slots_per_bucket
+        self.file_size = _FILE_HEADER_SIZE + self.bucket_size * self.bucket_count
+        self._open()
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        self._reopen()
+        digest, bucket = self._locate(session_id)
+        with self._lock(bucket, fcntl.LOCK_SH):
+            offset = self._find(bucket, digest)
+            if offset == -1:
+                return b""
+            _, _, length = _SLOT_HEADER.unpack_from(self._mmap, offset)
+            start = offset + _SLOT_HEADER.size
+            return self._mmap[start : start + length]
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        if len(data) > self.max_value_size:
+            raise ValueError(
+                f"Session data is {len(data)} bytes long, which exceeds max_value_size of {self.max_value_size} bytes."
+            )
+
+        self._reopen()
+        digest, bucket = self._locate(session_id)
+        with self._lock(bucket, fcntl.LOCK_EX):
+            offset = self._find_free(bucket, digest)
+            start = offset + _SLOT_HEADER.size
+            self._mmap[start : start + len(data)] = data
+            _SLOT_HEADER.pack_into(self._mmap, offset, digest, self._get_expires(ttl), len(data))
+        return session_id
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        self._reopen()
+        digest, bucket = self._locate(session_id)
+        with self._lock(bucket, fcntl.LOCK_EX):
+            offset = self._find(bucket, digest)
+            if offset == -1:
+                return False
+            _, _, length = _SLOT_HEADER.unpack_from(self._mmap, offset)
+            _SLOT_HEADER.pack_into(self._mmap, offset, digest, self._get_expires(ttl), length)
+            return True
+
+    async def remove(self, session_id: str) -> None:
+        self._reopen()
+        digest, bucket = self._locate(session_id)
+        with self._lock(bucket, fcntl.LOCK_EX):
+            offset = self._find(bucket, digest)
+            if offset != -1:
+                _SLOT_HEADER.pack_into(self._mmap, offset, b"", 0, 0)
+
+    async def close(self) -> None:
+        if not self._mmap.closed:
+            self._mmap.close()
+            os.close(self._fd)
+
+    def _open(self) -> None:
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._hash_key = self._init_file(self.file_size)
+            self._mmap = mmap.mmap(self._fd, self.file_size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _reopen(self) -> None:
+        # the middleware closes the store on application shutdown, the application may be started again
+        if self._mmap.closed:
+            self._open()
+
+    def _init_file(self, file_size: int) -> bytes:
+        # the first process creates the table, others check that they use the same layout
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _FILE_HEADER_SIZE, 0)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                hash_key = secrets.token_bytes(16)
+                header = _FILE_HEADER.pack(
+                    _MAGIC, _VERSION, self.bucket_count, self.slots_per_bucket, self.max_value_size, hash_key
+                )
+                os.ftruncate(self._fd, file_size)
+                os.pwrite(self._fd, header, 0)
+                return hash_key
+
+            header = os.pread(self._fd, _FILE_HEADER.size, 0)
+            if len(header) != _FILE_HEADER.size or not header.startswith(_MAGIC):
+                raise ImproperlyConfigured(f"File {self.path!r} is not a session store file.")
+
+            _, version, bucket_count, slots_per_bucket, max_value_size, hash_key = _FILE_HEADER.unpack(header)
+            if version != _VERSION:
+                raise ImproperlyConfigured(f"File {self.path!r} was created by an unsupported version of the store.")
+            if (bucket_count, slots_per_bucket, max_value_size) != (
+                self.bucket_count,
+                self.slots_per_bucket,
+                self.max_value_size,
+            ):
+                raise ImproperlyConfigured(
+                    f"File {self.path!r} was created with different capacity, slots_per_bucket or max_value_size."
+                )
+            return typing.cast(bytes, hash_key)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _FILE_HEADER_SIZE, 0)
+
+    def _locate(self, session_id: str) -> tuple[bytes, int]:
+        # keyed hash prevents choosing session IDs that fall into the same bucket
+        digest = hashlib.blake2b(session_id.encode(), digest_size=16, key=self._hash_key).digest()
+        return digest, int.from_bytes(digest[:8], "little") % self.bucket_count
+
+    @contextlib.contextmanager
+    def _lock(self, bucket: int, operation: int) -> typing.Iterator[None]:
+        offset = _FILE_HEADER_SIZE + bucket * self.bucket_size
+        fcntl.lockf(self._fd, operation, self.bucket_size, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.bucket_size, offset)
+
+    def _slots(self, bucket: int) -> range:
+        start = _FILE_HEADER_SIZE + bucket * self.bucket_size
+        return range(start, start + self.bucket_size, self.slot_size)
+
+    def _find(self, bucket: int, digest: bytes) -> int:
+        """Return offset of a live slot that holds the session, or -1."""
+        now = time.time_ns()
+        for offset in self._slots(bucket):
+            slot_digest, expires, _ = _SLOT_HEADER.unpack_from(self._mmap, offset)
+            if slot_digest == digest and expires >= now:
+                return offset
+        return -1
+
+    def _find_free(self, bucket: int, digest: bytes) -> int:
+        """Return offset of a slot for the session: its own, an empty or expired one, or the one that expires first."""
+        now = time.time_ns()
+        candidate, candidate_expires = -1, 0
+        for offset in self._slots(bucket):
+            slot_digest, expires, _ = _SLOT_HEADER.unpack_from(self._mmap, offset)
+            if slot_digest == digest:
+                return offset
+            if expires < now:
+                expires = -1  # free slots are preferred over live ones
+            if candidate == -1 or expires < candidate_expires:
+                candidate, candidate_expires = offset, expires
+        return candidate
+
+    def _get_expires(self, ttl: int) -> int:
+        effective_ttl = ttl if ttl > 0 else self.gc_ttl
+        return effective_ttl * 1_000_000_000 + time.time_ns()
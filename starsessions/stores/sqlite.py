@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import typing
+
+from starsessions.exceptions import ImproperlyConfigured
+from starsessions.stores.base import SessionStore
+
+logger = logging.getLogger(__name__)
+
+_TABLE_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+@dataclasses.dataclass
+class Operation:
+    """Statements to run in a single transaction, and the future to resolve with the number of changed rows."""
+
+    statements: list[tuple[str, tuple[typing.Any, ...]]]
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future[int]
+
+    def resolve(self, result: int | BaseException) -> None:
+        try:
+            self.loop.call_soon_threadsafe(_set_future, self.future, result)
+        except RuntimeError:  # event loop is closed, nobody waits for the result
+            pass
+
+
+def _set_future(future: asyncio.Future[int], result: int | BaseException) -> None:
+    if future.done():  # cancelled by the caller
+        return
+    if isinstance(result, BaseException):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+
+class SQLiteStore(SessionStore):
+    """
+    Stores session data in an SQLite database.
+
+    All changes are made by a single writer thread, which commits concurrent writes in one transaction.
+    Reads run on a pool of threads with own connections. The event loop never waits for disk.
+    The database uses WAL journal mode, so reads do not wait for writes.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        table: str = "sessions",
+        gc_ttl: int = 3600 * 24,
+        readers: int = 4,
+        batch_size: int = 256,
+        gc_interval: float = 300,
+    ) -> None:
+        """
+        :param path: path to the database file, created if it does not exist
+        :param table: name of the table to store sessions in, created if it does not exist
+        :param gc_ttl: TTL for sessions that have no expiration time, in seconds
+        :param readers: number of threads that read sessions
+        :param batch_size: max number of changes committed in one transaction
+        :param gc_interval: remove expired sessions from the database every this amount of seconds
+        """
+        if not _TABLE_NAME_RE.fullmatch(table):
+            raise ImproperlyConfigured(f"Invalid table name {table!r}: must be a valid SQL identifier.")
+        assert readers > 0, "Number of readers must be a positive number."
+        assert batch_size > 0, "Batch size must be a positive number."
+
+        self.path = os.fspath(path)
+        self.table = table
+        self.gc_ttl = gc_ttl
+        self.readers = readers
+        self.batch_size = batch_size
+        self.gc_interval = gc_interval
+
+        self._queue: queue.SimpleQueue[Operation | None] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._ready: concurrent.futures.Future[None] = concurrent.futures.Future()
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._local = threading.local()
+        self._reader_connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        await self._start()
+        assert self._executor is not None
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._read, session_id)
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        await self._execute([self._insert(session_id, data, ttl)])
+        return session_id
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        sql = f"UPDATE {self.table} SET expires = ? WHERE id = ? AND expires >= ?"
+        return await self._execute([(sql, (self._get_expires(ttl), session_id, int(time.time())))]) > 0
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        # both statements run in the same transaction
+        await self._execute([self._insert(session_id, data, ttl), self._delete(old_session_id)])
+        return session_id
+
+    async def remove(self, session_id: str) -> None:
+        await self._execute([self._delete(session_id)])
+
+    async def remove_many(self, session_ids: typing.Iterable[str]) -> None:
+        # removed in a single transaction
+        await self._execute([self._delete(session_id) for session_id in session_ids])
+
+    async def iter_sessions(self) -> typing.AsyncIterator[str]:
+        await self._start()
+        assert self._executor is not None
+        loop = asyncio.get_running_loop()
+        after = ""
+        while True:
+            # pages are selected by primary key, so sessions removed during iteration do not shift them
+            session_ids = await loop.run_in_executor(self._executor, self._list, after, self.batch_size)
+            for session_id in session_ids:
+                yield session_id
+            if len(session_ids) < self.batch_size:
+                return
+            after = session_ids[-1]
+
+    async def close(self) -> None:
+        """Commit pending changes, stop threads and close database connections."""
+        writer, executor = self._writer, self._executor
+        if writer is None or executor is None:
+            return
+
+        self._writer = self._executor = None
+        self._queue.put(None)
+        await asyncio.to_thread(writer.join)
+        await asyncio.to_thread(executor.shutdown)
+        with self._lock:
+            for connection in self._reader_connections:
+                connection.close()
+            self._reader_connections.clear()
+        self._ready = concurrent.futures.Future()
+        self._local = threading.local()
+
+    async def _start(self) -> None:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run_writer, name="starsessions-sqlite-writer", daemon=True)
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                self.readers, thread_name_prefix="starsessions-sqlite-reader"
+            )
+            self._writer.start()
+
+        # the writer thread creates the table before the store can be used
+        if not self._ready.done():
+            await asyncio.wrap_future(self._ready)
+        self._ready.result()
+
+    async def _execute(self, statements: list[tuple[str, tuple[typing.Any, ...]]]) -> int:
+        await self._start()
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[int] = loop.create_future()
+        self._queue.put(Operation(statements, loop, future))
+        return await future
+
+    def _insert(self, session_id: str, data: bytes, ttl: int) -> tuple[str, tuple[typing.Any, ...]]:
+        sql = f"INSERT OR REPLACE INTO {self.table} (id, data, expires) VALUES (?, ?, ?)"
+        return sql, (session_id, data, self._get_expires(ttl))
+
+    def _delete(self, session_id: str) -> tuple[str, tuple[typing.Any, ...]]:
+        return f"DELETE FROM {self.table} WHERE id = ?", (session_id,)
+
+    def _get_expires(self, ttl: int) -> int:
+        effective_ttl = ttl if ttl > 0 else self.gc_ttl
+        return int(time.time()) + effective_ttl
+
+    def _connect(self) -> sqlite3.Connection:
+        # reader connections are closed by the thread that calls close()
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")  # WAL stays consistent, a power loss may drop last commits
+        connection.execute("PRAGMA busy_timeout = 5000")  # other processes may write to the same database
+        return connection
+
+    def _get_reader_connection(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            with self._lock:
+                self._reader_connections.append(connection)
+        return connection
+
+    def _read(self, session_id: str) -> bytes:
+        sql = f"SELECT data FROM {self.table} WHERE id = ? AND expires >= ?"
+        row = self._get_reader_connection().execute(sql, (session_id, int(time.time()))).fetchone()
+        return typing.cast(bytes, row[0]) if row else b""
+
+    def _list(self, after: str, limit: int) -> list[str]:
+        sql = f"SELECT id FROM {self.table} WHERE id > ? AND expires >= ? ORDER BY id LIMIT ?"
+        rows = self._get_reader_connection().execute(sql, (after, int(time.time()), limit)).fetchall()
+        return [typing.cast(str, row[0]) for row in rows]
+
+    def _run_writer(self) -> None:
+        try:
+            connection = self._connect()
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(id TEXT PRIMARY KEY, data BLOB NOT NULL, expires INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_expires ON {self.table} (expires)")
+        except BaseException as ex:  # noqa: BLE001  # reported to all callers waiting for the store to start
+            self._ready.set_exception(ex)
+            return
+        self._ready.set_result(None)
+
+        next_gc = time.monotonic() + self.gc_interval
+        stopping = False
+        while not stopping:
+            try:
+                operation = self._queue.get(timeout=max(0.0, next_gc - time.monotonic()))
+            except queue.Empty:
+                self._delete_expired(connection)
+                next_gc = time.monotonic() + self.gc_interval
+                continue
+
+            # take everything that has been queued meanwhile and commit it at once
+            batch: list[Operation] = []
+            while operation is not None:
+                batch.append(operation)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    operation = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                stopping = True
+
+            if batch:
+                self._commit(connection, batch)
+        connection.close()
+
+    def _commit(self, connection: sqlite3.Connection, batch: list[Operation]) -> None:
+        results: list[int] = []
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for operation in batch:
+                    rowcount = 0
+                    for sql, params in operation.statements:
+                        rowcount += connection.execute(sql, params).rowcount
+                    results.append(rowcount)
+                connection.execute("COMMIT")
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+        except Exception as ex:  # noqa: BLE001  # the error is passed to all callers of the batch
+            for operation in batch:
+                operation.resolve(ex)
+            return
+
+        for operation, result in zip(batch, results):
+            operation.resolve(result)
+
+    def _delete_expired(self, connection: sqlite3.Connection) -> None:
+        # uses the index on expiration time
+        try:
+            connection.execute(f"DELETE FROM {self.table} WHERE expires < ?", (int(time.time()),))
+        except sqlite3.Error:
+            logger.exception("Failed to remove expired sessions from %s.", self.path)
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import math
+import time
+import typing
+
+from starsessions.exceptions import ImproperlyConfigured
+from starsessions.stores.base import SessionStore
+from starsessions.stores.cookie import CookieStore
+from starsessions.stores.writebehind import ErrorCallback, WriteBehindStore
+
+logger = logging.getLogger(__name__)
+
+
+class TieredStore(SessionStore):
+    """
+    Keeps active sessions in a fast store and all sessions in a cheaper one.
+
+    Sessions are read from the hot store first. A session found only in the cold store is copied to the hot store.
+    Writes and touches go to the hot store, and to the cold store in background. Sessions that have not been used
+    by this process for `idle_timeout` seconds are removed from the hot store and stay in the cold one.
+
+    A hot session is used for at most `max_staleness` seconds without reading the cold store again,
+    this is how long a process may serve stale data when the session was changed or removed by another process.
+    """
+
+    def __init__(
+        self,
+        hot: SessionStore,
+        cold: SessionStore,
+        idle_timeout: float = 600,
+        sweep_interval: float = 60,
+        on_error: ErrorCallback | None = None,
+        max_staleness: float = 5.0,
+    ) -> None:
+        """
+        :param hot: store for active sessions
+        :param cold: store for all sessions. It is wrapped with `WriteBehindStore` unless it already is one.
+        :param idle_timeout: remove sessions from the hot store when not used for this amount of seconds
+        :param sweep_interval: look for idle sessions every this amount of seconds
+        :param on_error: called with session ID and exception when a write to the cold store fails
+        :param max_staleness: how long, in seconds, a hot session can be used without reading the cold store
+        """
+        if isinstance(hot, CookieStore):
+            raise ImproperlyConfigured("CookieStore keeps data in the cookie and cannot be used with TieredStore.")
+        assert idle_timeout > 0, "Idle timeout must be a positive number."
+        assert sweep_interval > 0, "Sweep interval must be a positive number."
+        assert max_staleness >= 0, "Max staleness cannot be negative."
+
+        self.hot = hot
+        self.cold = cold if isinstance(cold, WriteBehindStore) else WriteBehindStore(cold, on_error=on_error)
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.max_staleness = max_staleness
+        self.promotions = 0
+        self.demotions = 0
+        # sessions in the hot store with the time they were used last, least recently used first
+        self._last_used: collections.OrderedDict[str, float] = collections.OrderedDict()
+        # time the hot copy of a session was known to match the cold store
+        self._synced_at: dict[str, float] = {}
+        self._reads: dict[str, object] = {}
+        self._sweeper: asyncio.Task[None] | None = None
+        self._touches: set[asyncio.Task[None]] = set()
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        self._start()
+        hot_data = await self.hot.read(session_id, lifetime)
+        synced_at = self._synced_at.get(session_id)
+        if hot_data and synced_at is not None and time.monotonic() - synced_at < self.max_staleness:
+            self._mark_used(session_id)
+            return hot_data
+
+        token = self._reads[session_id] = object()
+        try:
+            data = await self.cold.read(session_id, lifetime)
+        finally:
+            # the token is gone if the session was written or removed while reading, the result is outdated then
+            fresh = self._reads.get(session_id) is token
+            if fresh:
+                del self._reads[session_id]
+
+        if not fresh:
+            return data
+
+        if not data:
+            if hot_data:  # removed or expired in the cold store, maybe by another process
+                self._forget(session_id)
+                await self.hot.remove(session_id)
+            return data
+
+        if data != hot_data:
+            # the remaining session time is unknown here, the hot copy must not outlive the cold one by much.
+            # It is updated by the next write or touch.
+            ttl = min(lifetime, math.ceil(self.idle_timeout)) if lifetime else math.ceil(self.idle_timeout)
+            await self.hot.write(session_id, data, lifetime=lifetime, ttl=ttl)
+            if not hot_data:
+                self.promotions += 1
+        self._mark_used(session_id, synced=True)
+        return data
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        self._start()
+        self._reads.pop(session_id, None)
+        await self.hot.write(session_id, data, lifetime=lifetime, ttl=ttl)
+        self._mark_used(session_id, synced=True)
+        await self.cold.write(session_id, data, lifetime=lifetime, ttl=ttl)
+        return session_id
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        self._start()
+        if not await self.hot.touch(session_id, lifetime=lifetime, ttl=ttl):
+            return False
+
+        self._mark_used(session_id)
+        # extending the expiry in the cold store is not needed to serve this request
+        task = asyncio.get_running_loop().create_task(self._touch_cold(session_id, lifetime, ttl))
+        self._touches.add(task)
+        task.add_done_callback(self._touches.discard)
+        return True
+
+    async def remove(self, session_id: str) -> None:
+        self._reads.pop(session_id, None)
+        self._forget(session_id)
+        await self.hot.remove(session_id)
+        await self.cold.remove(session_id)
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        self._start()
+        self._reads.pop(old_session_id, None)
+        self._reads.pop(session_id, None)
+        self._forget(old_session_id)
+        await self.hot.rotate(old_session_id, session_id, data, lifetime=lifetime, ttl=ttl)
+        self._mark_used(session_id, synced=True)
+        await self.cold.rotate(old_session_id, session_id, data, lifetime=lifetime, ttl=ttl)
+        return session_id
+
+    def iter_sessions(self) -> typing.AsyncIterator[str]:
+        # the cold store has all sessions
+        return self.cold.iter_sessions()
+
+    async def demote_idle(self) -> int:
+        """Remove sessions that have not been used for `idle_timeout` seconds from the hot store."""
+        deadline = time.monotonic() - self.idle_timeout
+        idle: list[str] = []
+        for session_id, used_at in self._last_used.items():
+            if used_at > deadline:
+                break
+            idle.append(session_id)
+
+        demoted = 0
+        for session_id in idle:
+            last_used = self._last_used.get(session_id)
+            if last_used is None or last_used > deadline:  # used or removed while demoting other sessions
+                continue
+
+            self._forget(session_id)
+            # the cold store has the data: either already written, or pending in the write-behind queue
+            await self.hot.remove(session_id)
+            demoted += 1
+        self.demotions += demoted
+        return demoted
+
+    async def flush(self) -> None:
+        """Wait until all pending changes are saved to the cold store."""
+        while self._touches:
+            await asyncio.gather(*self._touches)
+        await self.cold.flush()
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        while self._touches:
+            await asyncio.gather(*self._touches)
+        await self.cold.close()
+        await self.hot.close()
+
+    def _mark_used(self, session_id: str, synced: bool = False) -> None:
+        now = time.monotonic()
+        self._last_used[session_id] = now
+        self._last_used.move_to_end(session_id)
+        if synced:
+            self._synced_at[session_id] = now
+
+    def _forget(self, session_id: str) -> None:
+        self._last_used.pop(session_id, None)
+        self._synced_at.pop(session_id, None)
+
+    async def _touch_cold(self, session_id: str, lifetime: int, ttl: int) -> None:
+        try:
+            if await self.cold.touch(session_id, lifetime=lifetime, ttl=ttl):
+                return
+
+            # the cold copy is gone or expires sooner than the hot one, save the hot copy again
+            data = await self.hot.read(session_id, lifetime)
+            if data:
+                await self.cold.write(session_id, data, lifetime=lifetime, ttl=ttl)
+        except Exception:
+            logger.exception("Failed to extend session expiry in the cold store.")
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._sweeper is None or self._sweeper.get_loop() is not loop:
+            self._sweeper = loop.create_task(self._sweep(self.sweep_interval))
+
+    async def _sweep(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.demote_idle()
+            except Exception:
+                logger.exception("Failed to demote idle sessions.")
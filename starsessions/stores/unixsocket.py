@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+
+from starsessions.exceptions import SessionError
+from starsessions.stores._pipeline import ConnectionPool, PipelinedConnection
+from starsessions.stores.base import SessionStore
+
+# request: operation, lifetime, ttl, session ID length, data length; followed by session ID and data
+REQUEST = struct.Struct("!BIIHI")
+# response: status, data length; followed by data
+RESPONSE = struct.Struct("!BI")
+
+OP_READ = 1
+OP_WRITE = 2
+OP_REMOVE = 3
+OP_TOUCH = 4
+
+STATUS_OK = 0
+STATUS_NOT_FOUND = 1  # session to touch does not exist
+STATUS_ERROR = 2  # data contains the error message
+
+
+class _Connection(PipelinedConnection[tuple[int, bytes]]):
+    """A connection to the session server, responses are status and data."""
+
+    server_name = "session server"
+
+    def parse_response(self, buffer: bytearray) -> tuple[int, bytes] | None:
+        if len(buffer) < RESPONSE.size:
+            return None
+
+        status, length = RESPONSE.unpack_from(buffer)
+        end = RESPONSE.size + length
+        if len(buffer) < end:
+            return None
+
+        response = bytes(buffer[RESPONSE.size : end])
+        del buffer[:end]
+        return status, response
+
+
+class _ConnectionPool(ConnectionPool[tuple[int, bytes]]):
+    def __init__(self, path: str, size: int) -> None:
+        super().__init__(size)
+        self.path = path
+
+    async def connect(self) -> _Connection:
+        _, connection = await asyncio.get_running_loop().create_unix_connection(_Connection, self.path)
+        return connection
+
+
+class UnixSocketStore(SessionStore):
+    """
+    Stores session data in a session server listening on a Unix socket.
+
+    Start the server with `python -m starsessions.server /path/to/socket`.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], pool_size: int = 4) -> None:
+        """
+        :param path: path to the server socket
+        :param pool_size: number of connections to the server, requests are spread between them
+        """
+        assert pool_size > 0, "Pool size must be a positive number."
+
+        self.path = os.fspath(path)
+        self._connections = _ConnectionPool(self.path, pool_size)
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        _, data = await self._request(OP_READ, session_id, lifetime=lifetime)
+        return data
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        await self._request(OP_WRITE, session_id, data, lifetime=lifetime, ttl=ttl)
+        return session_id
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        status, _ = await self._request(OP_TOUCH, session_id, lifetime=lifetime, ttl=ttl)
+        return status == STATUS_OK
+
+    async def remove(self, session_id: str) -> None:
+        await self._request(OP_REMOVE, session_id)
+
+    async def close(self) -> None:
+        self._connections.close()
+
+    async def _request(
+        self, operation: int, session_id: str, data: bytes = b"", lifetime: int = 0, ttl: int = 0
+    ) -> tuple[int, bytes]:
+        key = session_id.encode()
+        # expired non-rolling session may have negative remaining time, stores treat it as no expiration time
+        frame = REQUEST.pack(operation, lifetime, max(ttl, 0), len(key), len(data)) + key + data
+
+        # all operations are idempotent, so the pool may retry them
+        status, response = await self._connections.request(frame)
+        if status == STATUS_ERROR:
+            raise SessionError(f"Session server error: {response.decode()}")
+        return status, response
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import typing
+
+from starsessions.exceptions import ImproperlyConfigured
+from starsessions.stores.base import SessionStore, StoreWrapper
+from starsessions.stores.cookie import CookieStore
+
+logger = logging.getLogger(__name__)
+
+ErrorCallback = typing.Callable[[str, Exception], None]
+
+
+@dataclasses.dataclass(frozen=True)
+class Operation:
+    kind: typing.Literal["write", "remove"]
+    data: bytes = b""
+    lifetime: int = 0
+    ttl: int = 0
+
+
+class WriteBehindStore(StoreWrapper):
+    """
+    Persists session data in background so that responses do not wait for the store.
+
+    Writes and removals are put into a bounded queue and flushed by worker tasks.
+    Operations on the same session are coalesced and always applied in order.
+    Expiry updates are merged into pending writes, otherwise they are sent to the store right away,
+    because the caller writes the whole session when the store cannot extend its expiry.
+    Until flushed, the session is read from the queue, so the process sees its own writes.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        concurrency: int = 4,
+        max_pending: int = 10_000,
+        on_error: ErrorCallback | None = None,
+    ) -> None:
+        """
+        :param store: the store to write to
+        :param concurrency: number of worker tasks that flush the queue
+        :param max_pending: max number of sessions waiting to be flushed, writers wait when the queue is full
+        :param on_error: called with session ID and exception when a background operation fails
+        """
+        if isinstance(store, CookieStore):
+            raise ImproperlyConfigured("CookieStore keeps data in the cookie and cannot be used with WriteBehindStore.")
+
+        assert concurrency > 0, "Concurrency must be a positive number."
+        assert max_pending > 0, "Max pending must be a positive number."
+
+        super().__init__(store)
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.on_error = on_error
+        self._pending: dict[str, Operation] = {}
+        self._queued: set[str] = set()
+        self._queues: list[asyncio.Queue[str]] = []
+        self._workers: list[asyncio.Task[None]] = []
+        self._has_room: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def pending(self) -> int:
+        """Number of sessions waiting to be flushed."""
+        return len(self._pending)
+
+    async def read(self, session_id: str, lifetime: int) -> bytes:
+        operation = self._pending.get(session_id)
+        if operation is not None and operation.kind == "write":
+            return operation.data
+        if operation is not None and operation.kind == "remove":
+            return b""
+        return await self.store.read(session_id, lifetime)
+
+    async def write(self, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        await self._submit(session_id, Operation("write", data, lifetime, ttl))
+        return session_id
+
+    async def touch(self, session_id: str, lifetime: int, ttl: int) -> bool:
+        operation = self._pending.get(session_id)
+        if operation is not None and operation.kind == "remove":
+            return False
+
+        if operation is not None and operation.kind == "write":
+            # pending write sets expiry anyway, just update it
+            await self._submit(session_id, dataclasses.replace(operation, lifetime=lifetime, ttl=ttl))
+            return True
+
+        # nothing is pending for the session, so the touch cannot overtake a queued operation
+        return await self.store.touch(session_id, lifetime=lifetime, ttl=ttl)
+
+    async def remove(self, session_id: str) -> None:
+        await self._submit(session_id, Operation("remove"))
+
+    async def rotate(self, old_session_id: str, session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        # both operations go through the queue, the new ID is readable right away
+        await self.write(session_id, data, lifetime=lifetime, ttl=ttl)
+        await self.remove(old_session_id)
+        return session_id
+
+    async def flush(self) -> None:
+        """Wait until all pending operations are written to the store."""
+        if not self._pending:
+            return
+
+        self._start()
+        for queue in self._queues:
+            await queue.join()
+
+    async def close(self) -> None:
+        await self.flush()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._loop = None
+        await self.store.close()
+
+    async def _submit(self, session_id: str, operation: Operation) -> None:
+        self._start()
+        assert self._has_room
+
+        while session_id not in self._pending and len(self._pending) >= self.max_pending:
+            self._has_room.clear()
+            await self._has_room.wait()
+
+        # operation objects are never mutated, a worker that is flushing the session
+        # sees the replacement and leaves it in the queue
+        self._pending[session_id] = operation
+        if session_id not in self._queued:
+            self._queued.add(session_id)
+            self._get_queue(session_id).put_nowait(session_id)
+
+    def _get_queue(self, session_id: str) -> asyncio.Queue[str]:
+        # the same session is always handled by the same worker so operations are applied in order
+        return self._queues[hash(session_id) % len(self._queues)]
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        # first use or the event loop has changed, tasks of the old loop cannot be reused
+        self._loop = loop
+        self._has_room = asyncio.Event()
+        self._queues = [asyncio.Queue() for _ in range(self.concurrency)]
+        self._workers = [loop.create_task(self._work(queue)) for queue in self._queues]
+        self._queued = set(self._pending)
+        for session_id in self._pending:
+            self._get_queue(session_id).put_nowait(session_id)
+
+    async def _work(self, queue: asyncio.Queue[str]) -> None:
+        while True:
+            session_id = await queue.get()
+            self._queued.discard(session_id)
+            operation = self._pending[session_id]
+            try:
+                await self._apply(session_id, operation)
+            except Exception as ex:
+                self._report(session_id, ex)
+            finally:
+                if self._pending.get(session_id) is operation:
+                    del self._pending[session_id]
+                    assert self._has_room
+                    self._has_room.set()
+                queue.task_done()
+
+    async def _apply(self, session_id: str, operation: Operation) -> None:
+        if operation.kind == "write":
+            await self.store.write(session_id, operation.data, lifetime=operation.lifetime, ttl=operation.ttl)
+        else:
+            await self.store.remove(session_id)
+
+    def _report(self, session_id: str, ex: Exception) -> None:
+        if self.on_error is None:
+            logger.error("Failed to persist session %s.", session_id, exc_info=ex)
+            return
+
+        try:
+            self.on_error(session_id, ex)
+        except Exception:
+            logger.exception("Session error callback failed.")
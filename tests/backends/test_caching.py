@@ -0,0 +1,106 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from starsessions.stores import CachingStore, InMemoryStore
+
+
+@pytest.fixture
+def backend() -> InMemoryStore:
+    return InMemoryStore()
+
+
+@pytest.fixture
+def store(backend: InMemoryStore) -> CachingStore:
+    return CachingStore(backend)
+
+
+async def test_caching_serves_reads_from_cache(store: CachingStore, backend: InMemoryStore) -> None:
+    await backend.write("session_id", b"data", lifetime=60, ttl=60)
+    with mock.patch.object(backend, "read", wraps=backend.read) as read_spy:
+        assert await store.read("session_id", lifetime=60) == b"data"
+        assert await store.read("session_id", lifetime=60) == b"data"
+        read_spy.assert_called_once()
+    assert store.hits == 1
+    assert store.misses == 1
+
+
+async def test_caching_does_not_cache_missing_sessions(store: CachingStore) -> None:
+    assert await store.read("session_id", lifetime=60) == b""
+    assert await store.read("session_id", lifetime=60) == b""
+    assert store.misses == 2
+
+
+async def test_caching_writes_through(store: CachingStore, backend: InMemoryStore) -> None:
+    assert await store.write("session_id", b"data", lifetime=60, ttl=60) == "session_id"
+    assert await backend.read("session_id", lifetime=60) == b"data"
+    assert await store.read("session_id", lifetime=60) == b"data"
+    assert store.hits == 1
+
+    await store.remove("session_id")
+    assert await backend.read("session_id", lifetime=60) == b""
+    assert await store.read("session_id", lifetime=60) == b""
+
+
+async def test_caching_entries_expire(backend: InMemoryStore) -> None:
+    store = CachingStore(backend, ttl=10)
+    with mock.patch("starsessions.stores.caching.time") as mock_time:
+        mock_time.monotonic.return_value = 100
+        await store.write("session_id", b"data", lifetime=60, ttl=60)
+        await backend.write("session_id", b"changed elsewhere", lifetime=60, ttl=60)
+        assert await store.read("session_id", lifetime=60) == b"data"
+
+        mock_time.monotonic.return_value = 111
+        assert await store.read("session_id", lifetime=60) == b"changed elsewhere"
+
+
+async def test_caching_evicts_least_recently_used(backend: InMemoryStore) -> None:
+    store = CachingStore(backend, max_entries=2)
+    await store.write("first", b"data", lifetime=60, ttl=60)
+    await store.write("second", b"data", lifetime=60, ttl=60)
+    await store.read("first", lifetime=60)
+    await store.write("third", b"data", lifetime=60, ttl=60)
+    assert store.evictions == 1
+
+    with mock.patch.object(backend, "read", wraps=backend.read) as read_spy:
+        await store.read("first", lifetime=60)
+        read_spy.assert_not_called()
+        await store.read("second", lifetime=60)
+        read_spy.assert_called_once()
+
+
+async def test_caching_ignores_reads_outdated_by_remove(store: CachingStore, backend: InMemoryStore) -> None:
+    await backend.write("session_id", b"data", lifetime=60, ttl=60)
+
+    async def slow_read(session_id: str, lifetime: int) -> bytes:
+        await asyncio.sleep(0.01)
+        return b"data"
+
+    with mock.patch.object(backend, "read", side_effect=slow_read):
+        read = asyncio.create_task(store.read("session_id", lifetime=60))
+        await asyncio.sleep(0)
+        await store.remove("session_id")
+        assert await read == b"data"
+
+    assert await store.read("session_id", lifetime=60) == b""
+
+
+async def test_caching_rotate(store: CachingStore, backend: InMemoryStore) -> None:
+    await store.write("old_id", b"data", lifetime=60, ttl=60)
+    await store.rotate("old_id", "new_id", b"new data", lifetime=60, ttl=60)
+    assert await store.read("old_id", lifetime=60) == b""
+    assert await store.read("new_id", lifetime=60) == b"new data"
+    assert await backend.read("new_id", lifetime=60) == b"new data"
+
+
+async def test_caching_bulk_operations(store: CachingStore, backend: InMemoryStore) -> None:
+    await store.write("first", b"1", lifetime=60, ttl=60)
+    await store.write("second", b"2", lifetime=60, ttl=60)
+    assert await store.read_many(["first", "second", "unknown"], lifetime=60) == [b"1", b"2", b""]
+    assert {session_id async for session_id in store.iter_sessions()} == {"first", "second"}
+
+    # removals go through the cache
+    await store.remove_many(["first", "second"])
+    assert await store.read_many(["first", "second"], lifetime=60) == [b"", b""]
+    assert await backend.read("first", lifetime=60) == b""
@@ -0,0 +1,94 @@
+import asyncio
+import typing
+from unittest import mock
+
+import pytest
+
+from starsessions import JsonSerializer
+from starsessions.encryptors import NoopEncryptor
+from starsessions.session import SessionHandler
+from starsessions.stores import CoalescingStore, InMemoryStore
+
+
+@pytest.fixture
+def backend() -> InMemoryStore:
+    return InMemoryStore()
+
+
+@pytest.fixture
+def store(backend: InMemoryStore) -> CoalescingStore:
+    return CoalescingStore(backend)
+
+
+def slow(method: typing.Callable[..., typing.Awaitable[typing.Any]]) -> mock.AsyncMock:
+    async def side_effect(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        await asyncio.sleep(0.01)
+        return await method(*args, **kwargs)
+
+    return mock.AsyncMock(side_effect=side_effect)
+
+
+async def test_coalescing_shares_concurrent_reads(store: CoalescingStore, backend: InMemoryStore) -> None:
+    await backend.write("session_id", b"data", lifetime=60, ttl=60)
+    with mock.patch.object(backend, "read", slow(backend.read)) as read_spy:
+        results = await asyncio.gather(*[store.read("session_id", lifetime=60) for _ in range(5)])
+        assert results == [b"data"] * 5
+        read_spy.assert_called_once()
+
+        # completed reads are not cached
+        assert await store.read("session_id", lifetime=60) == b"data"
+        assert read_spy.call_count == 2
+
+
+async def test_coalescing_handlers_get_independent_copies(store: CoalescingStore, backend: InMemoryStore) -> None:
+    await backend.write("session_id", b'{"cart": [1], "__metadata__": {}}', lifetime=60, ttl=60)
+    handlers = [
+        SessionHandler({"type": "http"}, "session_id", store, JsonSerializer(), NoopEncryptor(), lifetime=60)
+        for _ in range(2)
+    ]
+    with mock.patch.object(backend, "read", slow(backend.read)) as read_spy:
+        await asyncio.gather(*[handler.load() for handler in handlers])
+        read_spy.assert_called_once()
+
+    handlers[0].scope["session"]["cart"].append(2)
+    assert handlers[1].scope["session"] == {"cart": [1]}
+
+
+async def test_coalescing_propagates_errors(store: CoalescingStore, backend: InMemoryStore) -> None:
+    async def broken_read(session_id: str, lifetime: int) -> bytes:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("connection refused")
+
+    with mock.patch.object(backend, "read", side_effect=broken_read):
+        results = await asyncio.gather(
+            *[store.read("session_id", lifetime=60) for _ in range(2)],
+            return_exceptions=True,
+        )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_coalescing_write_invalidates_reads(store: CoalescingStore, backend: InMemoryStore) -> None:
+    await backend.write("session_id", b"old", lifetime=60, ttl=60)
+    with mock.patch.object(backend, "read", slow(backend.read)) as read_spy:
+        first = asyncio.create_task(store.read("session_id", lifetime=60))
+        await asyncio.sleep(0)
+        await store.write("session_id", b"new", lifetime=60, ttl=60)
+        second = asyncio.create_task(store.read("session_id", lifetime=60))
+        await asyncio.gather(first, second)
+        assert read_spy.call_count == 2
+    assert second.result() == b"new"
+
+    await store.remove("session_id")
+    assert await store.read("session_id", lifetime=60) == b""
+
+
+async def test_coalescing_cancelled_caller_does_not_cancel_others(
+    store: CoalescingStore, backend: InMemoryStore
+) -> None:
+    await backend.write("session_id", b"data", lifetime=60, ttl=60)
+    with mock.patch.object(backend, "read", slow(backend.read)):
+        first = asyncio.create_task(store.read("session_id", lifetime=60))
+        second = asyncio.create_task(store.read("session_id", lifetime=60))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == b"data"
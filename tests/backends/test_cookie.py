@@ -1,6 +1,13 @@
+import base64
+import struct
+from unittest import mock
+
 import pytest
+from cryptography.fernet import Fernet
 
-from starsessions.stores import CookieStore, SessionStore
+from starsessions import ImproperlyConfigured
+from starsessions.encryptors import FernetEncryptor
+from starsessions.stores import CookieStore, EncryptedCookieStore, SessionStore
 
 
 @pytest.fixture
@@ -48,3 +55,88 @@ async def test_cookie_max_size_not_exceeded() -> None:
     # small payload must succeed
     new_id = await store.write("session_id", b"hello", lifetime=60, ttl=60)
     assert await store.read(new_id, lifetime=60) == b"hello"
+
+
+@pytest.mark.asyncio
+async def test_cookie_cannot_touch(cookie_store: SessionStore) -> None:
+    new_id = await cookie_store.write("session_id", b"some data", lifetime=60, ttl=60)
+    assert not await cookie_store.touch(new_id, lifetime=60, ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_cookie_rotate(cookie_store: SessionStore) -> None:
+    new_id = await cookie_store.rotate("old_id", "new_id", b"some data", lifetime=60, ttl=60)
+    assert await cookie_store.read(new_id, lifetime=60) == b"some data"
+
+
+@pytest.fixture
+def encrypted_cookie_store() -> EncryptedCookieStore:
+    return EncryptedCookieStore(b"\x00" * 32)
+
+
+async def test_encrypted_cookie_read_write(encrypted_cookie_store: EncryptedCookieStore) -> None:
+    new_id = await encrypted_cookie_store.write("session_id", b"some data", lifetime=60, ttl=60)
+    assert b"some data" not in base64.urlsafe_b64decode(new_id + "==")
+    assert "=" not in new_id
+    assert await encrypted_cookie_store.read(new_id, lifetime=60) == b"some data"
+
+    # one envelope: 9 bytes header, 12 bytes nonce, 16 bytes tag
+    assert len(new_id) == len(base64.urlsafe_b64encode(b"\x00" * (9 + 12 + 16 + 9)).rstrip(b"="))
+
+    fernet_data = FernetEncryptor(Fernet.generate_key()).encrypt(b"some data")
+    assert len(new_id) < len(await CookieStore("key").write("session_id", fernet_data, lifetime=60, ttl=60)) / 2
+
+
+async def test_encrypted_cookie_chacha20(encrypted_cookie_store: EncryptedCookieStore) -> None:
+    store = EncryptedCookieStore(b"\x00" * 32, algorithm="chacha20-poly1305")
+    new_id = await store.write("session_id", b"some data", lifetime=60, ttl=60)
+    assert await store.read(new_id, lifetime=60) == b"some data"
+    assert await encrypted_cookie_store.read(new_id, lifetime=60) == b""
+
+
+async def test_encrypted_cookie_expires(encrypted_cookie_store: EncryptedCookieStore) -> None:
+    with mock.patch("starsessions.stores.cookie.time.time", return_value=1_000_000):
+        new_id = await encrypted_cookie_store.write("session_id", b"some data", lifetime=60, ttl=30)
+        session_only_id = await encrypted_cookie_store.write("session_id", b"some data", lifetime=0, ttl=0)
+
+    with mock.patch("starsessions.stores.cookie.time.time", return_value=1_000_030):
+        assert await encrypted_cookie_store.read(new_id, lifetime=60) == b"some data"
+    with mock.patch("starsessions.stores.cookie.time.time", return_value=1_000_031):
+        assert await encrypted_cookie_store.read(new_id, lifetime=60) == b""
+        assert await encrypted_cookie_store.read(session_only_id, lifetime=0) == b"some data"
+
+
+async def test_encrypted_cookie_rejects_tampered_values(encrypted_cookie_store: EncryptedCookieStore) -> None:
+    new_id = await encrypted_cookie_store.write("session_id", b"some data", lifetime=60, ttl=60)
+    envelope = bytearray(base64.urlsafe_b64decode(new_id + "=" * (-len(new_id) % 4)))
+    envelope[1:9] = struct.pack(">Q", 2**40)  # extend expiration time
+    tampered = base64.urlsafe_b64encode(envelope).decode()
+    assert await encrypted_cookie_store.read(tampered, lifetime=60) == b""
+
+    assert await EncryptedCookieStore(b"\x01" * 32).read(new_id, lifetime=60) == b""
+    for value in ("", "session_id", "!!!", new_id[:20]):
+        assert await encrypted_cookie_store.read(value, lifetime=60) == b""
+
+
+async def test_encrypted_cookie_max_size() -> None:
+    store = EncryptedCookieStore(b"\x00" * 32, max_size=100)
+    with pytest.raises(ValueError, match="too large"):
+        await store.write("session_id", b"x" * 100, lifetime=60, ttl=60)
+
+
+def test_encrypted_cookie_validates_options() -> None:
+    with pytest.raises(ImproperlyConfigured, match="32 bytes"):
+        EncryptedCookieStore(b"short")
+    with pytest.raises(ImproperlyConfigured, match="Unsupported algorithm"):
+        EncryptedCookieStore(b"\x00" * 32, algorithm="des")
+
+
+async def test_cookie_max_size_with_chunks() -> None:
+    store = CookieStore("key", max_size=50, max_chunks=3)
+    new_id = await store.write("session_id", b"x" * 80, lifetime=60, ttl=60)
+    assert 50 < len(new_id) <= 150
+    with pytest.raises(ValueError, match="150-byte"):
+        await store.write("session_id", b"x" * 150, lifetime=60, ttl=60)
+
+    encrypted_store = EncryptedCookieStore(b"\x00" * 32, max_size=50, max_chunks=3)
+    assert await encrypted_store.read(await encrypted_store.write("id", b"x" * 60, lifetime=60, ttl=60), 60)
@@ -0,0 +1,196 @@
+import asyncio
+import os
+import pathlib
+from unittest.mock import patch
+
+import pytest
+
+from starsessions import FileStore
+
+
+@pytest.fixture
+def file_store(tmp_path: pathlib.Path) -> FileStore:
+    return FileStore(tmp_path, gc_interval=None)
+
+
+def _session_files(directory: pathlib.Path) -> list[str]:
+    return sorted(path.name for path in directory.glob("*/*/*"))
+
+
+@pytest.mark.asyncio
+async def test_file_read_write(file_store: FileStore) -> None:
+    new_id = await file_store.write("session_id", b"data", lifetime=60, ttl=60)
+    assert new_id == "session_id"
+    assert await file_store.read("session_id", lifetime=60) == b"data"
+
+    await file_store.write("session_id", b"new", lifetime=60, ttl=60)
+    assert await file_store.read("session_id", lifetime=60) == b"new"
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_read_missing(file_store: FileStore) -> None:
+    assert await file_store.read("unknown", lifetime=60) == b""
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_layout(file_store: FileStore, tmp_path: pathlib.Path) -> None:
+    await file_store.write("../session_id", b"data", lifetime=60, ttl=60)
+    (path,) = tmp_path.glob("*/*/*")
+    assert path.parent.parent.name == path.name[:2]
+    assert path.parent.name == path.name[2:4]
+    assert len(path.name) == 64
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_write_leaves_no_temporary_files(file_store: FileStore, tmp_path: pathlib.Path) -> None:
+    await file_store.write("session_id", b"data", lifetime=60, ttl=60)
+    await file_store.write("session_id", b"new", lifetime=60, ttl=60)
+    assert len(_session_files(tmp_path)) == 1
+
+    failing_replace = patch("starsessions.stores.file.os.replace", side_effect=OSError("disk full"))
+    with failing_replace, pytest.raises(OSError, match="disk full"):
+        await file_store.write("session_id", b"broken", lifetime=60, ttl=60)
+    assert len(_session_files(tmp_path)) == 1
+    assert await file_store.read("session_id", lifetime=60) == b"new"
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_remove(file_store: FileStore) -> None:
+    await file_store.write("session_id", b"data", lifetime=60, ttl=60)
+    await file_store.remove("session_id")
+    assert await file_store.read("session_id", lifetime=60) == b""
+    await file_store.remove("session_id")
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_expires(file_store: FileStore) -> None:
+    with patch("starsessions.stores.file.time") as mock_time:
+        mock_time.time.return_value = 1_000_000
+        await file_store.write("session_id", b"data", lifetime=60, ttl=30)
+        await file_store.write("no_ttl", b"data", lifetime=0, ttl=0)
+
+        mock_time.time.return_value = 1_000_031
+        assert await file_store.read("session_id", lifetime=60) == b""
+        assert await file_store.read("no_ttl", lifetime=0) == b"data"
+        assert not await file_store.touch("session_id", lifetime=60, ttl=30)
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_touch(file_store: FileStore) -> None:
+    assert not await file_store.touch("session_id", lifetime=60, ttl=30)
+    with patch("starsessions.stores.file.time") as mock_time:
+        mock_time.time.return_value = 1_000_000
+        await file_store.write("session_id", b"data", lifetime=60, ttl=30)
+
+        mock_time.time.return_value = 1_000_020
+        assert await file_store.touch("session_id", lifetime=60, ttl=30)
+
+        mock_time.time.return_value = 1_000_040
+        assert await file_store.read("session_id", lifetime=60) == b"data"
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_rotate(file_store: FileStore) -> None:
+    await file_store.write("old_id", b"data", lifetime=60, ttl=60)
+    assert await file_store.rotate("old_id", "new_id", b"new", lifetime=60, ttl=60) == "new_id"
+    assert await file_store.read("old_id", lifetime=60) == b""
+    assert await file_store.read("new_id", lifetime=60) == b"new"
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_collects_shards_and_resumes(file_store: FileStore, tmp_path: pathlib.Path) -> None:
+    with patch("starsessions.stores.file.time.time", return_value=1_000_000):
+        for index in range(50):
+            await file_store.write(f"expired_{index}", b"data", lifetime=60, ttl=30)
+    await file_store.write("session_id", b"data", lifetime=60, ttl=60)
+
+    file_store._collect_shards(32768)
+    assert (tmp_path / ".gc-cursor").read_text() == "32768"
+    remaining = len(_session_files(tmp_path))
+    assert 1 < remaining < 51
+
+    file_store._collect_shards(32768)
+    assert (tmp_path / ".gc-cursor").read_text() == "0"
+    assert len(_session_files(tmp_path)) == 1
+    assert await file_store.read("session_id", lifetime=60) == b"data"
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_collects_stale_temporary_files(file_store: FileStore, tmp_path: pathlib.Path) -> None:
+    shard = tmp_path / "00" / "00"
+    shard.mkdir(parents=True)
+    (shard / ".tmp-stale").write_bytes(b"data")
+    (shard / ".tmp-in-progress").write_bytes(b"data")
+    os.utime(shard / ".tmp-stale", (1_000_000, 1_000_000))
+
+    file_store._collect_shards(1)
+    assert sorted(path.name for path in shard.iterdir()) == [".tmp-in-progress"]
+
+
+@pytest.mark.asyncio
+async def test_file_collects_stale_cursor_files(file_store: FileStore, tmp_path: pathlib.Path) -> None:
+    (tmp_path / ".tmp-cursor").write_text("10")
+    os.utime(tmp_path / ".tmp-cursor", (1_000_000, 1_000_000))
+
+    file_store._collect_shards(1)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [".gc-cursor"]
+
+
+@pytest.mark.asyncio
+async def test_file_collection_keeps_sessions_written_concurrently(file_store: FileStore) -> None:
+    with patch("starsessions.stores.file.time.time", return_value=1_000_000):
+        await file_store.write("session_id", b"old", lifetime=60, ttl=30)
+    path = file_store._get_path("session_id")
+    rename = os.rename
+
+    def write_and_rename(source: str, target: str) -> None:
+        # the session is written after the collector has seen the expired file
+        file_store._write(path, b"new", file_store._get_expires(60))
+        rename(source, target)
+
+    with patch("starsessions.stores.file.os.rename", side_effect=write_and_rename):
+        file_store._collect_shard(os.path.dirname(path), 1_000_100)
+
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+    assert await file_store.read("session_id", lifetime=60) == b"new"
+    await file_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_background_collector(tmp_path: pathlib.Path) -> None:
+    store = FileStore(tmp_path, gc_interval=0.01, gc_shards=65536)
+    with patch("starsessions.stores.file.time.time", return_value=1_000_000):
+        await store.write("expired", b"data", lifetime=60, ttl=30)
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+
+    # a full pass over all subdirectories takes a while on slow machines
+    for _ in range(100):
+        await asyncio.sleep(0.05)
+        if len(_session_files(tmp_path)) == 1:
+            break
+    assert _session_files(tmp_path) == [os.path.basename(store._get_path("session_id"))]
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_bulk_operations(file_store: FileStore) -> None:
+    await file_store.write("first", b"1", lifetime=60, ttl=60)
+    await file_store.write("second", b"2", lifetime=60, ttl=60)
+    assert await file_store.read_many(["first", "second", "unknown"], lifetime=60) == [b"1", b"2", b""]
+
+    await file_store.remove_many(["first", "second"])
+    assert await file_store.read_many(["first", "second"], lifetime=60) == [b"", b""]
+
+    # file names are hashes of session IDs
+    with pytest.raises(NotImplementedError, match="FileStore cannot list stored sessions"):
+        file_store.iter_sessions()
+    await file_store.close()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+import typing
+from unittest import mock
+
+import pytest
+
+from starsessions import ImproperlyConfigured, MemcachedStore, SessionError
+
+
+class FakeMemcached:
+    """In-process memcached server that implements the meta commands used by the store."""
+
+    def __init__(self) -> None:
+        self.items: dict[bytes, tuple[bytes, float]] = {}
+        self.commands: list[bytes] = []
+        self.server: asyncio.AbstractServer | None = None
+        self.address = ""
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def start(self, port: int = 0) -> None:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", port)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        self.address = f"{host}:{port}"
+
+    async def stop(self) -> None:
+        assert self.server is not None
+        self.server.close()
+        for writer in self._writers:
+            writer.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while line := await reader.readline():
+                self.commands.append(line.rstrip(b"\r\n"))
+                command, key, *args = self.commands[-1].split(b" ")
+                data = await reader.readexactly(int(args[0]) + 2) if command == b"ms" else b""
+                writer.write(self.execute(command, key, args, data[:-2]))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def execute(self, command: bytes, key: bytes, args: list[bytes], data: bytes) -> bytes:
+        item = self.items.get(key)
+        if item is not None and item[1] < time.time():
+            del self.items[key]
+            item = None
+
+        flags = {arg[:1]: arg[1:] for arg in args if arg[:1].isalpha()}
+        if command == b"mg":
+            if item is None:
+                return b"EN\r\n"
+            if b"T" in flags:
+                item = self.items[key] = (item[0], self.expires(int(flags[b"T"])))
+            if b"v" not in flags:
+                return b"HD\r\n"
+            return b"VA %d\r\n%s\r\n" % (len(item[0]), item[0])
+        if command == b"ms":
+            if len(data) > 1024:
+                return b"SERVER_ERROR object too large for cache\r\n"
+            self.items[key] = (data, self.expires(int(flags[b"T"])))
+            return b"HD\r\n"
+        if command == b"md":
+            return b"NF\r\n" if self.items.pop(key, None) is None else b"HD\r\n"
+        return b"ERROR\r\n"
+
+    def expires(self, ttl: int) -> float:
+        return ttl if ttl > 3600 * 24 * 30 else time.time() + ttl
+
+
+@contextlib.asynccontextmanager
+async def serve(count: int = 1) -> typing.AsyncIterator[list[FakeMemcached]]:
+    servers = [FakeMemcached() for _ in range(count)]
+    for server in servers:
+        await server.start()
+    try:
+        yield servers
+    finally:
+        for server in servers:
+            await server.stop()
+
+
+async def test_memcached_read_write() -> None:
+    async with serve() as (server,):
+        store = MemcachedStore([server.address])
+        assert await store.write("session_id", b"data", lifetime=60, ttl=60) == "session_id"
+        assert await store.read("session_id", lifetime=60) == b"data"
+        assert server.items[b"starsessions.session_id"][0] == b"data"
+
+        await store.write("session_id", b"new\r\ndata", lifetime=60, ttl=60)
+        assert await store.read("session_id", lifetime=60) == b"new\r\ndata"
+        assert await store.read("unknown", lifetime=60) == b""
+        await store.close()
+
+
+async def test_memcached_pipelines_concurrent_requests() -> None:
+    async with serve() as (server,):
+        store = MemcachedStore([server.address], pool_size=1)
+        await asyncio.gather(*(store.write(f"session_{i}", str(i).encode(), lifetime=60, ttl=60) for i in range(50)))
+        values = await asyncio.gather(*(store.read(f"session_{i}", lifetime=60) for i in range(50)))
+        assert values == [str(i).encode() for i in range(50)]
+        await store.close()
+
+
+async def test_memcached_remove() -> None:
+    async with serve() as (server,):
+        store = MemcachedStore([server.address])
+        await store.write("session_id", b"data", lifetime=60, ttl=60)
+        await store.remove("session_id")
+        assert await store.read("session_id", lifetime=60) == b""
+        await store.remove("session_id")
+        await store.close()
+
+
+async def test_memcached_touch() -> None:
+    async with serve() as (server,):
+        store = MemcachedStore([server.address])
+        await store.write("session_id", b"data", lifetime=60, ttl=10)
+        assert await store.touch("session_id", lifetime=60, ttl=60)
+        assert server.items[b"starsessions.session_id"][1] > time.time() + 10
+        assert not await store.touch("unknown", lifetime=60, ttl=60)
+        await store.close()
+
+
+async def test_memcached_ttl() -> None:
+    async with serve() as (server,):
+        store = MemcachedStore([server.address], gc_ttl=3600 * 24 * 60)
+        with mock.patch("starsessions.stores.memcached.time.time", return_value=1_000_000):
+            await store.write("session_id", b"data", lifetime=60, ttl=-5)
+            # longer than 30 days is sent as a unix timestamp
+            await store.write("session_only", b"data", lifetime=0, ttl=0)
+            await store.touch("session_id", lifetime=60, ttl=3600)
+
+        assert server.commands == [
+            b"ms starsessions.session_id 4 T1",
+            b"ms starsessions.session_only 4 T6184000",
+            b"mg starsessions.session_id T3600",
+        ]
+        await store.close()
+
+
+async def test_memcached_hashes_unsafe_session_ids() -> None:
+    async with serve() as (server,):
+        store = MemcachedStore([server.address])
+        for session_id in ("id with spaces\r\nmg other", "x" * 300, "ключ"):
+            await store.write(session_id, b"data", lifetime=60, ttl=60)
+            assert await store.read(session_id, lifetime=60) == b"data"
+
+        assert len(server.items) == 3
+        assert all(len(key) == len("starsessions.") + 64 for key in server.items)
+        await store.close()
+
+
+async def test_memcached_server_error() -> None:
+    async with serve() as (server,):
+        store = MemcachedStore([server.address])
+        with pytest.raises(SessionError, match="object too large"):
+            await store.write("session_id", b"x" * 2048, lifetime=60, ttl=60)
+        await store.close()
+
+
+async def test_memcached_reconnects_after_server_restart() -> None:
+    async with serve() as (server,):
+        store = MemcachedStore([server.address], pool_size=1)
+        await store.write("session_id", b"data", lifetime=60, ttl=60)
+        await server.stop()
+
+        port = int(server.address.rsplit(":", 1)[1])
+        await server.start(port)
+        assert await store.read("session_id", lifetime=60) == b"data"
+        await store.close()
+
+
+async def test_memcached_consistent_hashing() -> None:
+    async with serve(3) as servers:
+        store = MemcachedStore([server.address for server in servers])
+        session_ids = [f"session_{i}" for i in range(300)]
+        for session_id in session_ids:
+            await store.write(session_id, b"data", lifetime=60, ttl=60)
+
+        assert sum(len(server.items) for server in servers) == 300
+        assert all(len(server.items) > 50 for server in servers)
+        await store.close()
+
+        # only sessions of the removed server move
+        placement = {session_id: store._get_server(store._get_key(session_id)).port for session_id in session_ids}
+        smaller = MemcachedStore([server.address for server in servers[:2]])
+        removed_port = int(servers[2].address.rsplit(":", 1)[1])
+        for session_id, port in placement.items():
+            if port != removed_port:
+                assert smaller._get_server(smaller._get_key(session_id)).port == port
+
+
+def test_memcached_validates_servers() -> None:
+    with pytest.raises(ImproperlyConfigured):
+        MemcachedStore([])
+    with pytest.raises(ImproperlyConfigured, match="Invalid memcached server address"):
+        MemcachedStore(["localhost"])
+
+    store = MemcachedStore(["[::1]:11211"])
+    assert (store.servers[0].host, store.servers[0].port) == ("::1", 11211)
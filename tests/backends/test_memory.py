@@ -1,8 +1,9 @@
+import asyncio
 from unittest.mock import patch
 
 import pytest
 
-from starsessions.stores import InMemoryStore, SessionStore
+from starsessions.stores import InMemoryStore, InMemoryUserIndex, SessionStore
 
 
 @pytest.fixture
@@ -59,3 +60,200 @@ async def test_in_memory_remove(in_memory_store: InMemoryStore) -> None:
 
     # should not fail on missing key
     await in_memory_store.remove("missing")
+
+
+@pytest.mark.asyncio
+async def test_in_memory_touch(in_memory_store: InMemoryStore) -> None:
+    base_ns = 1_000_000_000_000
+
+    with patch("starsessions.stores.memory.time") as mock_time:
+        mock_time.time_ns.return_value = base_ns
+        await in_memory_store.write("session_id", b"data", lifetime=60, ttl=30)
+
+        mock_time.time_ns.return_value = base_ns + 20 * 1_000_000_000
+        assert await in_memory_store.touch("session_id", lifetime=60, ttl=30)
+
+        # the original expiry has passed but the data is still there
+        mock_time.time_ns.return_value = base_ns + 40 * 1_000_000_000
+        assert await in_memory_store.read("session_id", lifetime=60) == b"data"
+
+        mock_time.time_ns.return_value = base_ns + 60 * 1_000_000_000
+        assert not await in_memory_store.touch("session_id", lifetime=60, ttl=30)
+        assert not await in_memory_store.touch("missing", lifetime=60, ttl=30)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_rotate(in_memory_store: InMemoryStore) -> None:
+    await in_memory_store.write("old_id", b"data", lifetime=60, ttl=60)
+    assert await in_memory_store.rotate("old_id", "new_id", b"new data", lifetime=60, ttl=60) == "new_id"
+    assert await in_memory_store.read("old_id", lifetime=60) == b""
+    assert await in_memory_store.read("new_id", lifetime=60) == b"new data"
+    assert len(in_memory_store.data) == 1
+
+
+@pytest.mark.asyncio
+async def test_in_memory_write_evicts_expired(in_memory_store: InMemoryStore) -> None:
+    base_ns = 1_000_000_000_000
+
+    with patch("starsessions.stores.memory.time") as mock_time:
+        mock_time.time_ns.return_value = base_ns
+        await in_memory_store.write("short", b"data", lifetime=60, ttl=10)
+        await in_memory_store.write("long", b"data", lifetime=60, ttl=60)
+        await in_memory_store.write("touched", b"data", lifetime=60, ttl=10)
+        assert await in_memory_store.touch("touched", lifetime=60, ttl=60)
+
+        mock_time.time_ns.return_value = base_ns + 30 * 1_000_000_000
+        await in_memory_store.write("new", b"data", lifetime=60, ttl=60)
+        assert set(in_memory_store.data) == {"long", "touched", "new"}
+
+
+@pytest.mark.asyncio
+async def test_in_memory_rebuilds_expiry_index(in_memory_store: InMemoryStore) -> None:
+    for _ in range(5000):
+        await in_memory_store.write("session_id", b"data", lifetime=60, ttl=60)
+    assert len(in_memory_store._expiry_heap) <= 2 * len(in_memory_store.data) + 1024
+
+
+@pytest.mark.asyncio
+async def test_in_memory_background_sweeper() -> None:
+    base_ns = 1_000_000_000_000
+    store = InMemoryStore(sweep_interval=0.01)
+
+    with patch("starsessions.stores.memory.time") as mock_time:
+        mock_time.time_ns.return_value = base_ns
+        await store.write("session_id", b"data", lifetime=60, ttl=10)
+
+        mock_time.time_ns.return_value = base_ns + 30 * 1_000_000_000
+        assert "session_id" in store.data
+        await asyncio.sleep(0.05)
+        assert store.data == {}
+
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_max_entries_evicts_least_recently_used() -> None:
+    store = InMemoryStore(max_entries=2)
+    await store.write("first", b"data", lifetime=60, ttl=60)
+    await store.write("second", b"data", lifetime=60, ttl=60)
+    assert await store.read("first", lifetime=60) == b"data"
+
+    await store.write("third", b"data", lifetime=60, ttl=60)
+    assert set(store.data) == {"first", "third"}
+    assert store.entry_count == 2
+    assert store.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_in_memory_max_bytes() -> None:
+    store = InMemoryStore(max_bytes=10)
+    await store.write("first", b"12345", lifetime=60, ttl=60)
+    await store.write("second", b"12345", lifetime=60, ttl=60)
+    assert store.total_bytes == 10
+    assert store.evictions == 0
+
+    await store.write("second", b"123", lifetime=60, ttl=60)
+    assert store.total_bytes == 8
+
+    await store.write("third", b"1234", lifetime=60, ttl=60)
+    assert set(store.data) == {"second", "third"}
+    assert store.total_bytes == 7
+    assert store.evictions == 1
+
+    await store.remove("third")
+    assert store.total_bytes == 3
+
+
+@pytest.mark.asyncio
+async def test_in_memory_max_bytes_keeps_oversized_session() -> None:
+    store = InMemoryStore(max_bytes=4)
+    await store.write("first", b"1234", lifetime=60, ttl=60)
+    await store.write("second", b"123456", lifetime=60, ttl=60)
+    assert set(store.data) == {"second"}
+    assert store.total_bytes == 6
+
+
+@pytest.mark.asyncio
+async def test_in_memory_stores_hex_session_ids_as_bytes(in_memory_store: InMemoryStore) -> None:
+    session_id = "0123456789abcdef0123456789abcdef"
+    await in_memory_store.write(session_id, b"lower", lifetime=60, ttl=60)
+    await in_memory_store.write(session_id.upper(), b"upper", lifetime=60, ttl=60)
+    assert set(in_memory_store.data) == {bytes.fromhex(session_id), session_id.upper()}
+
+    assert await in_memory_store.read(session_id, lifetime=60) == b"lower"
+    assert await in_memory_store.read(session_id.upper(), lifetime=60) == b"upper"
+
+    await in_memory_store.remove(session_id)
+    assert set(in_memory_store.data) == {session_id.upper()}
+
+
+@pytest.mark.asyncio
+async def test_in_memory_bulk_operations(in_memory_store: InMemoryStore) -> None:
+    session_id = "0123456789abcdef0123456789abcdef"
+    await in_memory_store.write(session_id, b"first", lifetime=60, ttl=60)
+    await in_memory_store.write("second", b"second", lifetime=60, ttl=60)
+    await in_memory_store.write("third", b"third", lifetime=60, ttl=60)
+
+    assert await in_memory_store.read_many([session_id, "unknown", "third"], lifetime=60) == [b"first", b"", b"third"]
+    assert {session_id async for session_id in in_memory_store.iter_sessions()} == {session_id, "second", "third"}
+
+    await in_memory_store.remove_many([session_id, "second", "unknown"])
+    assert await in_memory_store.read_many([session_id, "second", "third"], lifetime=60) == [b"", b"", b"third"]
+    assert in_memory_store.total_bytes == 5
+
+
+@pytest.mark.asyncio
+async def test_in_memory_iter_sessions(in_memory_store: InMemoryStore) -> None:
+    with patch("starsessions.stores.memory.time") as mock_time:
+        mock_time.time_ns.return_value = 1_000_000_000_000
+        await in_memory_store.write("expired", b"data", lifetime=60, ttl=10)
+        for index in range(3):
+            await in_memory_store.write(f"session_{index}", b"data", lifetime=60, ttl=60)
+
+        mock_time.time_ns.return_value = 1_020_000_000_000
+        # removing sessions while iterating is allowed
+        session_ids = []
+        async for session_id in in_memory_store.iter_sessions():
+            session_ids.append(session_id)
+            await in_memory_store.remove(session_id)
+
+    assert session_ids == ["session_0", "session_1", "session_2"]
+    assert set(in_memory_store.data) == {"expired"}
+
+
+@pytest.mark.asyncio
+async def test_in_memory_user_index() -> None:
+    user_index = InMemoryUserIndex()
+    await user_index.add("user", "first", ttl=60)
+    await user_index.add("user", "second", ttl=0)
+    await user_index.add("other", "third", ttl=60)
+    assert sorted(await user_index.get_sessions("user")) == ["first", "second"]
+
+    await user_index.discard("user", "first")
+    await user_index.discard("unknown", "first")
+    assert await user_index.get_sessions("user") == ["second"]
+
+    assert await user_index.pop_sessions("user") == ["second"]
+    assert await user_index.get_sessions("user") == []
+    assert await user_index.pop_sessions("user") == []
+    assert set(user_index.data) == {"other"}
+
+
+@pytest.mark.asyncio
+async def test_in_memory_user_index_removes_expired_entries() -> None:
+    user_index = InMemoryUserIndex()
+    with patch("starsessions.stores.memory.time") as mock_time:
+        mock_time.time_ns.return_value = 1_000_000_000_000
+        await user_index.add("user", "first", ttl=10)
+        await user_index.add("user", "second", ttl=30)
+        await user_index.add("expired", "third", ttl=10)
+
+        mock_time.time_ns.return_value = 1_020_000_000_000
+        assert await user_index.get_sessions("user") == ["second"]
+        await user_index.add("new", "fourth", ttl=10)
+        assert user_index.data == {"user": {"second": 1_030_000_000_000}, "new": {"fourth": 1_030_000_000_000}}
+
+        mock_time.time_ns.return_value = 1_040_000_000_000
+        await user_index.add("new", "fifth", ttl=10)
+        assert user_index.data == {"new": {"fifth": 1_050_000_000_000}}
+        assert len(user_index._expiry_heap) == 1
@@ -1,11 +1,14 @@
+import asyncio
 import os
 import typing
+from unittest import mock
 
 import pytest
 import redis.asyncio as redis
+from redis import exceptions as redis_exceptions
 
-from starsessions import ImproperlyConfigured
-from starsessions.stores.redis import RedisStore
+from starsessions import FieldStore, ImproperlyConfigured
+from starsessions.stores.redis import RedisHashStore, RedisStore, RedisUserIndex
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost")
 
@@ -68,3 +71,284 @@ async def test_redis_uses_url() -> None:
         store = RedisStore(url="redis://")
         assert isinstance(store._connection, redis.Redis)
         await store._connection.aclose()
+
+
+async def test_redis_touch() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisStore(connection=client)
+    async with client:
+        await redis_store.write("session_id", b"data", lifetime=60, ttl=10)
+        assert await redis_store.touch("session_id", lifetime=60, ttl=60)
+        assert await client.ttl("starsessions.session_id") > 10
+        assert await redis_store.read("session_id", lifetime=60) == b"data"
+
+        assert not await redis_store.touch("unknown_session_id", lifetime=60, ttl=60)
+
+
+async def test_redis_rotate() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisStore(connection=client)
+    async with client:
+        await redis_store.write("old_id", b"data", lifetime=60, ttl=60)
+        assert await redis_store.rotate("old_id", "new_id", b"new data", lifetime=60, ttl=60) == "new_id"
+        assert await redis_store.read("old_id", lifetime=60) == b""
+        assert await redis_store.read("new_id", lifetime=60) == b"new data"
+        assert 0 < await client.ttl("starsessions.new_id") <= 60
+
+
+async def test_redis_hash_read_write_fields() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisHashStore(connection=client, prefix="hash.")
+    async with client:
+        fields = {"user": b"john", "theme": b"dark"}
+        assert await redis_store.write_fields("session_id", fields, removed=(), lifetime=60, ttl=60, replace=True)
+        assert await redis_store.read_fields("session_id", lifetime=60) == fields
+        assert 0 < await client.ttl("hash.session_id") <= 60
+
+        assert await redis_store.write_fields(
+            "session_id", {"cart": b"[1]"}, removed=["theme"], lifetime=60, ttl=120, replace=False
+        )
+        assert await redis_store.read_fields("session_id", lifetime=60) == {"user": b"john", "cart": b"[1]"}
+        assert 60 < await client.ttl("hash.session_id") <= 120
+
+        assert await redis_store.write_fields("session_id", {}, removed=["cart"], lifetime=60, ttl=60, replace=False)
+        assert await redis_store.read_fields("session_id", lifetime=60) == {"user": b"john"}
+
+        await redis_store.write_fields("session_id", {"theme": b"light"}, removed=(), lifetime=60, ttl=60, replace=True)
+        assert await redis_store.read_fields("session_id", lifetime=60) == {"theme": b"light"}
+
+
+async def test_redis_hash_partial_write_of_missing_session() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisHashStore(connection=client, prefix="hash.")
+    async with client:
+        assert not await redis_store.write_fields(
+            "unknown_session_id", {"user": b"john"}, removed=(), lifetime=60, ttl=60, replace=False
+        )
+        assert await redis_store.read_fields("unknown_session_id", lifetime=60) == {}
+        assert not await client.exists("hash.unknown_session_id")
+
+
+async def test_redis_hash_read_write_blob() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisHashStore(connection=client, prefix="hash.")
+    async with client:
+        assert await redis_store.write("session_id", b"data", lifetime=60, ttl=60) == "session_id"
+        assert await redis_store.read("session_id", lifetime=60) == b"data"
+        assert await redis_store.read_fields("session_id", lifetime=60) == {"__data__": b"data"}
+        assert await redis_store.touch("session_id", lifetime=60, ttl=60)
+
+        await redis_store.remove("session_id")
+        assert await redis_store.read("session_id", lifetime=60) == b""
+
+
+async def test_redis_hash_rotate() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisHashStore(connection=client, prefix="hash.")
+    async with client:
+        await redis_store.write_fields("old_id", {"user": b"john"}, removed=(), lifetime=60, ttl=60, replace=True)
+        assert await redis_store.rotate("old_id", "new_id", b"new data", lifetime=60, ttl=60) == "new_id"
+        assert await redis_store.read_fields("old_id", lifetime=60) == {}
+        assert await redis_store.read("new_id", lifetime=60) == b"new data"
+        assert 0 < await client.ttl("hash.new_id") <= 60
+
+
+async def test_redis_reads_from_replicas() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    replicas = [redis.Redis.from_url(REDIS_URL + "/1"), redis.Redis.from_url(REDIS_URL + "/2")]
+    redis_store = RedisStore(connection=client, replicas=replicas)
+    async with client, replicas[0], replicas[1]:
+        await replicas[0].set("starsessions.session_id", b"first")
+        await replicas[1].set("starsessions.session_id", b"second")
+        await redis_store.write("session_id", b"primary", lifetime=60, ttl=60)
+
+        # without the read-your-writes window every read goes to the next replica
+        assert await redis_store.read("session_id", lifetime=60) == b"first"
+        assert await redis_store.read("session_id", lifetime=60) == b"second"
+        assert await redis_store.read("session_id", lifetime=60) == b"first"
+        assert await client.get("starsessions.session_id") == b"primary"
+        await replicas[0].delete("starsessions.session_id")
+        await replicas[1].delete("starsessions.session_id")
+
+
+async def test_redis_reads_recent_writes_from_primary() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    replica = redis.Redis.from_url(REDIS_URL + "/1")
+    redis_store = RedisStore(connection=client, replicas=[replica], primary_read_window=0.05)
+    async with client, replica:
+        await redis_store.write("session_id", b"primary", lifetime=60, ttl=60)
+        assert await redis_store.read("session_id", lifetime=60) == b"primary"
+
+        await asyncio.sleep(0.1)
+        await replica.set("starsessions.session_id", b"replica")
+        assert await redis_store.read("session_id", lifetime=60) == b"replica"
+        await replica.delete("starsessions.session_id")
+
+        await redis_store.rotate("session_id", "new_id", b"new", lifetime=60, ttl=60)
+        assert await redis_store.read("new_id", lifetime=60) == b"new"
+        assert await redis_store.read("session_id", lifetime=60) == b""
+        assert list(redis_store._recent_writes) == ["new_id", "session_id"]
+
+
+async def test_redis_falls_back_to_primary_when_replica_is_down() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    replica = redis.Redis.from_url(REDIS_URL + "/1")
+    redis_store = RedisStore(connection=client, replicas=[replica])
+    async with client, replica:
+        await redis_store.write("session_id", b"data", lifetime=60, ttl=60)
+        with mock.patch.object(replica, "get", side_effect=redis_exceptions.ConnectionError):
+            assert await redis_store.read("session_id", lifetime=60) == b"data"
+
+
+async def test_redis_hash_reads_from_replicas() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    replica = redis.Redis.from_url(REDIS_URL + "/1")
+    redis_store = RedisHashStore(connection=client, prefix="hash.", replicas=[replica], primary_read_window=60)
+    async with client, replica:
+        await redis_store.write_fields("session_id", {"user": b"john"}, removed=(), lifetime=60, ttl=60, replace=True)
+        assert await redis_store.read_fields("session_id", lifetime=60) == {"user": b"john"}
+
+        redis_store._recent_writes.clear()
+        await replica.hset("hash.session_id", "user", b"stale")
+        assert await redis_store.read_fields("session_id", lifetime=60) == {"user": b"stale"}
+        await replica.delete("hash.session_id")
+
+
+async def test_redis_reads_sessions_missing_on_replica_from_primary() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    replica = redis.Redis.from_url(REDIS_URL + "/1")
+    redis_store = RedisStore(connection=client, prefix="lag.", replicas=[replica])
+    async with client, replica:
+        # written by another process, not replicated yet
+        await client.set("lag.new", b"new")
+        await client.set("lag.both", b"primary")
+        await replica.set("lag.both", b"replica")
+        assert await redis_store.read("new", lifetime=60) == b"new"
+        assert await redis_store.read("unknown", lifetime=60) == b""
+
+        with mock.patch.object(client, "pipeline", wraps=client.pipeline) as pipeline_spy:
+            values = await redis_store.read_many(["both", "new", "unknown"], lifetime=60)
+        assert values == [b"replica", b"new", b""]
+        pipeline_spy.assert_called_once()  # only missing sessions are read from the primary
+
+        hash_store = RedisHashStore(connection=client, prefix="lag_hash.", replicas=[replica])
+        await client.hset("lag_hash.new", "user", b"john")
+        assert await hash_store.read_fields("new", lifetime=60) == {"user": b"john"}
+        await client.delete("lag.new", "lag.both", "lag_hash.new")
+        await replica.delete("lag.both")
+
+
+async def test_redis_bulk_operations() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisStore(connection=client, prefix="bulk.")
+    async with client:
+        for index in range(5):
+            await redis_store.write(f"session_{index}", str(index).encode(), lifetime=60, ttl=60)
+
+        with mock.patch("starsessions.stores.redis._BATCH_SIZE", 2):
+            assert await redis_store.read_many(["session_0", "unknown", "session_4"], lifetime=60) == [b"0", b"", b"4"]
+            assert sorted([session_id async for session_id in redis_store.iter_sessions()]) == [
+                f"session_{index}" for index in range(5)
+            ]
+            await redis_store.remove_many([f"session_{index}" for index in range(4)])
+
+        assert [session_id async for session_id in redis_store.iter_sessions()] == ["session_4"]
+        await redis_store.remove_many(["session_4"])
+        assert await redis_store.read_many([], lifetime=60) == []
+
+
+async def test_redis_iter_sessions_with_prefix_factory() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisStore(connection=client, prefix=lambda session_id: f"app[1]:{session_id}:session")
+    async with client:
+        await redis_store.write("session_id", b"data", lifetime=60, ttl=60)
+        await client.set("app1:other:session", b"data")
+        session_ids = [session_id async for session_id in redis_store.iter_sessions()]
+        assert "session_id" in session_ids
+        assert not [session_id for session_id in session_ids if "42" in session_id]
+        await redis_store.remove_many(["session_id"])
+        await client.delete("app1:other:session")
+
+    hashed_store = RedisStore(connection=client, prefix=lambda session_id: str(hash(session_id)))
+    with pytest.raises(NotImplementedError):
+        async for _ in hashed_store.iter_sessions():
+            pass
+
+
+async def test_redis_hash_read_many() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisHashStore(connection=client, prefix="hash.")
+    async with client:
+        await redis_store.write("first", b"1", lifetime=60, ttl=60)
+        await redis_store.write("second", b"2", lifetime=60, ttl=60)
+        assert await redis_store.read_many(["first", "unknown", "second"], lifetime=60) == [b"1", b"", b"2"]
+        await redis_store.remove_many(["first", "second"])
+        assert await redis_store.read_many(["first", "second"], lifetime=60) == [b"", b""]
+
+
+async def test_redis_hash_read_many_fields() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    replica = redis.Redis.from_url(REDIS_URL + "/1")
+    redis_store = RedisHashStore(connection=client, prefix="hash.", replicas=[replica])
+    async with client, replica:
+        # written by the session handler, there is no blob field
+        await redis_store.write_fields("first", {"user": b"john"}, removed=(), lifetime=60, ttl=60, replace=True)
+        await redis_store.write("second", b"2", lifetime=60, ttl=60)
+        assert await redis_store.read_many(["first"], lifetime=60) == [b""]
+        assert await redis_store.read_many_fields(["first", "unknown", "second"], lifetime=60) == [
+            {"user": b"john"},
+            {},
+            {FieldStore.BLOB_FIELD: b"2"},
+        ]
+        await redis_store.remove_many(["first", "second"])
+
+
+async def test_redis_user_index() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    user_index = RedisUserIndex(connection=client)
+    async with client:
+        await user_index.add("user", "first", ttl=60)
+        await user_index.add("user", "second", ttl=0)
+        await user_index.add("other", "third", ttl=60)
+        assert sorted(await user_index.get_sessions("user")) == ["first", "second"]
+        assert 3600 * 24 * 29 < await client.ttl("starsessions-user:user") <= 3600 * 24 * 30 + 1
+
+        await user_index.discard("user", "second")
+        assert await user_index.get_sessions("user") == ["first"]
+        assert 0 < await client.ttl("starsessions-user:user") <= 3600 * 24 * 30 + 1
+
+        assert await user_index.pop_sessions("user") == ["first"]
+        assert not await client.exists("starsessions-user:user")
+        assert await user_index.pop_sessions("other") == ["third"]
+
+
+async def test_redis_user_index_removes_expired_entries() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    user_index = RedisUserIndex(connection=client, prefix="users.")
+    async with client:
+        with mock.patch("starsessions.stores.redis.time.time", return_value=1_000_000):
+            await user_index.add("user", "expired", ttl=10)
+        await user_index.add("user", "active", ttl=60)
+        assert await client.zrange("users.user", 0, -1) == [b"active"]
+        assert 0 < await client.ttl("users.user") <= 61
+        await client.delete("users.user")
+
+
+async def test_redis_user_index_keys_do_not_overlap_sessions() -> None:
+    client = redis.Redis.from_url(REDIS_URL)
+    redis_store = RedisStore(connection=client)
+    hash_store = RedisHashStore(connection=client)
+    user_index = RedisUserIndex(connection=client)
+    async with client:
+        await redis_store.write("session_id", b"data", lifetime=60, ttl=60)
+        await user_index.add("42", "session_id", ttl=60)
+
+        # session IDs come from cookies, an index key must not be readable as a session
+        for session_id in ("user.42", "user:42", "-user:42", "42"):
+            assert await redis_store.read(session_id, lifetime=60) == b""
+            assert await hash_store.read_fields(session_id, lifetime=60) == {}
+        session_ids = [session_id async for session_id in redis_store.iter_sessions()]
+        assert "session_id" in session_ids
+        assert not [session_id for session_id in session_ids if "42" in session_id]
+        await user_index.pop_sessions("42")
+        await redis_store.remove("session_id")
@@ -0,0 +1,158 @@
+import asyncio
+import multiprocessing
+import pathlib
+import typing
+from unittest.mock import patch
+
+import pytest
+
+from starsessions import ImproperlyConfigured
+from starsessions.stores.shared import SharedMemoryStore
+
+
+@pytest.fixture
+async def shared_store(tmp_path: pathlib.Path) -> typing.AsyncGenerator[SharedMemoryStore, None]:
+    store = SharedMemoryStore(tmp_path / "sessions", capacity=64, max_value_size=64)
+    yield store
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_read_write(shared_store: SharedMemoryStore) -> None:
+    new_id = await shared_store.write("session_id", b"data", lifetime=60, ttl=60)
+    assert new_id == "session_id"
+    assert await shared_store.read("session_id", lifetime=60) == b"data"
+
+    await shared_store.write("session_id", b"new", lifetime=60, ttl=60)
+    assert await shared_store.read("session_id", lifetime=60) == b"new"
+
+
+@pytest.mark.asyncio
+async def test_shared_read_missing(shared_store: SharedMemoryStore) -> None:
+    assert await shared_store.read("unknown", lifetime=60) == b""
+
+
+@pytest.mark.asyncio
+async def test_shared_remove(shared_store: SharedMemoryStore) -> None:
+    await shared_store.write("session_id", b"data", lifetime=60, ttl=60)
+    await shared_store.remove("session_id")
+    assert await shared_store.read("session_id", lifetime=60) == b""
+    await shared_store.remove("session_id")
+
+
+@pytest.mark.asyncio
+async def test_shared_expires(shared_store: SharedMemoryStore) -> None:
+    base_ns = 1_000_000_000_000
+
+    with patch("starsessions.stores.shared.time") as mock_time:
+        mock_time.time_ns.return_value = base_ns
+        await shared_store.write("session_id", b"data", lifetime=60, ttl=30)
+        await shared_store.write("no_ttl", b"data", lifetime=0, ttl=0)
+
+        mock_time.time_ns.return_value = base_ns + 31 * 1_000_000_000
+        assert await shared_store.read("session_id", lifetime=60) == b""
+        assert await shared_store.read("no_ttl", lifetime=0) == b"data"
+        assert not await shared_store.touch("session_id", lifetime=60, ttl=30)
+
+
+@pytest.mark.asyncio
+async def test_shared_touch(shared_store: SharedMemoryStore) -> None:
+    base_ns = 1_000_000_000_000
+
+    with patch("starsessions.stores.shared.time") as mock_time:
+        mock_time.time_ns.return_value = base_ns
+        await shared_store.write("session_id", b"data", lifetime=60, ttl=30)
+
+        mock_time.time_ns.return_value = base_ns + 20 * 1_000_000_000
+        assert await shared_store.touch("session_id", lifetime=60, ttl=30)
+
+        mock_time.time_ns.return_value = base_ns + 40 * 1_000_000_000
+        assert await shared_store.read("session_id", lifetime=60) == b"data"
+
+
+@pytest.mark.asyncio
+async def test_shared_rotate(shared_store: SharedMemoryStore) -> None:
+    await shared_store.write("old_id", b"data", lifetime=60, ttl=60)
+    assert await shared_store.rotate("old_id", "new_id", b"new", lifetime=60, ttl=60) == "new_id"
+    assert await shared_store.read("old_id", lifetime=60) == b""
+    assert await shared_store.read("new_id", lifetime=60) == b"new"
+
+
+@pytest.mark.asyncio
+async def test_shared_rejects_large_value(shared_store: SharedMemoryStore) -> None:
+    with pytest.raises(ValueError, match="exceeds max_value_size"):
+        await shared_store.write("session_id", b"x" * 65, lifetime=60, ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_shared_full_bucket_evicts_first_expiring(tmp_path: pathlib.Path) -> None:
+    store = SharedMemoryStore(tmp_path / "sessions", capacity=2, slots_per_bucket=2)
+    await store.write("first", b"data", lifetime=60, ttl=60)
+    await store.write("second", b"data", lifetime=60, ttl=30)
+    await store.write("third", b"data", lifetime=60, ttl=60)
+
+    assert await store.read("first", lifetime=60) == b"data"
+    assert await store.read("second", lifetime=60) == b""
+    assert await store.read("third", lifetime=60) == b"data"
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_between_instances(tmp_path: pathlib.Path) -> None:
+    store = SharedMemoryStore(tmp_path / "sessions")
+    other = SharedMemoryStore(tmp_path / "sessions")
+
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+    assert await other.read("session_id", lifetime=60) == b"data"
+
+    await other.remove("session_id")
+    assert await store.read("session_id", lifetime=60) == b""
+    await store.close()
+    await other.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_reopens_after_close(tmp_path: pathlib.Path) -> None:
+    store = SharedMemoryStore(tmp_path / "sessions")
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+    await store.close()
+    await store.close()
+
+    assert await store.read("session_id", lifetime=60) == b"data"
+    assert await store.touch("session_id", lifetime=60, ttl=60)
+    await store.remove("session_id")
+    assert await store.read("session_id", lifetime=60) == b""
+    await store.close()
+
+
+def _write_in_process(path: str) -> None:
+    async def main() -> None:
+        store = SharedMemoryStore(path)
+        await store.write("session_id", b"from child", lifetime=60, ttl=60)
+        await store.close()
+
+    asyncio.run(main())
+
+
+@pytest.mark.asyncio
+async def test_shared_between_processes(tmp_path: pathlib.Path) -> None:
+    store = SharedMemoryStore(tmp_path / "sessions")
+    process = multiprocessing.get_context("spawn").Process(target=_write_in_process, args=(str(tmp_path / "sessions"),))
+    process.start()
+    process.join(timeout=30)
+
+    assert process.exitcode == 0
+    assert await store.read("session_id", lifetime=60) == b"from child"
+    await store.close()
+
+
+def test_shared_requires_same_layout(tmp_path: pathlib.Path) -> None:
+    SharedMemoryStore(tmp_path / "sessions", capacity=64)
+    with pytest.raises(ImproperlyConfigured, match="different capacity"):
+        SharedMemoryStore(tmp_path / "sessions", capacity=128)
+
+
+def test_shared_rejects_foreign_file(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "sessions").write_bytes(b"not a session store")
+    with pytest.raises(ImproperlyConfigured, match="not a session store file"):
+        SharedMemoryStore(tmp_path / "sessions")
@@ -0,0 +1,159 @@
+import asyncio
+import pathlib
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from starsessions import ImproperlyConfigured, SQLiteStore
+
+
+@pytest.fixture
+def sqlite_store(tmp_path: pathlib.Path) -> SQLiteStore:
+    return SQLiteStore(tmp_path / "sessions.db")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_read_write(sqlite_store: SQLiteStore) -> None:
+    new_id = await sqlite_store.write("session_id", b"data", lifetime=60, ttl=60)
+    assert new_id == "session_id"
+    assert await sqlite_store.read("session_id", lifetime=60) == b"data"
+
+    await sqlite_store.write("session_id", b"new", lifetime=60, ttl=60)
+    assert await sqlite_store.read("session_id", lifetime=60) == b"new"
+    await sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_read_missing(sqlite_store: SQLiteStore) -> None:
+    assert await sqlite_store.read("unknown", lifetime=60) == b""
+    await sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_remove(sqlite_store: SQLiteStore) -> None:
+    await sqlite_store.write("session_id", b"data", lifetime=60, ttl=60)
+    await sqlite_store.remove("session_id")
+    assert await sqlite_store.read("session_id", lifetime=60) == b""
+    await sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_expires(sqlite_store: SQLiteStore) -> None:
+    with patch("starsessions.stores.sqlite.time") as mock_time:
+        mock_time.time.return_value = 1_000_000
+        mock_time.monotonic.return_value = 0
+        await sqlite_store.write("session_id", b"data", lifetime=60, ttl=30)
+        await sqlite_store.write("no_ttl", b"data", lifetime=0, ttl=0)
+
+        mock_time.time.return_value = 1_000_031
+        assert await sqlite_store.read("session_id", lifetime=60) == b""
+        assert await sqlite_store.read("no_ttl", lifetime=0) == b"data"
+        assert not await sqlite_store.touch("session_id", lifetime=60, ttl=30)
+        await sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_touch(sqlite_store: SQLiteStore) -> None:
+    with patch("starsessions.stores.sqlite.time") as mock_time:
+        mock_time.time.return_value = 1_000_000
+        mock_time.monotonic.return_value = 0
+        await sqlite_store.write("session_id", b"data", lifetime=60, ttl=30)
+
+        mock_time.time.return_value = 1_000_020
+        assert await sqlite_store.touch("session_id", lifetime=60, ttl=30)
+
+        mock_time.time.return_value = 1_000_040
+        assert await sqlite_store.read("session_id", lifetime=60) == b"data"
+        await sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_rotate(sqlite_store: SQLiteStore) -> None:
+    await sqlite_store.write("old_id", b"data", lifetime=60, ttl=60)
+    assert await sqlite_store.rotate("old_id", "new_id", b"new", lifetime=60, ttl=60) == "new_id"
+    assert await sqlite_store.read("old_id", lifetime=60) == b""
+    assert await sqlite_store.read("new_id", lifetime=60) == b"new"
+    await sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_batches_concurrent_writes(sqlite_store: SQLiteStore) -> None:
+    await sqlite_store.write("warmup", b"data", lifetime=60, ttl=60)
+    with patch.object(sqlite_store, "_commit", wraps=sqlite_store._commit) as commit_spy:
+        await asyncio.gather(
+            *(sqlite_store.write(f"session_{i}", str(i).encode(), lifetime=60, ttl=60) for i in range(100))
+        )
+        assert commit_spy.call_count < 100
+
+    values = await asyncio.gather(*(sqlite_store.read(f"session_{i}", lifetime=60) for i in range(100)))
+    assert values == [str(i).encode() for i in range(100)]
+    await sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_failed_batch_is_rolled_back(sqlite_store: SQLiteStore) -> None:
+    await sqlite_store.write("session_id", b"data", lifetime=60, ttl=60)
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        await sqlite_store._execute([sqlite_store._delete("session_id"), ("INSERT INTO missing VALUES (1)", ())])
+    assert await sqlite_store.read("session_id", lifetime=60) == b"data"
+    await sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_removes_expired_sessions(tmp_path: pathlib.Path) -> None:
+    store = SQLiteStore(tmp_path / "sessions.db", gc_interval=0.01)
+    with patch("starsessions.stores.sqlite.time.time", return_value=1_000_000):
+        await store.write("expired", b"data", lifetime=60, ttl=30)
+    await store.write("session_id", b"data", lifetime=60, ttl=30)
+    await asyncio.sleep(0.1)
+    await store.close()
+
+    with sqlite3.connect(tmp_path / "sessions.db") as connection:
+        assert connection.execute("SELECT id FROM sessions").fetchall() == [("session_id",)]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_uses_wal(sqlite_store: SQLiteStore, tmp_path: pathlib.Path) -> None:
+    await sqlite_store.write("session_id", b"data", lifetime=60, ttl=60)
+    await sqlite_store.close()
+
+    with sqlite3.connect(tmp_path / "sessions.db") as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        indexes = connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+        assert ("sessions_expires",) in indexes
+
+
+@pytest.mark.asyncio
+async def test_sqlite_reopen_after_close(sqlite_store: SQLiteStore, tmp_path: pathlib.Path) -> None:
+    await sqlite_store.write("session_id", b"data", lifetime=60, ttl=60)
+    await sqlite_store.close()
+    assert await sqlite_store.read("session_id", lifetime=60) == b"data"
+    await sqlite_store.close()
+
+    other = SQLiteStore(tmp_path / "sessions.db")
+    assert await other.read("session_id", lifetime=60) == b"data"
+    await other.close()
+
+
+def test_sqlite_validates_table_name(tmp_path: pathlib.Path) -> None:
+    with pytest.raises(ImproperlyConfigured, match="Invalid table name"):
+        SQLiteStore(tmp_path / "sessions.db", table="sessions; DROP TABLE users")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_bulk_operations(tmp_path: pathlib.Path) -> None:
+    store = SQLiteStore(tmp_path / "sessions.db", batch_size=2)
+    with patch("starsessions.stores.sqlite.time.time", return_value=1_000_000):
+        await store.write("expired", b"data", lifetime=60, ttl=30)
+    for index in range(5):
+        await store.write(f"session_{index}", str(index).encode(), lifetime=60, ttl=60)
+
+    assert await store.read_many(["session_0", "unknown", "session_4"], lifetime=60) == [b"0", b"", b"4"]
+    assert [session_id async for session_id in store.iter_sessions()] == [f"session_{index}" for index in range(5)]
+
+    with patch.object(store, "_commit", wraps=store._commit) as commit_spy:
+        await store.remove_many([f"session_{index}" for index in range(4)])
+        commit_spy.assert_called_once()
+    assert [session_id async for session_id in store.iter_sessions()] == ["session_4"]
+    await store.close()
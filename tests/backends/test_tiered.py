@@ -0,0 +1,211 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from starsessions import ImproperlyConfigured
+from starsessions.stores import CookieStore, InMemoryStore, TieredStore, WriteBehindStore
+
+
+@pytest.fixture
+def hot() -> InMemoryStore:
+    return InMemoryStore()
+
+
+@pytest.fixture
+def cold() -> InMemoryStore:
+    return InMemoryStore()
+
+
+@pytest.fixture
+def store(hot: InMemoryStore, cold: InMemoryStore) -> TieredStore:
+    return TieredStore(hot, cold)
+
+
+async def test_tiered_writes_to_both_tiers(store: TieredStore, hot: InMemoryStore, cold: InMemoryStore) -> None:
+    assert await store.write("session_id", b"data", lifetime=60, ttl=60) == "session_id"
+    assert await hot.read("session_id", lifetime=60) == b"data"
+    assert await store.read("session_id", lifetime=60) == b"data"
+
+    await store.cold.flush()
+    assert await cold.read("session_id", lifetime=60) == b"data"
+    await store.close()
+
+
+async def test_tiered_promotes_cold_sessions(store: TieredStore, hot: InMemoryStore, cold: InMemoryStore) -> None:
+    await cold.write("session_id", b"data", lifetime=60, ttl=60)
+    assert await store.read("session_id", lifetime=60) == b"data"
+    assert await hot.read("session_id", lifetime=60) == b"data"
+    assert store.promotions == 1
+
+    with mock.patch.object(cold, "read", wraps=cold.read) as read_spy:
+        assert await store.read("session_id", lifetime=60) == b"data"
+        read_spy.assert_not_called()
+    assert await store.read("unknown", lifetime=60) == b""
+    assert store.promotions == 1
+    await store.close()
+
+
+async def test_tiered_demotes_idle_sessions(store: TieredStore, hot: InMemoryStore, cold: InMemoryStore) -> None:
+    with mock.patch("starsessions.stores.tiered.time") as mock_time:
+        mock_time.monotonic.return_value = 1000
+        await store.write("idle", b"idle data", lifetime=60, ttl=60)
+        await store.write("active", b"active data", lifetime=60, ttl=60)
+
+        mock_time.monotonic.return_value = 1500
+        await store.read("active", lifetime=60)
+
+        mock_time.monotonic.return_value = 1601
+        assert await store.demote_idle() == 1
+        assert store.demotions == 1
+
+    assert await hot.read("idle", lifetime=60) == b""
+    assert await hot.read("active", lifetime=60) == b"active data"
+    assert await store.read("idle", lifetime=60) == b"idle data"  # read from the cold tier and promoted
+    assert await hot.read("idle", lifetime=60) == b"idle data"
+    await store.close()
+
+
+async def test_tiered_demotes_in_background(hot: InMemoryStore, cold: InMemoryStore) -> None:
+    store = TieredStore(hot, cold, idle_timeout=0.01, sweep_interval=0.01)
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+    for _ in range(100):
+        if store.demotions:
+            break
+        await asyncio.sleep(0.01)
+
+    assert await hot.read("session_id", lifetime=60) == b""
+    assert await store.read("session_id", lifetime=60) == b"data"
+    await store.close()
+
+
+async def test_tiered_touch(store: TieredStore, cold: InMemoryStore) -> None:
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+    await store.flush()
+    with mock.patch.object(cold, "touch", wraps=cold.touch) as touch_spy:
+        assert await store.touch("session_id", lifetime=60, ttl=120)
+        assert not await store.touch("unknown", lifetime=60, ttl=120)
+        await store.flush()
+        touch_spy.assert_called_once_with("session_id", lifetime=60, ttl=120)
+    await store.close()
+
+
+async def test_tiered_touch_restores_lost_cold_session(store: TieredStore, cold: InMemoryStore) -> None:
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+    await store.flush()
+    await cold.remove("session_id")  # expired in the cold store
+
+    assert await store.touch("session_id", lifetime=60, ttl=120)
+    await store.flush()
+    assert await cold.read("session_id", lifetime=60) == b"data"
+    await store.close()
+
+
+async def test_tiered_touch_does_not_wait_for_cold_store(store: TieredStore, cold: InMemoryStore) -> None:
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+    await store.flush()
+
+    release = asyncio.Event()
+
+    async def slow_touch(session_id: str, lifetime: int, ttl: int) -> bool:
+        await release.wait()
+        return True
+
+    with mock.patch.object(cold, "touch", slow_touch):
+        assert await asyncio.wait_for(store.touch("session_id", lifetime=60, ttl=120), timeout=1)
+        release.set()
+        await store.flush()
+    await store.close()
+
+
+async def test_tiered_remove(store: TieredStore, hot: InMemoryStore, cold: InMemoryStore) -> None:
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+    await store.remove("session_id")
+    assert await store.read("session_id", lifetime=60) == b""
+
+    await store.cold.flush()
+    assert await hot.read("session_id", lifetime=60) == b""
+    assert await cold.read("session_id", lifetime=60) == b""
+    await store.close()
+
+
+async def test_tiered_rotate(store: TieredStore, hot: InMemoryStore, cold: InMemoryStore) -> None:
+    await store.write("old_id", b"data", lifetime=60, ttl=60)
+    assert await store.rotate("old_id", "new_id", b"new", lifetime=60, ttl=60) == "new_id"
+    assert await store.read("old_id", lifetime=60) == b""
+    assert await store.read("new_id", lifetime=60) == b"new"
+
+    await store.close()
+    assert await cold.read("old_id", lifetime=60) == b""
+    assert await cold.read("new_id", lifetime=60) == b"new"
+
+
+async def test_tiered_ignores_promotions_outdated_by_write(store: TieredStore, cold: InMemoryStore) -> None:
+    await cold.write("session_id", b"old", lifetime=60, ttl=60)
+
+    async def slow_read(session_id: str, lifetime: int) -> bytes:
+        await asyncio.sleep(0.01)
+        return b"old"
+
+    with mock.patch.object(cold, "read", side_effect=slow_read):
+        read = asyncio.create_task(store.read("session_id", lifetime=60))
+        await asyncio.sleep(0)
+        await store.write("session_id", b"new", lifetime=60, ttl=60)
+        assert await read == b"old"
+
+    assert await store.read("session_id", lifetime=60) == b"new"
+    assert store.promotions == 0
+    await store.close()
+
+
+async def test_tiered_reuses_write_behind_store(hot: InMemoryStore, cold: InMemoryStore) -> None:
+    write_behind = WriteBehindStore(cold, concurrency=1)
+    store = TieredStore(hot, write_behind)
+    assert store.cold is write_behind
+
+    with pytest.raises(ImproperlyConfigured):
+        TieredStore(CookieStore("key"), cold)
+
+
+async def test_tiered_sees_changes_of_other_processes(cold: InMemoryStore) -> None:
+    worker_a = TieredStore(InMemoryStore(), cold)
+    worker_b = TieredStore(InMemoryStore(), cold)
+    with mock.patch("starsessions.stores.tiered.time") as mock_time:
+        mock_time.monotonic.return_value = 1000
+        await worker_a.write("session_id", b"v1", lifetime=60, ttl=60)
+        await worker_a.cold.flush()
+        assert await worker_b.read("session_id", lifetime=60) == b"v1"
+
+        await worker_a.write("session_id", b"v2", lifetime=60, ttl=60)
+        await worker_a.cold.flush()
+        mock_time.monotonic.return_value = 1004
+        assert await worker_b.read("session_id", lifetime=60) == b"v1"  # within max_staleness
+
+        mock_time.monotonic.return_value = 1005
+        assert await worker_b.read("session_id", lifetime=60) == b"v2"
+        assert worker_b.promotions == 1
+
+        # removal by another worker
+        await worker_a.remove("session_id")
+        await worker_a.cold.flush()
+        mock_time.monotonic.return_value = 1010
+        assert await worker_b.read("session_id", lifetime=60) == b""
+        assert await worker_b.hot.read("session_id", lifetime=60) == b""
+
+    await worker_a.close()
+    await worker_b.close()
+
+
+async def test_tiered_promotion_does_not_outlive_cold_session(hot: InMemoryStore, cold: InMemoryStore) -> None:
+    store = TieredStore(hot, cold, idle_timeout=30, max_staleness=0)
+    await cold.write("session_id", b"data", lifetime=3600, ttl=10)
+    with mock.patch.object(hot, "write", wraps=hot.write) as write_spy:
+        assert await store.read("session_id", lifetime=3600) == b"data"
+        assert await store.read("session_id", lifetime=3600) == b"data"
+    write_spy.assert_called_once_with("session_id", b"data", lifetime=3600, ttl=30)  # reads do not extend expiry
+
+    # expired in the cold store
+    with mock.patch.object(cold, "read", return_value=b""):
+        assert await store.read("session_id", lifetime=3600) == b""
+    assert await hot.read("session_id", lifetime=3600) == b""
+    await store.close()
@@ -0,0 +1,124 @@
+import asyncio
+import contextlib
+import pathlib
+import tempfile
+import typing
+
+import pytest
+
+from starsessions import InMemoryStore, SessionError, UnixSocketStore
+from starsessions.server import SessionServer, main
+
+
+@pytest.fixture
+def socket_path() -> typing.Generator[pathlib.Path, None, None]:
+    # pytest temporary directories may exceed the max length of Unix socket path
+    with tempfile.TemporaryDirectory() as directory:
+        yield pathlib.Path(directory) / "sessions.sock"
+
+
+@pytest.fixture
+def backend() -> InMemoryStore:
+    return InMemoryStore()
+
+
+@contextlib.asynccontextmanager
+async def serve(backend: InMemoryStore, socket_path: pathlib.Path) -> typing.AsyncIterator[UnixSocketStore]:
+    server = SessionServer(backend, max_value_size=1024)
+    await server.start(socket_path)
+    store = UnixSocketStore(socket_path, pool_size=2)
+    try:
+        yield store
+    finally:
+        await store.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_read_write(backend: InMemoryStore, socket_path: pathlib.Path) -> None:
+    async with serve(backend, socket_path) as unix_store:
+        new_id = await unix_store.write("session_id", b"data", lifetime=60, ttl=60)
+        assert new_id == "session_id"
+        assert await unix_store.read("session_id", lifetime=60) == b"data"
+        assert await backend.read("session_id", lifetime=60) == b"data"
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_read_missing(backend: InMemoryStore, socket_path: pathlib.Path) -> None:
+    async with serve(backend, socket_path) as unix_store:
+        assert await unix_store.read("unknown", lifetime=60) == b""
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_remove(backend: InMemoryStore, socket_path: pathlib.Path) -> None:
+    async with serve(backend, socket_path) as unix_store:
+        await unix_store.write("session_id", b"data", lifetime=60, ttl=60)
+        await unix_store.remove("session_id")
+        assert await unix_store.read("session_id", lifetime=60) == b""
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_touch(backend: InMemoryStore, socket_path: pathlib.Path) -> None:
+    async with serve(backend, socket_path) as unix_store:
+        assert not await unix_store.touch("session_id", lifetime=60, ttl=60)
+        await unix_store.write("session_id", b"data", lifetime=60, ttl=60)
+        assert await unix_store.touch("session_id", lifetime=60, ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_rotate(backend: InMemoryStore, socket_path: pathlib.Path) -> None:
+    async with serve(backend, socket_path) as unix_store:
+        await unix_store.write("old_id", b"data", lifetime=60, ttl=60)
+        assert await unix_store.rotate("old_id", "new_id", b"new", lifetime=60, ttl=60) == "new_id"
+        assert await unix_store.read("old_id", lifetime=60) == b""
+        assert await unix_store.read("new_id", lifetime=60) == b"new"
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_pipelines_requests(backend: InMemoryStore, socket_path: pathlib.Path) -> None:
+    async with serve(backend, socket_path) as unix_store:
+        await asyncio.gather(
+            *(unix_store.write(f"session_{i}", str(i).encode(), lifetime=60, ttl=60) for i in range(200))
+        )
+        values = await asyncio.gather(*(unix_store.read(f"session_{i}", lifetime=60) for i in range(200)))
+        assert values == [str(i).encode() for i in range(200)]
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_store_error(backend: InMemoryStore, socket_path: pathlib.Path) -> None:
+    async with serve(backend, socket_path) as unix_store:
+        with pytest.raises(SessionError, match="the limit is 1024 bytes"):
+            await unix_store.write("session_id", b"x" * 1025, lifetime=60, ttl=60)
+
+        # a new connection is made after the server dropped the previous one
+        await unix_store.write("session_id", b"data", lifetime=60, ttl=60)
+        assert await unix_store.read("session_id", lifetime=60) == b"data"
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_reconnects_after_server_restart(backend: InMemoryStore, socket_path: pathlib.Path) -> None:
+    server = SessionServer(backend)
+    await server.start(socket_path)
+    store = UnixSocketStore(socket_path, pool_size=1)
+    await store.write("session_id", b"data", lifetime=60, ttl=60)
+    connection = await store._connections.get_connection()
+
+    await server.stop()
+    await server.start(socket_path)
+
+    assert await store.read("session_id", lifetime=60) == b"data"
+    assert connection.closed
+    await store.close()
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_server_not_running(socket_path: pathlib.Path) -> None:
+    store = UnixSocketStore(socket_path)
+    with pytest.raises(OSError):
+        await store.read("session_id", lifetime=60)
+
+
+def test_server_main_requires_socket_path() -> None:
+    with pytest.raises(SystemExit):
+        main([])
@@ -0,0 +1,175 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+from starlette.testclient import TestClient
+from starlette.types import Message, Receive, Scope, Send
+
+from starsessions import ImproperlyConfigured, SessionMiddleware, load_session
+from starsessions.stores import CookieStore, InMemoryStore, WriteBehindStore
+
+
+@pytest.fixture
+def backend() -> InMemoryStore:
+    return InMemoryStore()
+
+
+@pytest.fixture
+def store(backend: InMemoryStore) -> WriteBehindStore:
+    return WriteBehindStore(backend)
+
+
+async def test_write_behind_writes_in_background(store: WriteBehindStore, backend: InMemoryStore) -> None:
+    assert await store.write("session_id", b"data", lifetime=60, ttl=60) == "session_id"
+    assert await backend.read("session_id", lifetime=60) == b""
+    assert await store.read("session_id", lifetime=60) == b"data"  # served from the queue
+    assert store.pending == 1
+
+    await store.flush()
+    assert await backend.read("session_id", lifetime=60) == b"data"
+    assert store.pending == 0
+    await store.close()
+
+
+async def test_write_behind_coalesces_writes(store: WriteBehindStore, backend: InMemoryStore) -> None:
+    with mock.patch.object(backend, "write", wraps=backend.write) as write_spy:
+        await store.write("session_id", b"first", lifetime=60, ttl=60)
+        await store.write("session_id", b"second", lifetime=60, ttl=60)
+        await store.touch("session_id", lifetime=60, ttl=120)
+        await store.flush()
+
+    write_spy.assert_called_once_with("session_id", b"second", lifetime=60, ttl=120)
+    await store.close()
+
+
+async def test_write_behind_remove(store: WriteBehindStore, backend: InMemoryStore) -> None:
+    await backend.write("session_id", b"data", lifetime=60, ttl=60)
+    await store.remove("session_id")
+    assert await store.read("session_id", lifetime=60) == b""
+    assert not await store.touch("session_id", lifetime=60, ttl=60)
+
+    await store.flush()
+    assert await backend.read("session_id", lifetime=60) == b""
+    await store.close()
+
+
+async def test_write_behind_touch(store: WriteBehindStore, backend: InMemoryStore) -> None:
+    await backend.write("session_id", b"data", lifetime=60, ttl=60)
+    with mock.patch.object(backend, "touch", wraps=backend.touch) as touch_spy:
+        assert await store.touch("session_id", lifetime=60, ttl=60)
+        await store.flush()
+    touch_spy.assert_called_once_with("session_id", lifetime=60, ttl=60)
+    await store.close()
+
+
+async def test_write_behind_touch_fails_when_store_cannot_touch(backend: InMemoryStore) -> None:
+    store = WriteBehindStore(backend)
+    assert not await store.touch("missing", lifetime=60, ttl=60)  # evicted or expired in the store
+
+    with mock.patch.object(backend, "touch", return_value=False):
+        await backend.write("session_id", b"data", lifetime=60, ttl=60)
+        assert not await store.touch("session_id", lifetime=60, ttl=60)
+    assert store.pending == 0
+    await store.close()
+
+
+async def test_write_behind_waits_when_queue_is_full(backend: InMemoryStore) -> None:
+    store = WriteBehindStore(backend, max_pending=1)
+    release = asyncio.Event()
+
+    async def slow_write(session_id: str, data: bytes, lifetime: int, ttl: int) -> str:
+        await release.wait()
+        return session_id
+
+    with mock.patch.object(backend, "write", side_effect=slow_write):
+        await store.write("first", b"data", lifetime=60, ttl=60)
+        second = asyncio.create_task(store.write("second", b"data", lifetime=60, ttl=60))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+
+        release.set()
+        await asyncio.wait_for(second, 1)
+        await store.close()
+
+
+async def test_write_behind_reports_errors(backend: InMemoryStore) -> None:
+    on_error = mock.MagicMock()
+    store = WriteBehindStore(backend, on_error=on_error)
+    error = RuntimeError("connection refused")
+    with mock.patch.object(backend, "write", side_effect=error):
+        await store.write("session_id", b"data", lifetime=60, ttl=60)
+        await store.flush()
+
+    on_error.assert_called_once_with("session_id", error)
+    assert store.pending == 0
+    await store.close()
+
+
+async def test_write_behind_close_drains_queue(store: WriteBehindStore, backend: InMemoryStore) -> None:
+    for index in range(10):
+        await store.write(f"session_{index}", b"data", lifetime=60, ttl=60)
+    await store.close()
+
+    for index in range(10):
+        assert await backend.read(f"session_{index}", lifetime=60) == b"data"
+
+
+def test_write_behind_rejects_cookie_store() -> None:
+    with pytest.raises(ImproperlyConfigured):
+        WriteBehindStore(CookieStore("key"))
+
+
+def test_middleware_closes_store_on_shutdown(store: WriteBehindStore) -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "lifespan"
+        while True:
+            message: Message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    middleware = SessionMiddleware(app, store=store)
+    with mock.patch.object(store, "close") as close_spy, TestClient(middleware):
+        close_spy.assert_not_called()
+    close_spy.assert_called_once()
+
+
+def test_middleware_with_write_behind_store(store: WriteBehindStore, backend: InMemoryStore) -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+
+        connection = HTTPConnection(scope, receive)
+        await load_session(connection)
+        connection.session.setdefault("visits", 0)
+        connection.session["visits"] += 1
+        response = JSONResponse(connection.session)
+        await response(scope, receive, send)
+
+    middleware = SessionMiddleware(app, store=store, lifetime=60, cookie_https_only=False)
+    with TestClient(middleware) as client:
+        assert client.get("/").json() == {"visits": 1}
+        assert client.get("/").json() == {"visits": 2}
+        session_id = client.cookies["session"]
+
+    assert b'"visits": 2' in asyncio.run(backend.read(session_id, lifetime=60))
+
+
+async def test_write_behind_rotate(store: WriteBehindStore, backend: InMemoryStore) -> None:
+    await backend.write("old_id", b"data", lifetime=60, ttl=60)
+    await store.rotate("old_id", "new_id", b"new data", lifetime=60, ttl=60)
+    assert await store.read("old_id", lifetime=60) == b""
+    assert await store.read("new_id", lifetime=60) == b"new data"
+
+    await store.flush()
+    assert await backend.read("old_id", lifetime=60) == b""
+    assert await backend.read("new_id", lifetime=60) == b"new data"
+    await store.close()
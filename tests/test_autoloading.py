@@ -1,4 +1,5 @@
 import re
+import typing
 
 import pytest
 from starlette.requests import HTTPConnection
@@ -12,6 +13,7 @@ from starsessions import (
     SessionNotLoaded,
     SessionStore,
 )
+from starsessions.middleware import PathMatcher
 
 
 @pytest.mark.asyncio
@@ -70,3 +72,25 @@ async def test_loads_for_regex_paths(store: SessionStore) -> None:
     assert client.get("/admin").json() == {"key": "value"}
     assert client.get("/app/1/users").json() == {"key": "value"}
     assert client.get("/admin/settings").json() == {"key": "value"}
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/", "", "/app", "/application", "/admin/users", "/adm", "/api/v1/users", "/api/v12", "/static/app.css", "/USERS"],
+)
+def test_path_matcher_is_equivalent_to_re_match(path: str) -> None:
+    patterns: list[typing.Union[str, re.Pattern[str]]] = [
+        "/app",
+        "/admin/",
+        r"/api/v\d/",
+        re.compile("/static/.*\\.css$"),
+        re.compile("/users", re.IGNORECASE),
+        "/(?P<lang>en|de)/",
+    ]
+    expected = any(re.match(pattern, path) for pattern in patterns)
+    assert PathMatcher(patterns).match(path) == expected
+
+
+def test_path_matcher_empty_prefix_matches_everything() -> None:
+    assert PathMatcher([""]).match("/anything")
+    assert not PathMatcher([]).match("/anything")
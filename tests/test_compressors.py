@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+from starsessions.compressors import NoopCompressor, ZlibCompressor, ZstdCompressor
+
+DATA = json.dumps({"cart": [{"sku": f"item-{i}", "quantity": 1, "price": "9.99"} for i in range(100)]}).encode()
+
+
+def test_noop_round_trip() -> None:
+    compressor = NoopCompressor()
+    assert compressor.compress(DATA) == DATA
+    assert compressor.decompress(DATA) == DATA
+
+
+class TestZlibCompressor:
+    def test_zlib_round_trip(self) -> None:
+        compressor = ZlibCompressor()
+        compressed = compressor.compress(DATA)
+        assert compressed[:1] == b"\x01"
+        assert len(compressed) < len(DATA) / 5
+        assert compressor.decompress(compressed) == DATA
+
+    def test_zlib_skips_small_data(self) -> None:
+        compressor = ZlibCompressor(threshold=1024)
+        assert compressor.compress(b'{"user": "alice"}') == b'{"user": "alice"}'
+
+    def test_zlib_skips_incompressible_data(self) -> None:
+        compressor = ZlibCompressor(threshold=0)
+        data = os.urandom(2048)
+        assert compressor.compress(data) == data
+
+    def test_zlib_reads_uncompressed_data(self) -> None:
+        assert ZlibCompressor().decompress(DATA) == DATA
+        assert ZlibCompressor().decompress(b"") == b""
+
+    def test_zlib_dictionary(self) -> None:
+        compressor = ZlibCompressor(threshold=0, dictionary=DATA)
+        data = b'{"cart": [{"sku": "item-1", "quantity": 1, "price": "9.99"}]}'
+        compressed = compressor.compress(data)
+        assert compressed[:1] == b"\x02"
+        assert len(compressed) < len(ZlibCompressor(threshold=0).compress(data))
+        assert compressor.decompress(compressed) == data
+
+        # sessions compressed before a dictionary was configured are readable
+        assert compressor.decompress(ZlibCompressor().compress(DATA)) == DATA
+        with pytest.raises(ValueError, match="dictionary"):
+            ZlibCompressor().decompress(compressed)
+
+
+class TestZstdCompressor:
+    @pytest.fixture(autouse=True)
+    def require_zstandard(self) -> None:
+        pytest.importorskip("zstandard")
+
+    def test_zstd_round_trip(self) -> None:
+        compressor = ZstdCompressor()
+        compressed = compressor.compress(DATA)
+        assert compressed[:1] == b"\x03"
+        assert len(compressed) < len(DATA) / 5
+        assert compressor.decompress(compressed) == DATA
+        assert compressor.decompress(DATA) == DATA
+        assert compressor.compress(b"{}") == b"{}"
+
+    def test_zstd_dictionary(self) -> None:
+        compressor = ZstdCompressor(threshold=0, dictionary=DATA)
+        data = b'{"cart": [{"sku": "item-1", "quantity": 1, "price": "9.99"}]}'
+        compressed = compressor.compress(data)
+        assert compressed[:1] == b"\x04"
+        assert compressor.decompress(compressed) == data
+        assert compressor.decompress(ZstdCompressor().compress(DATA)) == DATA
+        with pytest.raises(ValueError, match="dictionary"):
+            ZstdCompressor().decompress(compressed)
@@ -1,3 +1,5 @@
+import warnings
+
 import pytest
 
 from starsessions.encryptors import AESGCMEncryptor, FernetEncryptor, NoopEncryptor
@@ -21,6 +23,13 @@ def test_noop_round_trip() -> None:
         assert enc.decrypt(enc.encrypt(b"hello")) == b"hello"
 
 
+def test_noop_without_warning() -> None:
+    enc = NoopEncryptor(warn=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert enc.decrypt(enc.encrypt(b"hello")) == b"hello"
+
+
 class TestFernetEncryptor:
     def test_fernet_round_trip(self, fernet_key: bytes) -> None:
         enc = FernetEncryptor(fernet_key)
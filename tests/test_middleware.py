@@ -1,14 +1,29 @@
+import asyncio
 import datetime
+import typing
+from unittest import mock
 
+import httpx
 import pytest
 from cryptography.fernet import Fernet
-from starlette.requests import HTTPConnection
+from starlette.requests import HTTPConnection, cookie_parser
 from starlette.responses import JSONResponse, Response
 from starlette.testclient import TestClient
 from starlette.types import Receive, Scope, Send
 
-from starsessions import SessionMiddleware, SessionStore
-from starsessions.encryptors import FernetEncryptor
+from starsessions import (
+    CookieStore,
+    EncryptedCookieStore,
+    InMemoryStore,
+    InMemoryUserIndex,
+    SessionMiddleware,
+    SessionStore,
+    regenerate_session_id,
+    revoke_user_sessions,
+)
+from starsessions.compressors import ZlibCompressor
+from starsessions.encryptors import FernetEncryptor, NoopEncryptor
+from starsessions.middleware import _get_cookie
 from starsessions.session import load_session
 
 
@@ -410,3 +425,306 @@ def test_encryptor_round_trip_via_middleware(store: SessionStore) -> None:
     read_client = TestClient(read_middleware, cookies={"session": session_cookie})
     result = read_client.get("/")
     assert result.json().get("secret") == "classified"
+
+
+def test_encrypted_cookie_store_via_middleware() -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        connection = HTTPConnection(scope, receive)
+        await load_session(connection)
+        connection.session.setdefault("visits", 0)
+        connection.session["visits"] += 1
+        response = JSONResponse(connection.session["visits"])
+        await response(scope, receive, send)
+
+    middleware = SessionMiddleware(app, store=EncryptedCookieStore(b"\x00" * 32), cookie_https_only=False, lifetime=60)
+    assert isinstance(middleware.encryptor, NoopEncryptor)
+    assert not middleware.encryptor.warn  # the store encrypts data
+    assert SessionMiddleware(app, store=CookieStore("key")).encryptor.warn  # type: ignore[attr-defined]
+
+    client = TestClient(middleware)
+    assert client.get("/").json() == 1
+    assert client.get("/").json() == 2
+    assert "visits" not in client.cookies["session"]
+
+
+def test_cookie_store_chunks() -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        connection = HTTPConnection(scope, receive)
+        await load_session(connection)
+        if "size" in connection.query_params:
+            connection.session["data"] = "x" * int(connection.query_params["size"])
+        if "clear" in connection.query_params:
+            connection.session.clear()
+        response = JSONResponse(len(connection.session.get("data", "")))
+        await response(scope, receive, send)
+
+    def set_cookies(response: httpx.Response) -> dict[str, str]:
+        return dict(cookie.split("; ")[0].split("=", 1) for cookie in response.headers.get_list("set-cookie"))
+
+    store = CookieStore("key", max_size=300, max_chunks=5)
+    client = TestClient(SessionMiddleware(app, store=store, cookie_https_only=False, lifetime=60))
+
+    # a small session is stored in one cookie
+    response = client.get("/", params={"size": "10"})
+    assert list(set_cookies(response)) == ["session"]
+
+    # a large session is split into chunks and the single cookie is removed
+    response = client.get("/", params={"size": "600"})
+    cookies = set_cookies(response)
+    assert list(cookies) == ["session.0", "session.1", "session.2", "session.3", "session"]
+    assert cookies["session"] == "''"
+    assert all(len(cookies[f"session.{index}"]) == 300 for index in range(3))
+    assert client.get("/").json() == 600
+
+    # stale chunks are removed when the session becomes smaller
+    response = client.get("/", params={"size": "400"})
+    assert set_cookies(response)["session.3"] == "''"
+    assert client.get("/").json() == 400
+    assert sorted(client.cookies) == ["session.0", "session.1", "session.2"]
+
+    response = client.get("/", params={"size": "10"})
+    assert list(set_cookies(response)) == ["session", "session.0", "session.1", "session.2"]
+    assert client.get("/").json() == 10
+    assert list(client.cookies) == ["session"]
+
+    client.get("/", params={"size": "400"})
+    response = client.get("/", params={"clear": "1"})
+    assert set(set_cookies(response).values()) == {"''"}
+    assert not client.cookies
+
+    with pytest.raises(ValueError, match="too large"):
+        client.get("/", params={"size": "2000"})
+
+
+async def test_compressor_via_middleware(store: InMemoryStore) -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        connection = HTTPConnection(scope, receive)
+        await load_session(connection)
+        if connection.query_params.get("items"):
+            connection.session["cart"] = ["item"] * int(connection.query_params["items"])
+        response = JSONResponse(len(connection.session.get("cart", [])))
+        await response(scope, receive, send)
+
+    await store.write("uncompressed", b'{"cart": ["item"]}', lifetime=60, ttl=60)
+    middleware = SessionMiddleware(
+        app, store=store, compressor=ZlibCompressor(threshold=500), lifetime=60, cookie_https_only=False
+    )
+    # sessions stored before compression was enabled are readable
+    assert TestClient(middleware, cookies={"session": "uncompressed"}).get("/").json() == 1
+
+    client = TestClient(middleware)
+    client.get("/", params={"items": "1000"})
+    raw = await store.read(client.cookies["session"], lifetime=60)
+    assert raw[:1] == b"\x01"
+    assert len(raw) < 200
+    assert client.get("/").json() == 1000
+
+    client.get("/", params={"items": "2"})
+    raw = await store.read(client.cookies["session"], lifetime=60)
+    assert raw.startswith(b'{"cart": ["item", "item"]')  # smaller than threshold
+
+
+def test_unchanged_session_is_not_written(store: SessionStore) -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        connection = HTTPConnection(scope, receive)
+        await load_session(connection)
+        if connection.query_params.get("set"):
+            connection.session["key"] = connection.query_params["set"]
+        response = JSONResponse(connection.session)
+        await response(scope, receive, send)
+
+    middleware = SessionMiddleware(app, store=store, lifetime=60, cookie_https_only=False)
+    client = TestClient(middleware)
+    assert client.get("/", params={"set": "value"}).json() == {"key": "value"}
+
+    with mock.patch.object(store, "write", wraps=store.write) as write_spy:
+        response = client.get("/")
+        assert response.json() == {"key": "value"}
+        assert "session" in response.headers["set-cookie"]
+        write_spy.assert_not_called()
+
+        client.get("/", params={"set": "changed"})
+        write_spy.assert_called_once()
+
+
+def test_unchanged_rolling_session_is_touched(store: SessionStore) -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        connection = HTTPConnection(scope, receive)
+        await load_session(connection)
+        connection.session.setdefault("key", "value")
+        response = JSONResponse(connection.session)
+        await response(scope, receive, send)
+
+    middleware = SessionMiddleware(app, store=store, lifetime=60, rolling=True, cookie_https_only=False)
+    client = TestClient(middleware)
+    client.get("/")
+
+    write_patch = mock.patch.object(store, "write", wraps=store.write)
+    touch_patch = mock.patch.object(store, "touch", wraps=store.touch)
+    with write_patch as write_spy, touch_patch as touch_spy:
+        client.get("/")
+        write_spy.assert_not_called()
+        touch_spy.assert_called_once()
+
+
+def test_unchanged_rolling_session_is_written_if_store_cannot_touch() -> None:
+    store = CookieStore("key")
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        connection = HTTPConnection(scope, receive)
+        await load_session(connection)
+        connection.session.setdefault("key", "value")
+        response = JSONResponse(connection.session)
+        await response(scope, receive, send)
+
+    middleware = SessionMiddleware(app, store=store, lifetime=60, rolling=True, cookie_https_only=False)
+    client = TestClient(middleware)
+    client.get("/")
+
+    with mock.patch.object(store, "write", wraps=store.write) as write_spy:
+        assert client.get("/").json() == {"key": "value"}
+        write_spy.assert_called_once()
+
+
+def _user_app() -> typing.Callable[[Scope, Receive, Send], typing.Awaitable[None]]:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        connection = HTTPConnection(scope, receive)
+        await load_session(connection)
+        if scope["path"] == "/login":
+            regenerate_session_id(connection)
+            connection.session["user_id"] = int(connection.query_params["user"])
+        elif scope["path"] == "/logout":
+            connection.session.clear()
+        elif scope["path"] == "/cart":
+            connection.session["cart"] = [1]
+        response = JSONResponse(connection.session)
+        await response(scope, receive, send)
+
+    return app
+
+
+def test_user_index_tracks_user_sessions(store: InMemoryStore) -> None:
+    user_index = InMemoryUserIndex()
+    middleware = SessionMiddleware(
+        _user_app(), store=store, lifetime=60, rolling=True, cookie_https_only=False, user_index=user_index
+    )
+    laptop, phone = TestClient(middleware), TestClient(middleware)
+    laptop.get("/cart")
+    anonymous_session_id = laptop.cookies["session"]
+    laptop.get("/login", params={"user": "1"})
+    phone.get("/login", params={"user": "1"})
+    assert laptop.cookies["session"] != anonymous_session_id
+    assert set(user_index.data) == {"1"}
+    assert set(user_index.data["1"]) == {laptop.cookies["session"], phone.cookies["session"]}
+
+    # touching a rolling session extends the index entry
+    with mock.patch.object(user_index, "add", wraps=user_index.add) as add_spy:
+        assert laptop.get("/").json() == {"cart": [1], "user_id": 1}
+        add_spy.assert_called_once_with("1", laptop.cookies["session"], ttl=60)
+
+    # another user logs in on the same device
+    phone_session_id = phone.cookies["session"]
+    phone.get("/login", params={"user": "2"})
+    assert set(user_index.data["1"]) == {laptop.cookies["session"]}
+    assert set(user_index.data["2"]) == {phone.cookies["session"]}
+    assert phone_session_id not in user_index.data["2"]
+
+    phone.get("/logout")
+    assert "2" not in user_index.data
+
+    # regenerated session ID replaces the old one
+    laptop.get("/login", params={"user": "1"})
+    assert set(user_index.data["1"]) == {laptop.cookies["session"]}
+
+
+async def test_revoke_user_sessions(store: InMemoryStore) -> None:
+    user_index = InMemoryUserIndex()
+    middleware = SessionMiddleware(
+        _user_app(), store=store, lifetime=60, cookie_https_only=False, user_index=user_index
+    )
+    laptop, phone, other = TestClient(middleware), TestClient(middleware), TestClient(middleware)
+    laptop.get("/login", params={"user": "1"})
+    phone.get("/login", params={"user": "1"})
+    other.get("/login", params={"user": "2"})
+
+    revoked = await revoke_user_sessions(store, user_index, 1)
+    assert set(revoked) == {laptop.cookies["session"], phone.cookies["session"]}
+    assert laptop.get("/").json() == {}
+    assert phone.get("/").json() == {}
+    assert other.get("/").json() == {"user_id": 2}
+    assert await revoke_user_sessions(store, user_index, 1) == []
+
+
+@pytest.mark.asyncio
+async def test_prefetch_reads_session_before_app(store: SessionStore) -> None:
+    await store.write("session_id", b'{"key": "value"}', lifetime=60, ttl=60)
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        connection = HTTPConnection(scope, receive)
+        await asyncio.sleep(0)  # let the prefetch task run
+        read_spy.assert_called_once()
+
+        await load_session(connection)
+        response = JSONResponse(connection.session)
+        await response(scope, receive, send)
+
+    middleware = SessionMiddleware(app, store=store, prefetch=True)
+    client = TestClient(middleware, cookies={"session": "session_id"})
+    with mock.patch.object(store, "read", wraps=store.read) as read_spy:
+        assert client.get("/").json() == {"key": "value"}
+        read_spy.assert_called_once()
+
+
+def test_unused_prefetch_is_cancelled(store: SessionStore) -> None:
+    read_started = False
+    read_cancelled = False
+
+    async def slow_read(session_id: str, lifetime: int) -> bytes:
+        nonlocal read_started, read_cancelled
+        read_started = True
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            read_cancelled = True
+            raise
+        return b""  # pragma: no cover
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await asyncio.sleep(0)  # let the prefetch task run
+        assert read_started
+        response = Response("")
+        await response(scope, receive, send)
+
+    middleware = SessionMiddleware(app, store=store, prefetch=True)
+    client = TestClient(middleware, cookies={"session": "session_id"})
+    with mock.patch.object(store, "read", side_effect=slow_read):
+        assert client.get("/").status_code == 200
+    assert read_cancelled
+
+
+@pytest.mark.parametrize(
+    "cookie_header",
+    [
+        "",
+        "session=abc",
+        "a=1; session=abc; b=2",
+        "  session = abc  ;other=1",
+        'session="abc"',
+        "session=",
+        "mysession=abc",
+        "session_v2=abc",
+        "a=session=abc",
+        "foo session=abc",
+        "session",
+        "session=abc; session=def",
+        "x=1;session=abc;y=session",
+        "session=a=b",
+    ],
+)
+def test_get_cookie_matches_starlette_parser(cookie_header: str) -> None:
+    scope = {"type": "http", "headers": [(b"cookie", cookie_header.encode("latin-1"))]}
+    assert _get_cookie(scope, "session") == cookie_parser(cookie_header).get("session")
+
+
+def test_get_cookie_without_cookie_header() -> None:
+    assert _get_cookie({"type": "http", "headers": [(b"host", b"example.com")]}, "session") is None
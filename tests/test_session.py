@@ -1,15 +1,20 @@
+import typing
+from unittest import mock
+
 import pytest
 from starlette.requests import HTTPConnection
 
-from starsessions import Serializer, SessionStore
+from starsessions import FieldStore, Serializer, SessionStore
 from starsessions.encryptors import Encryptor
 from starsessions.session import (
+    SessionData,
     SessionHandler,
     generate_session_id,
     get_session_handler,
     get_session_id,
     is_loaded,
     load_session,
+    mark_session_modified,
     regenerate_session_id,
 )
 
@@ -86,10 +91,29 @@ async def test_regenerate_id_removes_old_session_on_save(
     connection.scope["session"] = {}
     connection.scope["session_handler"] = SessionHandler(connection, old_id, store, serializer, encryptor, lifetime=60)
 
+    await load_session(connection)
+    handler = get_session_handler(connection)
+    new_id = handler.regenerate_id()
+    with mock.patch.object(store, "rotate", wraps=store.rotate) as rotate_spy:
+        await handler.save(remaining_time=60)
+        rotate_spy.assert_called_once()
+
+    assert await store.read(old_id, lifetime=60) == b""
+    assert await store.read(new_id, lifetime=60) != b""
+
+
+async def test_destroy_removes_data_of_regenerated_session(
+    store: SessionStore, serializer: Serializer, encryptor: Encryptor
+) -> None:
+    old_id = "old_session_id"
+    await store.write(old_id, b'{"key": "value"}', lifetime=60, ttl=60)
+    connection = HTTPConnection({"type": "http"})
+    connection.scope["session_handler"] = SessionHandler(connection, old_id, store, serializer, encryptor, lifetime=60)
+
     await load_session(connection)
     handler = get_session_handler(connection)
     handler.regenerate_id()
-    await handler.save(remaining_time=60)
+    await handler.destroy()
 
     assert await store.read(old_id, lifetime=60) == b""
 
@@ -101,3 +125,205 @@ async def test_destroy_without_session_id(store: SessionStore, serializer: Seria
     connection.scope["session_handler"] = SessionHandler(connection, None, store, serializer, encryptor, lifetime=60)
 
     await get_session_handler(connection).destroy()
+
+
+def test_session_data_tracks_modifications() -> None:
+    data = SessionData({"key": "value", "other": "value"})
+    assert not data.modified
+    assert data["key"] == "value"
+    assert data.get("missing") is None
+    assert data.setdefault("key", "new") == "value"
+    assert data.pop("missing", None) is None
+    assert not data.modified
+
+    data["key"] = "new"
+    assert data.modified
+
+    assert data.changed_keys == {"key"}
+
+    for mutate, changed_keys in (
+        (lambda d: d.__delitem__("key"), {"key"}),
+        (lambda d: d.pop("key"), {"key"}),
+        (lambda d: d.popitem(), {"key"}),
+        (lambda d: d.clear(), {"key"}),
+        (lambda d: d.update({"key": "new"}, other="value"), {"key", "other"}),
+        (lambda d: d.setdefault("missing", "value"), {"missing"}),
+    ):
+        data = SessionData({"key": "value"})
+        mutate(data)
+        assert data.modified
+        assert data.changed_keys == changed_keys
+
+
+async def test_unchanged_session_is_not_modified(
+    store: SessionStore, serializer: Serializer, encryptor: Encryptor
+) -> None:
+    await store.write("session_id", b'{"key": "value", "__metadata__": {}}', lifetime=60, ttl=60)
+    connection = HTTPConnection({"type": "http"})
+    connection.scope["session_handler"] = SessionHandler(
+        connection, "session_id", store, serializer, encryptor, lifetime=60
+    )
+
+    await load_session(connection)
+    assert connection.session["key"] == "value"
+    assert not get_session_handler(connection).is_modified
+
+
+async def test_nested_modification_is_detected(
+    store: SessionStore, serializer: Serializer, encryptor: Encryptor
+) -> None:
+    await store.write("session_id", b'{"cart": [1], "__metadata__": {}}', lifetime=60, ttl=60)
+    connection = HTTPConnection({"type": "http"})
+    connection.scope["session_handler"] = SessionHandler(
+        connection, "session_id", store, serializer, encryptor, lifetime=60
+    )
+
+    await load_session(connection)
+    handler = get_session_handler(connection)
+    assert not handler.is_modified
+
+    connection.session["cart"].append(2)
+    assert handler.is_modified
+
+
+async def test_session_without_metadata_is_modified(
+    store: SessionStore, serializer: Serializer, encryptor: Encryptor
+) -> None:
+    await store.write("session_id", b'{"key": "value"}', lifetime=60, ttl=60)
+    connection = HTTPConnection({"type": "http"})
+    connection.scope["session_handler"] = SessionHandler(
+        connection, "session_id", store, serializer, encryptor, lifetime=60
+    )
+
+    await load_session(connection)
+    assert get_session_handler(connection).is_modified
+
+
+async def test_mark_session_modified(store: SessionStore, serializer: Serializer, encryptor: Encryptor) -> None:
+    await store.write("session_id", b'{"key": "value", "__metadata__": {}}', lifetime=60, ttl=60)
+    connection = HTTPConnection({"type": "http"})
+    connection.scope["session_handler"] = SessionHandler(
+        connection, "session_id", store, serializer, encryptor, lifetime=60
+    )
+
+    await load_session(connection)
+    mark_session_modified(connection)
+    assert get_session_handler(connection).is_modified
+
+
+class DictFieldStore(FieldStore):
+    def __init__(self) -> None:
+        self.data: dict[str, dict[str, bytes]] = {}
+
+    async def read_fields(self, session_id: str, lifetime: int) -> dict[str, bytes]:
+        return dict(self.data.get(session_id, {}))
+
+    async def write_fields(
+        self,
+        session_id: str,
+        fields: dict[str, bytes],
+        removed: typing.Collection[str],
+        lifetime: int,
+        ttl: int,
+        replace: bool,
+    ) -> bool:
+        if replace:
+            self.data[session_id] = dict(fields)
+            return True
+        if session_id not in self.data:
+            return False
+        for name in removed:
+            self.data[session_id].pop(name, None)
+        self.data[session_id].update(fields)
+        return True
+
+    async def remove(self, session_id: str) -> None:
+        self.data.pop(session_id, None)
+
+
+async def _load_field_session(
+    store: DictFieldStore, session_id: typing.Optional[str], serializer: Serializer, encryptor: Encryptor
+) -> HTTPConnection:
+    connection = HTTPConnection({"type": "http"})
+    connection.scope["session_handler"] = SessionHandler(
+        connection, session_id, store, serializer, encryptor, lifetime=60
+    )
+    await load_session(connection)
+    return connection
+
+
+async def test_field_store_writes_changed_keys(serializer: Serializer, encryptor: Encryptor) -> None:
+    store = DictFieldStore()
+    connection = await _load_field_session(store, None, serializer, encryptor)
+    connection.session.update({"user": "john", "cart": [1], "theme": "dark"})
+    session_id = await get_session_handler(connection).save(60)
+    assert set(store.data[session_id]) == {"user", "cart", "theme", "__metadata__"}
+    assert store.data[session_id]["user"] == b'{"user": "john"}'
+
+    connection = await _load_field_session(store, session_id, serializer, encryptor)
+    assert connection.session == {"user": "john", "cart": [1], "theme": "dark"}
+    handler = get_session_handler(connection)
+    assert not handler.is_modified
+
+    connection.session["cart"].append(2)
+    del connection.session["theme"]
+    assert handler.is_modified
+    with mock.patch.object(store, "write_fields", wraps=store.write_fields) as write_spy:
+        await handler.save(60)
+        _, fields, removed = write_spy.call_args.args
+        assert set(fields) == {"cart", "__metadata__"}
+        assert removed == ["theme"]
+        assert write_spy.call_args.kwargs["replace"] is False
+
+    connection = await _load_field_session(store, session_id, serializer, encryptor)
+    assert connection.session == {"user": "john", "cart": [1, 2]}
+
+
+async def test_field_store_rewrites_expired_session(serializer: Serializer, encryptor: Encryptor) -> None:
+    store = DictFieldStore()
+    connection = await _load_field_session(store, None, serializer, encryptor)
+    connection.session.update({"user": "john", "theme": "dark"})
+    session_id = await get_session_handler(connection).save(60)
+
+    connection = await _load_field_session(store, session_id, serializer, encryptor)
+    await store.remove(session_id)  # expired while the request was running
+    connection.session["theme"] = "light"
+    await get_session_handler(connection).save(60)
+    assert set(store.data[session_id]) == {"user", "theme", "__metadata__"}
+
+
+async def test_field_store_reads_session_written_as_blob(serializer: Serializer, encryptor: Encryptor) -> None:
+    store = DictFieldStore()
+    await store.write("session_id", b'{"user": "john", "__metadata__": {}}', lifetime=60, ttl=60)
+    assert await store.read("session_id", lifetime=60) == b'{"user": "john", "__metadata__": {}}'
+
+    connection = await _load_field_session(store, "session_id", serializer, encryptor)
+    assert connection.session == {"user": "john"}
+    connection.session["theme"] = "dark"
+    await get_session_handler(connection).save(60)
+    assert set(store.data["session_id"]) == {"user", "theme", "__metadata__"}
+
+
+async def test_field_store_regenerated_session(serializer: Serializer, encryptor: Encryptor) -> None:
+    store = DictFieldStore()
+    connection = await _load_field_session(store, None, serializer, encryptor)
+    connection.session["user"] = "john"
+    old_session_id = await get_session_handler(connection).save(60)
+
+    connection = await _load_field_session(store, old_session_id, serializer, encryptor)
+    new_session_id = regenerate_session_id(connection)
+    await get_session_handler(connection).save(60)
+    assert set(store.data) == {new_session_id}
+    assert set(store.data[new_session_id]) == {"user", "__metadata__"}
+
+
+async def test_field_store_read_many_fields(serializer: Serializer, encryptor: Encryptor) -> None:
+    store = DictFieldStore()
+    connection = await _load_field_session(store, None, serializer, encryptor)
+    connection.session["user"] = "john"
+    session_id = await get_session_handler(connection).save(60)
+
+    fields = await store.read_many_fields([session_id, "unknown"], lifetime=60)
+    assert fields[0]["user"] == b'{"user": "john"}'
+    assert fields[1] == {}
+    assert await store.read_many([session_id], lifetime=60) == [b""]  # only data written with write()